@@ -0,0 +1,1710 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heapify, heappop, heappush
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from graph_core import CoreGraph, CoreListener, DCoreGraph, DisjointSet, UCoreGraph
+import math
+import os
+import time
+
+def kruskal(graph: UCoreGraph, stats: Dict[str, int] = None) -> List[int]: #Minimum spanning forest, union-find over edges sorted by weight
+    tails, heads = graph.tails, graph.heads
+    parent = DisjointSet(graph.node_bound())
+    limit = graph.node_count() - graph.connectivity().component_count() #Forest size, stop once it is reached
+    forest = []
+    scanned = 0
+    for edge in sorted(graph.edges(), key=graph.weights.__getitem__):
+        scanned += 1
+        if parent.union(tails[edge], heads[edge]):
+            forest.append(edge)
+            if len(forest) == limit:
+                break
+    add_stat(stats, 'scanned', scanned)
+    add_stat(stats, 'unions', len(forest))
+    return forest
+
+def prim(graph: UCoreGraph, stats: Dict[str, int] = None) -> List[int]: #Minimum spanning forest, lazy binary-heap Prim from every unreached node
+    offsets, targets, arcs = graph.csr()
+    weights = graph.weights
+    reached = [False]*graph.node_bound()
+    best = [None]*graph.node_bound() #Lightest known edge weight into each unreached node
+    forest = []
+    pops = pushes = 0
+    for root in graph.nodes():
+        if reached[root]:
+            continue
+        heap = [(0, -1, root)]
+        while heap:
+            weight, edge, node = heappop(heap)
+            pops += 1
+            if reached[node]:
+                continue
+            reached[node] = True
+            if edge >= 0:
+                forest.append(edge)
+            for i in range(offsets[node], offsets[node+1]):
+                target = targets[i]
+                if not reached[target]:
+                    weight = weights[arcs[i]]
+                    if best[target] is None or weight < best[target]:
+                        best[target] = weight
+                        heappush(heap, (weight, arcs[i], target))
+                        pushes += 1
+    add_stat(stats, 'pops', pops)
+    add_stat(stats, 'pushes', pushes)
+    return forest
+
+PRIM_DENSITY = 0.9 #Prim is chosen over Kruskal above this fraction of all possible edges, near the measured crossover
+
+def minimum_spanning_forest(graph: UCoreGraph, method: str = 'auto', stats: Dict[str, int] = None) -> List[int]:
+    if method == 'auto':
+        n = graph.node_count()
+        method = 'prim' if n > 1 and 2*graph.edge_count() > PRIM_DENSITY*n*(n-1) else 'kruskal'
+    if method == 'kruskal':
+        return kruskal(graph, stats)
+    if method == 'prim':
+        return prim(graph, stats)
+    raise ValueError(f'Unknown MST method {method!r}')
+
+class DynamicMST(CoreListener): #Minimum spanning forest kept current through core notifications
+
+    def __init__(self, graph: UCoreGraph):
+        self.graph = graph
+        self.tree = set() #Forest edge ids
+        self.adjacent = [{} for node in range(graph.node_bound())] #[node: {forest edge: neighbor}]
+        self.parent = [-1]*graph.node_bound() #Rooted view of the forest for path queries, -1 at a root
+        self.parent_edge = [-1]*graph.node_bound()
+        self.touched = set() #Edges whose membership may have changed since pop_changes()
+        for edge in kruskal(graph):
+            self.tree.add(edge)
+            u, v = graph.endpoints(edge)
+            self.adjacent[u][edge] = v
+            self.adjacent[v][edge] = u
+        seen = [False]*graph.node_bound()
+        for root in graph.nodes():
+            if seen[root]:
+                continue
+            seen[root] = True
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                for edge, neighbor in self.adjacent[node].items():
+                    if not seen[neighbor]:
+                        seen[neighbor] = True
+                        self.parent[neighbor] = node
+                        self.parent_edge[neighbor] = edge
+                        stack.append(neighbor)
+        graph.attach(self)
+
+    def close(self):
+        self.graph.detach(self)
+
+    def pop_changes(self) -> Set[int]:
+        touched = self.touched
+        self.touched = set()
+        return touched
+
+    def weight(self) -> int:
+        return sum(self.graph.weights[edge] for edge in self.tree)
+
+    def path(self, u: int, v: int) -> Optional[List[int]]: #Forest edges between u and v, None if in different trees
+        parent, parent_edge = self.parent, self.parent_edge
+        depth = {u: 0}
+        up = [] #Edges from u towards its root
+        node = u
+        while parent[node] >= 0:
+            up.append(parent_edge[node])
+            node = parent[node]
+            depth[node] = len(up)
+        down = []
+        node = v
+        while node not in depth:
+            if parent[node] < 0:
+                return None
+            down.append(parent_edge[node])
+            node = parent[node]
+        return up[:depth[node]] + down
+
+    def evert(self, node: int): #Make node the root of its tree
+        parent, parent_edge = self.parent, self.parent_edge
+        previous, previous_edge = -1, -1
+        while node >= 0:
+            following, following_edge = parent[node], parent_edge[node]
+            parent[node], parent_edge[node] = previous, previous_edge
+            previous, previous_edge = node, following_edge
+            node = following
+
+    def link(self, edge: int):
+        u, v = self.graph.endpoints(edge)
+        self.evert(v)
+        self.parent[v] = u
+        self.parent_edge[v] = edge
+        self.adjacent[u][edge] = v
+        self.adjacent[v][edge] = u
+        self.tree.add(edge)
+        self.touched.add(edge)
+
+    def cut(self, edge: int, u: int, v: int):
+        if self.parent_edge[u] == edge:
+            self.parent[u] = self.parent_edge[u] = -1
+        else:
+            self.parent[v] = self.parent_edge[v] = -1
+        del self.adjacent[u][edge]
+        del self.adjacent[v][edge]
+        self.tree.discard(edge)
+        self.touched.add(edge)
+
+    def replacement(self, u: int, v: int) -> Optional[int]: #Lightest edge reconnecting the trees of u and v after a cut
+        adjacent = self.adjacent
+        queues = ([u], [v])
+        seen = ({u}, {v})
+        heads = [0, 0]
+        side = 0
+        while heads[side] < len(queues[side]): #Grow both sides in turn, the first to run out is the smaller tree
+            node = queues[side][heads[side]]
+            heads[side] += 1
+            for neighbor in adjacent[node].values():
+                if neighbor not in seen[side]:
+                    seen[side].add(neighbor)
+                    queues[side].append(neighbor)
+            side = 1 - side
+            if heads[side] == len(queues[side]):
+                break
+        weights = self.graph.weights
+        best = None
+        for node in seen[side]:
+            for edge, neighbor in self.graph.out_edges(node):
+                if neighbor not in seen[side] and (best is None or weights[edge] < weights[best]):
+                    best = edge
+        return best
+
+    def insert(self, edge: int): #Cycle-max replacement
+        u, v = self.graph.endpoints(edge)
+        if u == v:
+            return
+        path = self.path(u, v)
+        if path is None:
+            self.link(edge)
+            return
+        weights = self.graph.weights
+        heaviest = max(path, key=weights.__getitem__)
+        if weights[edge] < weights[heaviest]:
+            self.cut(heaviest, *self.graph.endpoints(heaviest))
+            self.link(edge)
+
+    def node_added(self, node: int):
+        if node == len(self.parent):
+            self.parent.append(-1)
+            self.parent_edge.append(-1)
+            self.adjacent.append({})
+        else:
+            self.parent[node] = self.parent_edge[node] = -1
+            self.adjacent[node] = {}
+
+    def edge_added(self, edge: int):
+        self.touched.add(edge)
+        self.insert(edge)
+
+    def edge_removed(self, edge: int, u: int, v: int):
+        self.touched.discard(edge)
+        if edge in self.tree:
+            self.cut(edge, u, v)
+            self.touched.discard(edge)
+            replacement = self.replacement(u, v)
+            if replacement is not None:
+                self.link(replacement)
+
+    def weight_changed(self, edge: int, old: int):
+        if edge in self.tree:
+            if self.graph.weights[edge] > old:
+                u, v = self.graph.endpoints(edge)
+                self.cut(edge, u, v)
+                self.link(self.replacement(u, v)) #The edge itself still reconnects the two trees
+        elif self.graph.weights[edge] < old:
+            self.insert(edge)
+
+class SearchCancelled(Exception): #Raised from Budget.check() when a search runs out of time or is cancelled
+    pass
+
+class StepLimitReached(SearchCancelled):
+    pass
+
+class BudgetExceeded(SearchCancelled): #Out of time, as opposed to cancelled by the user
+    pass
+
+class Budget: #Time limit and cancellation hook polled by long-running searches
+
+    def __init__(self, seconds: float = None, cancelled: Callable[[], bool] = None):
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        self.cancelled = cancelled
+
+    def check(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded('time budget exceeded')
+        if self.cancelled is not None and self.cancelled():
+            raise SearchCancelled('cancelled')
+
+HELD_KARP_LIMIT = 25 #Largest graph solved by the bitmask DP
+PROBE_STEPS = 20000 #Backtracking steps tried before falling back to the DP
+
+def hamiltonian_cycle(graph: UCoreGraph, budget: Budget = None, method: str = 'auto', stats: Dict[str, int] = None) -> Optional[List[int]]: #Edges in cycle order
+    if method == 'auto':
+        if not graph.connectivity().is_connected():
+            return None
+        try:
+            return hamiltonian_backtrack(graph, budget, PROBE_STEPS, stats)
+        except StepLimitReached:
+            pass
+        method = 'held_karp' if graph.node_count() <= HELD_KARP_LIMIT else 'backtrack'
+    if method == 'held_karp':
+        return held_karp(graph, budget, stats)
+    if method == 'backtrack':
+        return hamiltonian_backtrack(graph, budget, stats=stats)
+    raise ValueError(f'Unknown Hamiltonian cycle method {method!r}')
+
+def cycle_edges(graph: UCoreGraph, order: List[int]) -> List[int]:
+    return [graph.find_edge(order[i-1], order[i]) for i in range(1, len(order))] + [graph.find_edge(order[-1], order[0])]
+
+def held_karp(graph: UCoreGraph, budget: Budget = None, stats: Dict[str, int] = None) -> Optional[List[int]]: #Bitmask DP over reachable (subset, end) states
+    nodes = list(graph.nodes())
+    n = len(nodes)
+    if n < 3:
+        return None
+    index = {node: i for i, node in enumerate(nodes)}
+    adj = [0]*n #Neighbor bitmask per node
+    for i, node in enumerate(nodes):
+        for neighbor in graph.neighbors(node):
+            adj[i] |= 1 << index[neighbor]
+        adj[i] &= ~(1 << i)
+    if min(bin(mask).count('1') for mask in adj) < 2:
+        return None
+    layers = [{} for i in range(n-1)] #layers[k]: {visited subset of k+2 nodes incl. node 0: bitmask of possible path ends}
+    grow = adj[0]
+    while grow:
+        low = grow & -grow
+        layers[0][1 | low] = low
+        grow ^= low
+    steps = 0
+    for k in range(n-2):
+        layer, successor = layers[k], layers[k+1]
+        for mask, ends in layer.items():
+            steps += 1
+            if budget is not None and not steps & 4095:
+                budget.check()
+            grow = 0
+            while ends:
+                low = ends & -ends
+                grow |= adj[low.bit_length()-1]
+                ends ^= low
+            grow &= ~mask
+            while grow:
+                low = grow & -grow
+                successor[mask | low] = successor.get(mask | low, 0) | low
+                grow ^= low
+        if not successor:
+            add_stat(stats, 'states', steps)
+            return None
+    add_stat(stats, 'states', steps)
+    mask = (1 << n) - 1
+    ends = layers[-1].get(mask, 0) & adj[0]
+    if not ends:
+        return None
+    current = (ends & -ends).bit_length() - 1
+    order = [current]
+    for k in range(n-3, -1, -1): #Walk back through the layers
+        mask ^= 1 << current
+        ends = layers[k][mask] & adj[current]
+        current = (ends & -ends).bit_length() - 1
+        order.append(current)
+    order.append(0)
+    order.reverse()
+    return cycle_edges(graph, [nodes[i] for i in order])
+
+def hamiltonian_backtrack(graph: UCoreGraph, budget: Budget = None, max_steps: int = None, stats: Dict[str, int] = None) -> Optional[List[int]]: #Iterative DFS with degree and connectivity pruning, depth is the longest path tried
+    nodes = list(graph.nodes())
+    n = len(nodes)
+    if n < 3:
+        return None
+    bound = graph.node_bound()
+    adj = [None]*bound
+    for node in nodes:
+        adj[node] = [neighbor for neighbor in dict.fromkeys(graph.neighbors(node)) if neighbor != node]
+        if len(adj[node]) < 2:
+            return None
+    available = [len(adj[node]) if adj[node] is not None else 0 for node in range(bound)] #Neighbors not inside the path
+    visited = [False]*bound
+    start = min(nodes, key=lambda x: len(adj[x]))
+    visited[start] = True
+    closes = [False]*bound
+    for neighbor in adj[start]:
+        closes[neighbor] = True
+    start_free = len(adj[start]) #Unvisited neighbors of start
+    path = [start]
+    stack = [iter(adj[start])]
+    steps = depth = 0
+    while stack:
+        current = path[-1]
+        for node in stack[-1]:
+            if not visited[node]:
+                break
+        else:
+            stack.pop()
+            if len(path) > 1:
+                node = path.pop()
+                visited[node] = False
+                if closes[node]:
+                    start_free += 1
+                previous = path[-1]
+                if previous != start:
+                    for neighbor in adj[previous]:
+                        if not visited[neighbor]:
+                            available[neighbor] += 1
+            continue
+        steps += 1
+        if not steps & 1023:
+            if budget is not None:
+                budget.check()
+            if max_steps is not None and steps > max_steps:
+                add_stat(stats, 'steps', steps)
+                raise StepLimitReached('step limit reached')
+        dead = False #Extend the path by node
+        if current != start:
+            for neighbor in adj[current]:
+                if not visited[neighbor]:
+                    available[neighbor] -= 1
+                    if available[neighbor] < 2 and neighbor != node:
+                        dead = True
+        visited[node] = True
+        if closes[node]:
+            start_free -= 1
+        path.append(node)
+        depth = max(depth, len(path))
+        remaining = n - len(path)
+        if not remaining:
+            if closes[node]:
+                add_stat(stats, 'steps', steps)
+                add_stat(stats, 'depth', depth)
+                return cycle_edges(graph, path)
+            dead = True
+        elif not start_free or not connected_rest(adj, visited, node, remaining):
+            dead = True
+        if dead:
+            stack.append(iter(()))
+        else:
+            stack.append(iter(sorted((x for x in adj[node] if not visited[x]), key=available.__getitem__)))
+    add_stat(stats, 'steps', steps)
+    add_stat(stats, 'depth', depth)
+    return None
+
+def connected_rest(adj: List[List[int]], visited: List[bool], end: int, remaining: int) -> bool: #Unvisited nodes all reachable from the path end
+    seen = {end}
+    queue = [end]
+    count = 0
+    for node in queue:
+        for neighbor in adj[node]:
+            if not visited[neighbor] and neighbor not in seen:
+                seen.add(neighbor)
+                queue.append(neighbor)
+                count += 1
+    return count == remaining
+
+def max_matching(graph: UCoreGraph, method: str = 'auto', budget: Budget = None, stats: Dict[str, int] = None) -> Tuple[Set[int], Set[int]]: #(matching, exposed nodes)
+    color = bipartition(graph) if method in ('auto', 'hopcroft_karp') else None
+    if method == 'auto':
+        method = 'hopcroft_karp' if color is not None else 'blossom'
+    if method == 'hopcroft_karp':
+        if color is None:
+            raise ValueError('Hopcroft-Karp needs a bipartite graph')
+        mate = hopcroft_karp(graph, color, budget, stats)
+    elif method == 'blossom':
+        mate = edmonds_blossom(graph, budget, stats)
+    else:
+        raise ValueError(f'Unknown matching method {method!r}')
+    matching = set()
+    exposed = set()
+    for node in graph.nodes():
+        if mate[node] < 0:
+            exposed.add(node)
+        elif node < mate[node]:
+            matching.add(graph.find_edge(node, mate[node]))
+    return matching, exposed
+
+def bipartition(graph: UCoreGraph) -> Optional[List[int]]: #Side 0 or 1 per node id, None if there is an odd cycle
+    offsets, targets, arcs = graph.csr()
+    color = [-1]*graph.node_bound()
+    for root in graph.nodes():
+        if color[root] >= 0:
+            continue
+        color[root] = 0
+        queue = [root]
+        for node in queue:
+            side = 1 - color[node]
+            for i in range(offsets[node], offsets[node+1]):
+                target = targets[i]
+                if color[target] < 0:
+                    color[target] = side
+                    queue.append(target)
+                elif color[target] != side:
+                    return None
+    return color
+
+def greedy_matching(graph: UCoreGraph, mate: List[int], nodes: List[int]): #Karp-Sipser maximal matching as a starting point
+    offsets, targets, arcs = graph.csr()
+    degree = [0]*graph.node_bound() #Unmatched neighbors, counted with multiplicity
+    for node in nodes:
+        degree[node] = sum(1 for i in range(offsets[node], offsets[node+1]) if targets[i] != node)
+    pendant = [node for node in nodes if degree[node] == 1]
+
+    def match(node: int, target: int):
+        mate[node] = target
+        mate[target] = node
+        for matched in (node, target):
+            for i in range(offsets[matched], offsets[matched+1]):
+                neighbor = targets[i]
+                if mate[neighbor] < 0:
+                    degree[neighbor] -= 1
+                    if degree[neighbor] == 1:
+                        pendant.append(neighbor)
+
+    for node in nodes:
+        while pendant: #Matching a degree-one node to its only neighbor is always safe
+            leaf = pendant.pop()
+            if mate[leaf] < 0 and degree[leaf] == 1:
+                for i in range(offsets[leaf], offsets[leaf+1]):
+                    target = targets[i]
+                    if mate[target] < 0 and target != leaf:
+                        match(leaf, target)
+                        break
+        if mate[node] < 0:
+            for i in range(offsets[node], offsets[node+1]):
+                target = targets[i]
+                if mate[target] < 0 and target != node:
+                    match(node, target)
+                    break
+
+def hopcroft_karp(graph: UCoreGraph, color: List[int], budget: Budget = None, stats: Dict[str, int] = None) -> List[int]: #Mate per node id, -1 if exposed
+    offsets, targets, arcs = graph.csr()
+    bound = graph.node_bound()
+    nodes = list(graph.nodes())
+    left = [node for node in nodes if color[node] == 0]
+    mate = [-1]*bound
+    greedy_matching(graph, mate, nodes)
+    if stats is not None: #Pairs matched before any augmenting search
+        add_stat(stats, 'greedy', sum(1 for node in nodes if mate[node] > node))
+    infinity = bound + 1
+    dist = [infinity]*bound
+    pointer = offsets[:-1] #Current arc per node
+    phases = augmentations = 0
+    while True:
+        if budget is not None:
+            budget.check()
+        phases += 1
+        queue = [node for node in left if mate[node] < 0] #BFS layers from the exposed left nodes
+        for node in left:
+            dist[node] = infinity
+        for node in queue:
+            dist[node] = 0
+        found = False
+        for node in queue:
+            for i in range(offsets[node], offsets[node+1]):
+                partner = mate[targets[i]]
+                if partner < 0:
+                    found = True
+                elif dist[partner] == infinity:
+                    dist[partner] = dist[node] + 1
+                    queue.append(partner)
+        if not found:
+            add_stat(stats, 'phases', phases)
+            add_stat(stats, 'augmentations', augmentations)
+            return mate
+        for node in left:
+            pointer[node] = offsets[node]
+        for root in left:
+            if mate[root] >= 0:
+                continue
+            stack = [root]
+            while stack: #Layered DFS with current-arc pointers
+                node = stack[-1]
+                end = offsets[node+1]
+                while pointer[node] < end:
+                    target = targets[pointer[node]]
+                    pointer[node] += 1
+                    partner = mate[target]
+                    if partner < 0:
+                        for left_node in reversed(stack): #Flip the alternating path
+                            previous = mate[left_node]
+                            mate[left_node] = target
+                            mate[target] = left_node
+                            target = previous
+                        augmentations += 1
+                        stack = []
+                        break
+                    if dist[partner] == dist[node] + 1:
+                        stack.append(partner)
+                        break
+                else:
+                    dist[node] = infinity
+                    stack.pop()
+
+def edmonds_blossom(graph: UCoreGraph, budget: Budget = None, stats: Dict[str, int] = None) -> List[int]: #Mate per node id, -1 if exposed
+    offsets, targets, arcs = graph.csr()
+    bound = graph.node_bound()
+    nodes = list(graph.nodes())
+    mate = [-1]*bound
+    greedy_matching(graph, mate, nodes)
+    if stats is not None: #Pairs matched before any augmenting search
+        add_stat(stats, 'greedy', sum(1 for node in nodes if mate[node] > node))
+    parent = [-1]*bound
+    base = list(range(bound))
+    used = [False]*bound #Even nodes of the alternating tree
+    removed = [False]*bound #Nodes of failed (Hungarian) trees never lie on a later augmenting path
+    members = [None]*bound #Nodes whose base is this node
+    searches = augmentations = blossoms = 0
+
+    def lca(a: int, b: int) -> int:
+        seen = set()
+        while True:
+            a = base[a]
+            seen.add(a)
+            if mate[a] < 0:
+                break
+            a = parent[mate[a]]
+        while True:
+            b = base[b]
+            if b in seen:
+                return b
+            b = parent[mate[b]]
+
+    def mark_path(node: int, stem: int, child: int, blossom: Set[int]):
+        while base[node] != stem:
+            blossom.add(base[node])
+            blossom.add(base[mate[node]])
+            parent[node] = child
+            child = mate[node]
+            node = parent[mate[node]]
+
+    for root in nodes: #A root that fails once can never be matched later
+        if mate[root] >= 0:
+            continue
+        if budget is not None and not searches & 63:
+            budget.check()
+        searches += 1
+        used[root] = True
+        members[root] = [root]
+        touched = [root]
+        queue = [root]
+        end = -1
+        for node in queue: #BFS for an augmenting path, contracting blossoms as they close
+            for i in range(offsets[node], offsets[node+1]):
+                target = targets[i]
+                if base[node] == base[target] or mate[node] == target or removed[target]:
+                    continue
+                if target == root or (mate[target] >= 0 and parent[mate[target]] >= 0):
+                    stem = lca(node, target)
+                    blossoms += 1
+                    blossom = set()
+                    mark_path(node, stem, target, blossom)
+                    mark_path(target, stem, node, blossom)
+                    blossom.discard(stem)
+                    for inner in blossom:
+                        for other in members[inner]:
+                            base[other] = stem
+                            if not used[other]:
+                                used[other] = True
+                                queue.append(other)
+                        members[stem].extend(members[inner])
+                        members[inner] = []
+                elif parent[target] < 0:
+                    parent[target] = node
+                    members[target] = [target]
+                    touched.append(target)
+                    if mate[target] < 0:
+                        end = target
+                        break
+                    used[mate[target]] = True
+                    members[mate[target]] = [mate[target]]
+                    touched.append(mate[target])
+                    queue.append(mate[target])
+            if end >= 0:
+                break
+        if end < 0:
+            for node in touched:
+                removed[node] = True
+        else:
+            augmentations += 1
+        while end >= 0: #Augment along the parent links
+            previous = parent[end]
+            following = mate[previous]
+            mate[end] = previous
+            mate[previous] = end
+            end = following
+        for node in touched:
+            parent[node] = -1
+            base[node] = node
+            used[node] = False
+            members[node] = None
+    add_stat(stats, 'searches', searches)
+    add_stat(stats, 'augmentations', augmentations)
+    add_stat(stats, 'blossoms', blossoms)
+    return mate
+
+def min_edge_cover(graph: UCoreGraph) -> Set[int]: #Maximum matching plus one edge per exposed node
+    matching, exposed = max_matching(graph)
+    cover = set(matching)
+    for node in exposed:
+        for edge in graph.incident(node):
+            cover.add(edge)
+            break
+    return cover
+
+COVER_EXACT_LIMIT = 2000 #Largest general graph handed to branch-and-reduce by 'auto'
+
+def min_vertex_cover(graph: UCoreGraph, method: str = 'auto', budget: Budget = None, stats: Dict[str, int] = None) -> Set[int]: #Node ids touching every edge
+    color = bipartition(graph) if method in ('auto', 'konig') else None
+    if method == 'auto':
+        if color is not None:
+            method = 'konig'
+        elif graph.node_count() > COVER_EXACT_LIMIT:
+            method = 'approx'
+        else:
+            solver = VertexCoverSolver(graph, budget, stats)
+            try:
+                return solver.solve()
+            except BudgetExceeded: #Best cover found so far
+                return solver.best
+    if method == 'konig':
+        if color is None:
+            raise ValueError("Konig's theorem needs a bipartite graph")
+        return konig_cover(graph, color, budget, stats)
+    if method == 'exact':
+        return VertexCoverSolver(graph, budget, stats).solve()
+    if method == 'approx':
+        return approx_vertex_cover(graph)
+    raise ValueError(f'Unknown vertex cover method {method!r}')
+
+def konig_cover(graph: UCoreGraph, color: List[int], budget: Budget = None, stats: Dict[str, int] = None) -> Set[int]: #From a maximum matching of a bipartite graph
+    offsets, targets, arcs = graph.csr()
+    mate = hopcroft_karp(graph, color, budget, stats)
+    reached = [False]*graph.node_bound()
+    queue = [node for node in graph.nodes() if color[node] == 0 and mate[node] < 0]
+    for node in queue:
+        reached[node] = True
+    for node in queue: #Alternating paths from the exposed left nodes
+        for i in range(offsets[node], offsets[node+1]):
+            target = targets[i]
+            if not reached[target]:
+                reached[target] = True
+                partner = mate[target]
+                if partner >= 0 and not reached[partner]:
+                    reached[partner] = True
+                    queue.append(partner)
+    return {node for node in graph.nodes() if reached[node] == bool(color[node])}
+
+def approx_vertex_cover(graph: UCoreGraph) -> Set[int]: #Both ends of a maximal matching, at most twice the optimum
+    cover = set()
+    tails, heads = graph.tails, graph.heads
+    for edge in graph.edges():
+        u, v = tails[edge], heads[edge]
+        if u not in cover and v not in cover:
+            cover.add(u)
+            cover.add(v)
+    return cover
+
+class VertexCoverSolver: #Kernelization and branch-and-reduce on an adjacency dict with an undo trail
+
+    def __init__(self, graph: UCoreGraph, budget: Budget = None, stats: Dict[str, int] = None):
+        self.budget = budget
+        self.stats = stats #Branch nodes and crowns, counted even when the budget runs out
+        self.adj = {} #{node: set of neighbors}, folded nodes get fresh ids
+        self.cover = [] #Nodes taken so far, possibly folded ones
+        self.folds = [] #[(folded, middle, a, b)]
+        self.trail = [] #('remove', node, neighbors) or ('add', node)
+        self.pending = set() #Nodes whose degree changed since the last reduction
+        self.next_id = graph.node_bound()
+        self.best = approx_vertex_cover(graph)
+        self.best_size = len(self.best)
+        for node in graph.nodes():
+            self.adj[node] = set(graph.neighbors(node))
+        for node, adjacent in self.adj.items():
+            if node in adjacent: #A self-loop forces its node into the cover
+                self.cover.append(node)
+                adjacent.discard(node)
+        for node in self.cover:
+            self.remove(node)
+        self.pending.update(self.adj)
+
+    def size(self) -> int: #Every fold accounts for one node of the final cover
+        return len(self.cover) + len(self.folds)
+
+    def remove(self, node: int):
+        adjacent = self.adj.pop(node)
+        for neighbor in adjacent:
+            self.adj[neighbor].discard(node)
+        self.pending.update(adjacent)
+        self.trail.append(('remove', node, adjacent))
+
+    def take(self, node: int):
+        self.cover.append(node)
+        self.remove(node)
+
+    def mark(self) -> Tuple[int, int, int]:
+        return len(self.trail), len(self.cover), len(self.folds)
+
+    def undo(self, mark: Tuple[int, int, int]):
+        trail, cover, folds = mark
+        while len(self.trail) > trail:
+            entry = self.trail.pop()
+            if entry[0] == 'remove':
+                node, adjacent = entry[1], entry[2]
+                self.adj[node] = adjacent
+                for neighbor in adjacent:
+                    self.adj[neighbor].add(node)
+            else:
+                node = entry[1]
+                for neighbor in self.adj.pop(node):
+                    self.adj[neighbor].discard(node)
+        del self.cover[cover:]
+        del self.folds[folds:]
+        self.pending.clear()
+
+    def fold(self, node: int, a: int, b: int): #Degree-2 node with non-adjacent neighbors merges into one node
+        adjacent = (self.adj[a] | self.adj[b]) - {node, a, b}
+        self.remove(node)
+        self.remove(a)
+        self.remove(b)
+        folded = self.next_id
+        self.next_id += 1
+        self.adj[folded] = adjacent
+        for neighbor in adjacent:
+            self.adj[neighbor].add(folded)
+        self.trail.append(('add', folded))
+        self.folds.append((folded, node, a, b))
+        self.pending.add(folded)
+        self.pending.update(adjacent)
+
+    def reduce(self): #Degree-0/1/2 rules until none applies
+        adj = self.adj
+        pending = self.pending
+        while pending:
+            node = pending.pop()
+            if node not in adj:
+                continue
+            degree = len(adj[node])
+            if degree == 0:
+                self.remove(node)
+            elif degree == 1:
+                neighbor = next(iter(adj[node]))
+                self.take(neighbor)
+                self.remove(node)
+            elif degree == 2:
+                a, b = adj[node]
+                if b in adj[a]: #Triangle, both neighbors are in some minimum cover
+                    self.take(a)
+                    self.take(b)
+                    self.remove(node)
+                else:
+                    self.fold(node, a, b)
+
+    def maximal_matching(self) -> List[Tuple[int, int]]:
+        matched = set()
+        matching = []
+        for node, adjacent in self.adj.items():
+            if node not in matched:
+                for neighbor in adjacent:
+                    if neighbor not in matched:
+                        matched.add(node)
+                        matched.add(neighbor)
+                        matching.append((node, neighbor))
+                        break
+        return matching
+
+    def crown(self) -> bool: #Crown reduction, True if a crown was removed
+        matched = set()
+        for pair in self.maximal_matching():
+            matched.update(pair)
+        outside = [node for node in self.adj if node not in matched] #Independent set left by the matching
+        if not outside:
+            return False
+        bipartite = UCoreGraph() #Outside nodes against their neighborhood
+        ids = {}
+        color = []
+        for node in outside:
+            ids[node] = bipartite.add_node()
+            color.append(0)
+        for node in outside:
+            for neighbor in self.adj[node]:
+                if neighbor not in ids:
+                    ids[neighbor] = bipartite.add_node()
+                    color.append(1)
+                bipartite.add_edge(ids[node], ids[neighbor])
+        nodes = list(ids)
+        mate = hopcroft_karp(bipartite, color, self.budget)
+        crown = {node for node in outside if mate[ids[node]] < 0}
+        if not crown:
+            return False
+        head = set()
+        frontier = crown
+        while frontier: #Grow the crown along matched edges
+            grown = set()
+            for node in frontier:
+                for neighbor in self.adj[node]:
+                    if neighbor not in head:
+                        head.add(neighbor)
+                        partner = nodes[mate[ids[neighbor]]]
+                        if partner not in crown:
+                            crown.add(partner)
+                            grown.add(partner)
+            frontier = grown
+        for node in head:
+            self.take(node)
+        for node in crown:
+            self.remove(node)
+        add_stat(self.stats, 'crowns', 1)
+        return True
+
+    def kernelize(self):
+        self.reduce()
+        while self.crown():
+            self.reduce()
+
+    def record(self): #Expand the folds of the current solution
+        cover = set(self.cover)
+        for folded, node, a, b in reversed(self.folds):
+            if folded in cover:
+                cover.discard(folded)
+                cover.add(a)
+                cover.add(b)
+            else:
+                cover.add(node)
+        self.best = cover
+        self.best_size = len(cover)
+
+    def solve(self) -> Set[int]:
+        self.kernelize()
+        stack = [('enter', None)]
+        steps = 0
+        while stack:
+            action, data = stack.pop()
+            if action == 'undo':
+                self.undo(data)
+                continue
+            if action == 'exclude': #Second branch, all neighbors of the node join the cover
+                node, mark = data
+                self.undo(mark)
+                for neighbor in list(self.adj[node]):
+                    self.take(neighbor)
+                self.remove(node)
+            steps += 1
+            if not steps & 255:
+                add_stat(self.stats, 'branches', 256)
+                if self.budget is not None:
+                    self.budget.check()
+            mark = self.mark()
+            self.reduce()
+            if not self.adj:
+                if self.size() < self.best_size:
+                    self.record()
+                self.undo(mark)
+                continue
+            if self.size() + len(self.maximal_matching()) >= self.best_size: #Matching lower bound
+                self.undo(mark)
+                continue
+            node = max(self.adj, key=lambda node: len(self.adj[node]))
+            stack.append(('undo', mark))
+            stack.append(('exclude', (node, self.mark())))
+            self.take(node)
+            stack.append(('enter', None))
+        add_stat(self.stats, 'branches', steps & 255)
+        return self.best
+
+def shortest_path(graph: CoreGraph, start: int, end: int, costs: List[int] = None, method: str = 'auto', stats: Dict[str, int] = None) -> List[int]: #Edges from start to end, empty if unreachable
+    if costs is None:
+        costs = graph.costs
+    if method == 'auto':
+        method = 'astar' if costs is graph.costs and graph.cost_scale() else 'dijkstra'
+    if method == 'dijkstra':
+        via = dijkstra(graph, start, end, costs, stats)
+    elif method == 'astar':
+        if costs is not graph.costs:
+            raise ValueError('A* needs the stored edge costs')
+        scale = graph.cost_scale()
+        if scale is None:
+            raise ValueError('A* needs a position for every node with edges')
+        via = astar(graph, start, end, costs, scale, stats)
+    elif method == 'bidirectional':
+        return bidirectional_dijkstra(graph, start, end, costs, stats)
+    else:
+        raise ValueError(f'Unknown shortest path method {method!r}')
+    return trace_path(graph, via, start, end)
+
+def add_stat(stats: Optional[Dict[str, int]], name: str, value: int): #Accumulate an operation counter when the caller asked for them
+    if stats is not None:
+        stats[name] = stats.get(name, 0) + value
+
+def trace_path(graph: CoreGraph, via: Dict[int, int], start: int, end: int) -> List[int]: #Follow {node: edge used to reach it} back to start
+    path = []
+    if end in via:
+        while end != start:
+            edge = via[end]
+            path.append(edge)
+            end = graph.other(edge, end)
+    path.reverse()
+    return path
+
+def dijkstra(graph: CoreGraph, start: int, end: int, costs: List[int], stats: Dict[str, int] = None) -> Dict[int, int]: #{node: edge used to reach it}
+    offsets, targets, arcs = graph.csr()
+    dist = {start: 0}
+    via = {}
+    heap = [(0, start)]
+    settled = pushes = 0
+    while heap:
+        cost, node = heappop(heap)
+        if cost > dist[node]: #Stale entry, the node was reached more cheaply
+            continue
+        settled += 1
+        if node == end:
+            break
+        for i in range(offsets[node], offsets[node+1]):
+            target = targets[i]
+            new_cost = cost + costs[arcs[i]]
+            if target not in dist or new_cost < dist[target]:
+                dist[target] = new_cost
+                via[target] = arcs[i]
+                heappush(heap, (new_cost, target))
+                pushes += 1
+    add_stat(stats, 'settled', settled)
+    add_stat(stats, 'pushes', pushes)
+    return via
+
+def astar(graph: CoreGraph, start: int, end: int, costs: List[int], scale: float, stats: Dict[str, int] = None) -> Dict[int, int]: #{node: edge used to reach it}
+    offsets, targets, arcs = graph.csr()
+    positions = graph.positions
+    x, y = positions[end]
+    dist = {start: 0}
+    via = {}
+    heap = [(0, 0, start)]
+    settled = pushes = 0
+    while heap:
+        estimate, cost, node = heappop(heap)
+        if cost > dist[node]:
+            continue
+        settled += 1
+        if node == end:
+            break
+        for i in range(offsets[node], offsets[node+1]):
+            target = targets[i]
+            new_cost = cost + costs[arcs[i]]
+            if target not in dist or new_cost < dist[target]:
+                dist[target] = new_cost
+                via[target] = arcs[i]
+                tx, ty = positions[target]
+                heappush(heap, (new_cost + scale*math.hypot(tx - x, ty - y), new_cost, target))
+                pushes += 1
+    add_stat(stats, 'settled', settled)
+    add_stat(stats, 'pushes', pushes)
+    return via
+
+def bidirectional_dijkstra(graph: CoreGraph, start: int, end: int, costs: List[int], stats: Dict[str, int] = None) -> List[int]:
+    if start == end:
+        add_stat(stats, 'settled', 1)
+        return []
+    searches = (graph.csr(), graph.reverse_csr())
+    dist = ({start: 0}, {end: 0})
+    via = ({}, {})
+    done = (set(), set())
+    heaps = ([(0, start)], [(0, end)])
+    best = None #Cheapest start-end connection seen so far
+    meeting = None #(side, node, edge, target) of the arc closing it
+    settled = pushes = 0
+    while heaps[0] and heaps[1]:
+        if best is not None and heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1 #Expand the side with the smaller frontier
+        cost, node = heappop(heaps[side])
+        if node in done[side]:
+            continue
+        done[side].add(node)
+        settled += 1
+        offsets, targets, arcs = searches[side]
+        forward, backward = dist[side], dist[1-side]
+        for i in range(offsets[node], offsets[node+1]):
+            target = targets[i]
+            new_cost = cost + costs[arcs[i]]
+            if target not in forward or new_cost < forward[target]:
+                forward[target] = new_cost
+                via[side][target] = arcs[i]
+                heappush(heaps[side], (new_cost, target))
+                pushes += 1
+            if target in backward and (best is None or new_cost + backward[target] < best):
+                best = new_cost + backward[target]
+                meeting = (side, node, arcs[i], target)
+    add_stat(stats, 'settled', settled)
+    add_stat(stats, 'pushes', pushes)
+    if meeting is None:
+        return []
+    side, node, edge, target = meeting
+    left, right = (node, target) if side == 0 else (target, node)
+    return trace_path(graph, via[0], start, left) + [edge] + trace_path(graph, via[1], end, right)[::-1]
+
+FLOYD_WARSHALL_LIMIT = 2000 #Largest graph 'auto' hands to Floyd-Warshall, its matrix takes 8*n*n bytes
+FLOYD_WARSHALL_DEGREE = 4 #Average out-degree above which vectorized Floyd-Warshall beats a single Dijkstra process
+
+def all_pairs_shortest_paths(graph: CoreGraph, nodes: List[int] = None, method: str = 'auto', dense: bool = True, workers: int = None, stats: Dict[str, int] = None): #NumPy matrix in nodes order (inf if unreachable), or {source: {target: distance}}
+    nodes = list(graph.nodes()) if nodes is None else nodes
+    if method == 'auto':
+        n = len(nodes)
+        arcs = graph.edge_count() if graph.directed else 2*graph.edge_count()
+        method = 'floyd_warshall' if dense and n <= FLOYD_WARSHALL_LIMIT and arcs > FLOYD_WARSHALL_DEGREE*n else 'dijkstra'
+    if method == 'floyd_warshall':
+        matrix = floyd_warshall(graph, nodes)
+        if dense:
+            return matrix
+        return {u: {v: int(matrix[i, j]) for j, v in enumerate(nodes) if matrix[i, j] != math.inf} for i, u in enumerate(nodes)}
+    if method != 'dijkstra':
+        raise ValueError(f'Unknown all pairs method {method!r}')
+    rows = repeated_dijkstra(graph, nodes, workers, stats)
+    if not dense:
+        return rows
+    import numpy
+    index = {node: i for i, node in enumerate(nodes)}
+    matrix = numpy.full((len(nodes), len(nodes)), numpy.inf)
+    for i, source in enumerate(nodes):
+        for target, distance in rows[source].items():
+            if target in index:
+                matrix[i, index[target]] = distance
+    return matrix
+
+def floyd_warshall(graph: CoreGraph, nodes: List[int]): #Dense NumPy matrix, one vectorized relaxation per pivot
+    import numpy
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    matrix = numpy.full((n, n), numpy.inf)
+    tails, heads = [], []
+    costs = []
+    for edge in graph.edges():
+        u, v = graph.tails[edge], graph.heads[edge]
+        if u in index and v in index:
+            tails.append(index[u])
+            heads.append(index[v])
+            costs.append(graph.costs[edge])
+            if not graph.directed:
+                tails.append(index[v])
+                heads.append(index[u])
+                costs.append(graph.costs[edge])
+    numpy.minimum.at(matrix, (numpy.array(tails, dtype=numpy.intp), numpy.array(heads, dtype=numpy.intp)), numpy.array(costs, dtype=float))
+    diagonal = numpy.arange(n)
+    matrix[diagonal, diagonal] = numpy.minimum(matrix[diagonal, diagonal], 0)
+    for k in range(n):
+        numpy.minimum(matrix, matrix[:, k, None] + matrix[None, k, :], out=matrix)
+    if n and matrix[diagonal, diagonal].min() < 0:
+        raise ValueError('Negative cost cycle')
+    return matrix
+
+def johnson_potentials(graph: CoreGraph) -> Optional[List[int]]: #Bellman-Ford from a virtual root, None when no cost is negative
+    if not any(graph.costs[edge] < 0 for edge in graph.edges()):
+        return None
+    if not graph.directed:
+        raise ValueError('Negative cost cycle') #Any negative undirected edge is a two-arc cycle
+    offsets, targets, arcs = graph.csr()
+    costs = graph.costs
+    n = graph.node_bound()
+    potential = [0]*n
+    passes = [0]*n
+    queue = deque(graph.nodes())
+    queued = [False]*n
+    for node in queue:
+        queued[node] = True
+    while queue:
+        node = queue.popleft()
+        queued[node] = False
+        passes[node] += 1
+        if passes[node] > n:
+            raise ValueError('Negative cost cycle')
+        for i in range(offsets[node], offsets[node+1]):
+            target = targets[i]
+            if potential[node] + costs[arcs[i]] < potential[target]:
+                potential[target] = potential[node] + costs[arcs[i]]
+                if not queued[target]:
+                    queued[target] = True
+                    queue.append(target)
+    return potential
+
+_shard_graph = None #(offsets, targets, reduced costs per CSR slot) in a worker process
+
+def _init_shard(offsets: List[int], targets: List[int], weights: List[int]):
+    global _shard_graph
+    _shard_graph = (offsets, targets, weights)
+
+def _run_shard(sources: List[int]) -> Tuple[List[Dict[int, int]], int]:
+    return dijkstra_rows(*_shard_graph, sources)
+
+def dijkstra_rows(offsets: List[int], targets: List[int], weights: List[int], sources: List[int]) -> Tuple[List[Dict[int, int]], int]: #(distances per source, nodes settled)
+    rows = []
+    settled = 0
+    for source in sources:
+        dist = {source: 0}
+        heap = [(0, source)]
+        done = set()
+        while heap:
+            cost, node = heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            for i in range(offsets[node], offsets[node+1]):
+                target = targets[i]
+                new_cost = cost + weights[i]
+                if target not in dist or new_cost < dist[target]:
+                    dist[target] = new_cost
+                    heappush(heap, (new_cost, target))
+        settled += len(done)
+        rows.append(dist)
+    return rows, settled
+
+def repeated_dijkstra(graph: CoreGraph, sources: List[int], workers: int = None, stats: Dict[str, int] = None) -> Dict[int, Dict[int, int]]: #One Dijkstra per source, Johnson reweighted and sharded over processes
+    offsets, targets, arcs = graph.csr()
+    potential = johnson_potentials(graph)
+    if potential is None:
+        weights = [graph.costs[edge] for edge in arcs]
+    else:
+        weights = [graph.costs[arcs[i]] + potential[node] - potential[targets[i]] for node in range(len(offsets) - 1) for i in range(offsets[node], offsets[node+1])]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(sources) < 2*workers:
+        rows, settled = dijkstra_rows(offsets, targets, weights, sources)
+    else:
+        size = -(-len(sources)//(4*workers)) #Several shards per worker to even out the load
+        shards = [sources[i:i+size] for i in range(0, len(sources), size)]
+        rows, settled = [], 0
+        with ProcessPoolExecutor(workers, initializer=_init_shard, initargs=(offsets, targets, weights)) as pool:
+            for shard_rows, shard_settled in pool.map(_run_shard, shards):
+                rows.extend(shard_rows)
+                settled += shard_settled
+    add_stat(stats, 'settled', settled)
+    result = dict(zip(sources, rows))
+    if potential is not None:
+        for source, dist in result.items():
+            for target in dist:
+                dist[target] += potential[target] - potential[source]
+    return result
+
+class FlowNetwork: #Residual graph in flat arrays, arc 2*edge runs along the edge and 2*edge+1 against it
+
+    def __init__(self, graph: CoreGraph, capacities: List[int] = None):
+        if capacities is None:
+            capacities = graph.weights
+        tails, heads = graph.tails, graph.heads
+        self.node_bound = graph.node_bound()
+        self.head = [0]*(2*graph.edge_bound()) #[arc: node it enters]
+        self.capacity = [0]*(2*graph.edge_bound()) #[arc: residual capacity]
+        for edge in graph.edges():
+            self.head[2*edge] = heads[edge]
+            self.head[2*edge+1] = tails[edge]
+            self.capacity[2*edge] = capacities[edge]
+            if not graph.directed:
+                self.capacity[2*edge+1] = capacities[edge]
+        self.initial = list(self.capacity)
+        self.offsets = [0] #Arcs leaving node u are arcs[offsets[u]:offsets[u+1]]
+        self.arcs = []
+        offsets, targets, edges = graph.csr()
+        if graph.directed:
+            reverse = graph.reverse_csr()
+        for node in range(self.node_bound):
+            for i in range(offsets[node], offsets[node+1]):
+                edge = edges[i]
+                if tails[edge] != heads[edge]:
+                    self.arcs.append(2*edge if tails[edge] == node else 2*edge+1)
+            if graph.directed:
+                for i in range(reverse.offsets[node], reverse.offsets[node+1]):
+                    edge = reverse.edges[i]
+                    if tails[edge] != heads[edge]:
+                        self.arcs.append(2*edge+1)
+            self.offsets.append(len(self.arcs))
+
+    def flows(self, graph: CoreGraph) -> Dict[int, int]: #{edge: flow}, negative when an undirected edge carries flow head to tail
+        capacity, initial = self.capacity, self.initial
+        return {edge: initial[2*edge] - capacity[2*edge] for edge in graph.edges()}
+
+    def reachable(self, source: int) -> Set[int]: #Source side of the minimum cut once the flow is maximum
+        offsets, arcs, head, capacity = self.offsets, self.arcs, self.head, self.capacity
+        seen = {source}
+        queue = [source]
+        for node in queue:
+            for i in range(offsets[node], offsets[node+1]):
+                arc = arcs[i]
+                if capacity[arc] > 0 and head[arc] not in seen:
+                    seen.add(head[arc])
+                    queue.append(head[arc])
+        return seen
+
+def max_flow(graph: CoreGraph, source: int, sink: int, method: str = 'auto', budget: Budget = None, stats: Dict[str, int] = None) -> Tuple[Dict[int, int], Set[int]]: #(flow per edge, source side of min cut)
+    network = FlowNetwork(graph)
+    if method == 'dinic':
+        dinic(network, source, sink, budget, stats)
+    elif method in ('auto', 'push_relabel'): #Measured slightly ahead of Dinic on both layered and random networks
+        push_relabel(network, source, sink, budget, stats)
+    else:
+        raise ValueError(f'Unknown max flow method {method!r}')
+    return network.flows(graph), network.reachable(source)
+
+def dinic(network: FlowNetwork, source: int, sink: int, budget: Budget = None, stats: Dict[str, int] = None) -> int: #Flow value, BFS level graphs and current-arc DFS
+    offsets, arcs, head, capacity = network.offsets, network.arcs, network.head, network.capacity
+    total = 0
+    phases = augmentations = 0
+    if source == sink:
+        return total
+    while True:
+        if budget is not None:
+            budget.check()
+        level = [-1]*network.node_bound
+        level[source] = 0
+        queue = [source]
+        for node in queue:
+            if level[node] == level[sink]: #Nodes at or past the sink's level are never on a shortest path
+                break
+            for i in range(offsets[node], offsets[node+1]):
+                arc = arcs[i]
+                if capacity[arc] > 0 and level[head[arc]] < 0:
+                    level[head[arc]] = level[node] + 1
+                    queue.append(head[arc])
+        if level[sink] < 0:
+            break
+        phases += 1
+        pointer = offsets[:-1] #Current arc per node
+        path = [] #Arcs from the source to node
+        node = source
+        while True:
+            if node == sink:
+                pushed = min(capacity[arc] for arc in path)
+                for arc in path:
+                    capacity[arc] -= pushed
+                    capacity[arc ^ 1] += pushed
+                total += pushed
+                augmentations += 1
+                for i, arc in enumerate(path): #Retreat to the tail of the first saturated arc
+                    if not capacity[arc]:
+                        del path[i:]
+                        break
+                node = head[path[-1]] if path else source
+                continue
+            end = offsets[node+1]
+            i = pointer[node]
+            while i < end:
+                arc = arcs[i]
+                if capacity[arc] > 0 and level[head[arc]] == level[node] + 1:
+                    break
+                i += 1
+            pointer[node] = i
+            if i < end:
+                path.append(arcs[i])
+                node = head[arcs[i]]
+            else: #Dead end, drop the node from this level graph
+                level[node] = -1
+                if not path:
+                    break
+                path.pop()
+                node = head[path[-1]] if path else source
+    add_stat(stats, 'phases', phases)
+    add_stat(stats, 'augmentations', augmentations)
+    return total
+
+def push_relabel(network: FlowNetwork, source: int, sink: int, budget: Budget = None, stats: Dict[str, int] = None) -> int: #Flow value, FIFO order with gap and global relabeling
+    offsets, arcs, head, capacity = network.offsets, network.arcs, network.head, network.capacity
+    n = network.node_bound
+    if source == sink:
+        return 0
+    height = [0]*n
+    excess = [0]*n
+    count = [0]*(2*n+1) #Nodes per height below n, for the gap heuristic
+    active = [False]*n
+    pointer = offsets[:-1]
+    pushes = relabels = global_relabels = 0
+
+    def global_relabel(): #Exact distances to the sink, then back to the source for stranded excess
+        for node in range(n):
+            height[node] = 2*n
+        for i in range(n):
+            count[i] = 0
+        for root, base in ((sink, 0), (source, n)):
+            height[root] = base
+            queue = [root]
+            for node in queue:
+                if base == 0:
+                    count[height[node]] += 1
+                for i in range(offsets[node], offsets[node+1]):
+                    arc = arcs[i]
+                    previous = head[arc]
+                    if capacity[arc ^ 1] > 0 and height[previous] == 2*n and previous != source:
+                        height[previous] = height[node] + 1
+                        queue.append(previous)
+        for node in range(n):
+            pointer[node] = offsets[node]
+
+    height[source] = n
+    for i in range(offsets[source], offsets[source+1]):
+        arc = arcs[i]
+        pushed = capacity[arc]
+        if pushed > 0:
+            capacity[arc] = 0
+            capacity[arc ^ 1] += pushed
+            excess[head[arc]] += pushed
+            excess[source] -= pushed
+    global_relabel()
+    queue = deque(node for node in range(n) if excess[node] > 0 and node != source and node != sink)
+    for node in queue:
+        active[node] = True
+    work = 0
+    interval = n + len(arcs) #Relabel work between global relabels
+    while queue:
+        if work > interval:
+            if budget is not None:
+                budget.check()
+            global_relabel()
+            global_relabels += 1
+            work = 0
+        node = queue.popleft()
+        active[node] = False
+        end = offsets[node+1]
+        while excess[node] > 0:
+            i = pointer[node]
+            if i == end: #Relabel to just above the lowest residual neighbor
+                old = height[node]
+                lowest = 2*n
+                for j in range(offsets[node], end):
+                    arc = arcs[j]
+                    if capacity[arc] > 0 and height[head[arc]] < lowest:
+                        lowest = height[head[arc]]
+                height[node] = min(lowest + 1, 2*n)
+                pointer[node] = offsets[node]
+                relabels += 1
+                work += end - offsets[node] + 12
+                if old < n:
+                    count[old] -= 1
+                    if not count[old]: #Gap, nodes above it can no longer reach the sink
+                        for other in range(n):
+                            if old < height[other] < n:
+                                count[height[other]] -= 1
+                                height[other] = n + 1
+                        if height[node] < n:
+                            height[node] = n + 1
+                if height[node] < n:
+                    count[height[node]] += 1
+                if height[node] >= 2*n:
+                    break
+                continue
+            arc = arcs[i]
+            target = head[arc]
+            if capacity[arc] > 0 and height[node] == height[target] + 1:
+                pushed = min(excess[node], capacity[arc])
+                capacity[arc] -= pushed
+                capacity[arc ^ 1] += pushed
+                excess[node] -= pushed
+                excess[target] += pushed
+                pushes += 1
+                if not active[target] and target != source and target != sink:
+                    active[target] = True
+                    queue.append(target)
+            else:
+                pointer[node] = i + 1
+    add_stat(stats, 'pushes', pushes)
+    add_stat(stats, 'relabels', relabels)
+    add_stat(stats, 'global_relabels', global_relabels)
+    return excess[sink]
+
+NETWORK_SIMPLEX_EDGES = 5000 #'auto' switches from successive shortest paths to network simplex above this many edges, near the measured crossover
+
+def min_cost_flow(graph: DCoreGraph, source: int, sink: int, demand: int, method: str = 'auto', budget: Budget = None, stats: Dict[str, int] = None) -> Dict[int, int]: #{edge: flow} sending up to demand at least cost
+    if method == 'auto':
+        method = 'network_simplex' if graph.edge_count() > NETWORK_SIMPLEX_EDGES else 'ssp'
+    if method == 'ssp':
+        network = FlowNetwork(graph)
+        successive_shortest_paths(network, graph.costs, source, sink, demand, budget, stats)
+        return network.flows(graph)
+    if method == 'network_simplex':
+        return network_simplex(graph, source, sink, demand, budget, stats)
+    raise ValueError(f'Unknown min cost flow method {method!r}')
+
+def successive_shortest_paths(network: FlowNetwork, costs: List[int], source: int, sink: int, demand: int, budget: Budget = None, stats: Dict[str, int] = None) -> int: #Flow sent, Dijkstra on reduced costs with Johnson potentials
+    offsets, arcs, head, capacity = network.offsets, network.arcs, network.head, network.capacity
+    n = network.node_bound
+    cost = [0]*len(head) #[arc: cost], negated on reverse arcs
+    for arc in arcs:
+        cost[arc] = -costs[arc >> 1] if arc & 1 else costs[arc >> 1]
+    potential = [0]*n
+    if any(cost[arc] < 0 and capacity[arc] > 0 for arc in arcs):
+        potential = bellman_ford_potentials(network, cost, source)
+    sent = settled = augmentations = 0
+    while sent < demand and source != sink:
+        if budget is not None:
+            budget.check()
+        dist = {source: 0}
+        via = {} #{node: arc used to reach it}
+        heap = [(0, source)]
+        while heap:
+            d, node = heappop(heap)
+            if d > dist[node]:
+                continue
+            settled += 1
+            if node == sink:
+                break
+            base = potential[node]
+            for i in range(offsets[node], offsets[node+1]):
+                arc = arcs[i]
+                if capacity[arc] > 0:
+                    target = head[arc]
+                    new_dist = d + cost[arc] + base - potential[target]
+                    if target not in dist or new_dist < dist[target]:
+                        dist[target] = new_dist
+                        via[target] = arc
+                        heappush(heap, (new_dist, target))
+        if sink not in via:
+            break
+        limit = dist[sink]
+        for node in range(n): #Keeps every reduced cost non-negative
+            potential[node] += min(dist.get(node, limit), limit)
+        path = []
+        node = sink
+        while node != source:
+            arc = via[node]
+            path.append(arc)
+            node = head[arc ^ 1]
+        pushed = min(demand - sent, min(capacity[arc] for arc in path))
+        for arc in path:
+            capacity[arc] -= pushed
+            capacity[arc ^ 1] += pushed
+        sent += pushed
+        augmentations += 1
+    add_stat(stats, 'settled', settled)
+    add_stat(stats, 'augmentations', augmentations)
+    return sent
+
+def bellman_ford_potentials(network: FlowNetwork, cost: List[int], source: int) -> List[int]: #Shortest distances from source for negative costs
+    offsets, arcs, head, capacity = network.offsets, network.arcs, network.head, network.capacity
+    n = network.node_bound
+    dist = [0]*n
+    reached = [False]*n
+    reached[source] = True
+    passes = [0]*n
+    queue = deque([source])
+    queued = [False]*n
+    queued[source] = True
+    while queue:
+        node = queue.popleft()
+        queued[node] = False
+        passes[node] += 1
+        if passes[node] > n:
+            raise ValueError('Negative cost cycle reachable from the source')
+        for i in range(offsets[node], offsets[node+1]):
+            arc = arcs[i]
+            target = head[arc]
+            if capacity[arc] > 0 and (not reached[target] or dist[node] + cost[arc] < dist[target]):
+                dist[target] = dist[node] + cost[arc]
+                reached[target] = True
+                if not queued[target]:
+                    queued[target] = True
+                    queue.append(target)
+    return dist
+
+def network_simplex(graph: DCoreGraph, source: int, sink: int, demand: int, budget: Budget = None, stats: Dict[str, int] = None) -> Dict[int, int]: #Primal simplex on a spanning tree with block search pivoting
+    index = {node: i for i, node in enumerate(graph.nodes())}
+    edges = [edge for edge in graph.edges() if graph.tails[edge] != graph.heads[edge] and graph.weights[edge] > 0] #Zero-capacity arcs would re-enter forever
+    n = len(index)
+    root = n
+    tails = [index[graph.tails[edge]] for edge in edges]
+    heads = [index[graph.heads[edge]] for edge in edges]
+    upper = [graph.weights[edge] for edge in edges]
+    cost = [graph.costs[edge] for edge in edges]
+    flow = {edge: 0 for edge in graph.edges()}
+    supply = [0]*n
+    if source != sink and demand > 0:
+        tails.append(index[source]) #Costly direct arc keeps the problem feasible when demand exceeds the max flow
+        heads.append(index[sink])
+        upper.append(demand)
+        cost.append(sum(abs(c) for c in cost) + 1)
+        supply[index[source]] = demand
+        supply[index[sink]] = -demand
+    e = len(cost)
+    if not e:
+        return flow
+    infinity = 3*max(sum(upper), sum(abs(c) for c in cost), demand)
+    x = [0]*e + [abs(s) for s in supply]
+    for node in range(n): #Initial tree of artificial arcs through the root
+        if supply[node] >= 0:
+            tails.append(node)
+            heads.append(root)
+        else:
+            tails.append(root)
+            heads.append(node)
+        upper.append(infinity)
+        cost.append(infinity)
+    pi = [infinity if s >= 0 else -infinity for s in supply] + [0] #Potentials, reduced cost is cost - pi[tail] + pi[head]
+    parent = [root]*n + [None]
+    tree_edge = list(range(e, e + n)) + [None] #Arc to the parent
+    size = [1]*n + [n + 1] #Subtree sizes
+    following = list(range(1, n + 1)) + [0] #Depth-first thread
+    preceding = [root] + list(range(n))
+    last = list(range(n)) + [n - 1] #Last descendant in thread order
+
+    def reduced_cost(i: int) -> int:
+        c = cost[i] - pi[tails[i]] + pi[heads[i]]
+        return c if x[i] == 0 else -c
+
+    def residual(i: int, p: int) -> int:
+        return upper[i] - x[i] if tails[i] == p else x[i]
+
+    def trace(p: int, w: int) -> Tuple[List[int], List[int]]:
+        nodes = [p]
+        arcs = []
+        while p != w:
+            arcs.append(tree_edge[p])
+            p = parent[p]
+            nodes.append(p)
+        return nodes, arcs
+
+    def apex(p: int, q: int) -> int:
+        size_p, size_q = size[p], size[q]
+        while True:
+            while size_p < size_q:
+                p = parent[p]
+                size_p = size[p]
+            while size_p > size_q:
+                q = parent[q]
+                size_q = size[q]
+            if size_p == size_q:
+                if p == q:
+                    return p
+                p = parent[p]
+                size_p = size[p]
+                q = parent[q]
+                size_q = size[q]
+
+    def cycle(i: int, p: int, q: int) -> Tuple[List[int], List[int]]:
+        w = apex(p, q)
+        nodes, arcs = trace(p, w)
+        nodes.reverse()
+        arcs.reverse()
+        if arcs != [i]:
+            arcs.append(i)
+        other_nodes, other_arcs = trace(q, w)
+        del other_nodes[-1]
+        return nodes + other_nodes, arcs + other_arcs
+
+    def detach(s: int, t: int):
+        size_t = size[t]
+        prev_t = preceding[t]
+        last_t = last[t]
+        next_last_t = following[last_t]
+        parent[t] = None
+        tree_edge[t] = None
+        following[prev_t] = next_last_t
+        preceding[next_last_t] = prev_t
+        following[last_t] = t
+        preceding[t] = last_t
+        while s is not None:
+            size[s] -= size_t
+            if last[s] == last_t:
+                last[s] = prev_t
+            s = parent[s]
+
+    def reroot(q: int): #Make q the root of its detached subtree
+        ancestors = []
+        while q is not None:
+            ancestors.append(q)
+            q = parent[q]
+        ancestors.reverse()
+        for p, q in zip(ancestors, ancestors[1:]):
+            size_p = size[p]
+            last_p = last[p]
+            prev_q = preceding[q]
+            last_q = last[q]
+            next_last_q = following[last_q]
+            parent[p] = q
+            parent[q] = None
+            tree_edge[p] = tree_edge[q]
+            tree_edge[q] = None
+            size[p] = size_p - size[q]
+            size[q] = size_p
+            following[prev_q] = next_last_q
+            preceding[next_last_q] = prev_q
+            following[last_q] = q
+            preceding[q] = last_q
+            if last_p == last_q:
+                last[p] = prev_q
+                last_p = prev_q
+            preceding[p] = last_q
+            following[last_q] = p
+            following[last_p] = q
+            preceding[q] = last_p
+            last[q] = last_p
+
+    def attach(i: int, p: int, q: int):
+        last_p = last[p]
+        next_last_p = following[last_p]
+        size_q = size[q]
+        last_q = last[q]
+        parent[q] = p
+        tree_edge[q] = i
+        following[last_p] = q
+        preceding[q] = last_p
+        preceding[next_last_p] = last_q
+        following[last_q] = next_last_p
+        while p is not None:
+            size[p] += size_q
+            if last[p] == last_p:
+                last[p] = last_q
+            p = parent[p]
+
+    def shift_potentials(i: int, p: int, q: int):
+        d = pi[p] - cost[i] - pi[q] if q == heads[i] else pi[p] + cost[i] - pi[q]
+        node = q
+        end = last[q]
+        while True:
+            pi[node] += d
+            if node == end:
+                break
+            node = following[node]
+
+    block = max(int(math.sqrt(e)), 1)
+    start = 0
+    unchanged = 0 #Consecutive blocks without an improving arc
+    pivots = 0
+    while unchanged < (e + block - 1)//block:
+        best = None
+        best_cost = 0
+        for k in range(start, start + block):
+            i = k % e
+            c = reduced_cost(i)
+            if c < best_cost:
+                best, best_cost = i, c
+        start = (start + block) % e
+        if best is None:
+            unchanged += 1
+            continue
+        unchanged = 0
+        pivots += 1
+        if budget is not None and not pivots & 255:
+            budget.check()
+        i = best
+        p, q = (tails[i], heads[i]) if x[i] == 0 else (heads[i], tails[i])
+        nodes, arcs = cycle(i, p, q)
+        j, s = min(zip(reversed(arcs), reversed(nodes)), key=lambda pair: residual(*pair)) #Leaving arc, the last bottleneck around the cycle
+        t = heads[j] if tails[j] == s else tails[j]
+        delta = residual(j, s)
+        for arc, node in zip(arcs, nodes):
+            if tails[arc] == node:
+                x[arc] += delta
+            else:
+                x[arc] -= delta
+        if i != j:
+            if parent[t] != s:
+                s, t = t, s
+            if arcs.index(i) > arcs.index(j):
+                p, q = q, p
+            detach(s, t)
+            reroot(q)
+            attach(i, p, q)
+            shift_potentials(i, p, q)
+    add_stat(stats, 'pivots', pivots)
+    for k, edge in enumerate(edges):
+        flow[edge] = x[k]
+    return flow
@@ -0,0 +1,273 @@
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, TextIO, Tuple
+from graph_core import CoreGraph, DCoreGraph, UCoreGraph
+import algorithms
+import argparse
+import graph_io
+import json
+import os
+import signal
+import sys
+import time
+try:
+    import resource
+except ImportError: #Not on Windows, memory limits are skipped there
+    resource = None
+
+SAVED_SUFFIXES = ('.ngraph',)
+DIMACS_SUFFIXES = ('.dimacs', '.max', '.min', '.sp', '.col')
+EDGE_LIST_SUFFIXES = ('.edges', '.edgelist', '.el', '.txt')
+TIMEOUT_GRACE = 1 #Seconds past the budget before the alarm stops an algorithm that does not poll it
+ATTEMPTS = 2 #Runs of a task caught in a crashed pool before it is reported as the crash
+
+class TaskTimeout(Exception): #Raised by the alarm in a worker
+    pass
+
+class Instance(NamedTuple): #Graph read from a file with the terminals its format designates
+    graph: CoreGraph
+    source: Optional[int]
+    sink: Optional[int]
+    demand: Optional[int]
+
+def load(path: str, directed: bool = False) -> Instance: #By suffix, anything not saved or DIMACS is read as an edge list
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in SAVED_SUFFIXES:
+        return Instance(graph_io.load(path), None, None, None)
+    if suffix in DIMACS_SUFFIXES:
+        problem = graph_io.read_dimacs(path)
+        return Instance(problem.graph, problem.source, problem.sink, problem.supplies.get(problem.source))
+    return Instance(graph_io.read_edge_list(path, directed)[0], None, None, None)
+
+def undirected(graph: CoreGraph) -> UCoreGraph: #Loaded graphs have dense node ids, so ids carry over
+    if not graph.directed:
+        return graph
+    result = UCoreGraph()
+    result.add_nodes(graph.positions)
+    result.add_edges((graph.tails[edge], graph.heads[edge], graph.weights[edge], graph.costs[edge]) for edge in graph.edges())
+    return result
+
+def directed(graph: CoreGraph) -> DCoreGraph: #Each undirected edge becomes a pair of opposite arcs
+    if graph.directed:
+        return graph
+    result = DCoreGraph()
+    result.add_nodes(graph.positions)
+
+    def arcs():
+        for edge in graph.edges():
+            u, v, weight, cost = graph.tails[edge], graph.heads[edge], graph.weights[edge], graph.costs[edge]
+            yield (u, v, weight, cost)
+            yield (v, u, weight, cost)
+
+    result.add_edges(arcs())
+    return result
+
+def terminals(instance: Instance, options: Dict) -> Tuple[int, int]: #The file's, else the options', else the first and last node
+    nodes = list(instance.graph.nodes())
+    source = instance.source if instance.source is not None else options.get('source')
+    sink = instance.sink if instance.sink is not None else options.get('sink')
+    return nodes[0] if source is None else source, nodes[-1] if sink is None else sink
+
+def flow_value(graph: CoreGraph, flow: Dict[int, int], source: int) -> int:
+    return sum(flow.get(edge, 0) for edge, node in graph.out_edges(source)) - sum(flow.get(edge, 0) for edge, node in graph.in_edges(source))
+
+def run_mst(instance: Instance, budget: algorithms.Budget, stats: Dict[str, int], options: Dict) -> Dict:
+    graph = undirected(instance.graph)
+    tree = algorithms.minimum_spanning_forest(graph, stats=stats)
+    return {'edges': len(tree), 'weight': sum(graph.weights[edge] for edge in tree)}
+
+def run_hamiltonian(instance: Instance, budget: algorithms.Budget, stats: Dict[str, int], options: Dict) -> Dict:
+    cycle = algorithms.hamiltonian_cycle(undirected(instance.graph), budget, stats=stats)
+    return {'found': cycle is not None, 'edges': None if cycle is None else len(cycle)}
+
+def run_matching(instance: Instance, budget: algorithms.Budget, stats: Dict[str, int], options: Dict) -> Dict:
+    matching, exposed = algorithms.max_matching(undirected(instance.graph), budget=budget, stats=stats)
+    return {'size': len(matching), 'exposed': len(exposed)}
+
+def run_cover(instance: Instance, budget: algorithms.Budget, stats: Dict[str, int], options: Dict) -> Dict: #Exact searches that run out of budget give their best cover
+    return {'size': len(algorithms.min_vertex_cover(undirected(instance.graph), budget=budget, stats=stats))}
+
+def run_shortest_path(instance: Instance, budget: algorithms.Budget, stats: Dict[str, int], options: Dict) -> Dict:
+    graph = instance.graph
+    source, sink = terminals(instance, options)
+    path = algorithms.shortest_path(graph, source, sink, stats=stats)
+    return {'source': source, 'sink': sink, 'reachable': bool(path) or source == sink, 'edges': len(path), 'cost': sum(graph.costs[edge] for edge in path)}
+
+def run_max_flow(instance: Instance, budget: algorithms.Budget, stats: Dict[str, int], options: Dict) -> Dict:
+    graph = directed(instance.graph)
+    source, sink = terminals(instance, options)
+    flow, cut = algorithms.max_flow(graph, source, sink, budget=budget, stats=stats)
+    return {'source': source, 'sink': sink, 'value': flow_value(graph, flow, source), 'cut': len(cut)}
+
+def run_min_cost_flow(instance: Instance, budget: algorithms.Budget, stats: Dict[str, int], options: Dict) -> Dict: #Without a demand from the file or options it sends the maximum flow
+    graph = directed(instance.graph)
+    source, sink = terminals(instance, options)
+    demand = instance.demand if instance.demand is not None else options.get('demand')
+    if demand is None:
+        demand = flow_value(graph, algorithms.max_flow(graph, source, sink, budget=budget)[0], source)
+    flow = algorithms.min_cost_flow(graph, source, sink, demand, budget=budget, stats=stats)
+    return {'source': source, 'sink': sink, 'demand': demand, 'sent': flow_value(graph, flow, source), 'cost': sum(graph.costs[edge]*value for edge, value in flow.items())}
+
+ALGORITHMS: Dict[str, Callable[[Instance, algorithms.Budget, Dict[str, int], Dict], Dict]] = {
+    'mst': run_mst,
+    'hamiltonian': run_hamiltonian,
+    'matching': run_matching,
+    'cover': run_cover,
+    'shortest_path': run_shortest_path,
+    'max_flow': run_max_flow,
+    'min_cost_flow': run_min_cost_flow
+}
+
+def _alarm(signum, frame):
+    raise TaskTimeout()
+
+def _init_worker(memory: Optional[int]): #Address space limit in bytes, the parent handles Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, 'SIGALRM'):
+        signal.signal(signal.SIGALRM, _alarm)
+    if memory is not None and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+def run_task(path: str, algorithm: str, timeout: Optional[float], options: Dict) -> Dict: #JSON record of one algorithm on one file, failures included
+    record = {'file': path, 'algorithm': algorithm}
+    stats = {}
+    alarm = timeout is not None and hasattr(signal, 'SIGALRM')
+    start = time.perf_counter()
+    try:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, timeout + TIMEOUT_GRACE)
+        budget = algorithms.Budget(timeout)
+        instance = load(path, options.get('directed', False))
+        record['nodes'] = instance.graph.node_count()
+        record['edges'] = instance.graph.edge_count()
+        record['result'] = ALGORITHMS[algorithm](instance, budget, stats, options)
+        record['status'] = 'ok'
+    except (TaskTimeout, algorithms.SearchCancelled):
+        record['status'] = 'timeout'
+    except MemoryError:
+        record['status'] = 'memory'
+    except Exception as error:
+        record['status'] = 'error'
+        record['error'] = f'{type(error).__name__}: {error}'
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    record['seconds'] = time.perf_counter() - start
+    record['ops'] = stats
+    return record
+
+def graph_files(paths: Iterable[str]) -> Iterator[str]: #Files as given, directories walked in sorted order for known suffixes
+    suffixes = SAVED_SUFFIXES + DIMACS_SUFFIXES + EDGE_LIST_SUFFIXES
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, directories, files in os.walk(path):
+            directories.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in suffixes:
+                    yield os.path.join(root, name)
+
+def finished(output: str) -> Set[Tuple[str, str]]: #(file, algorithm) pairs already in an output file, a last line torn by a crash is cut off
+    done = set()
+    if not os.path.exists(output):
+        return done
+    end = 0
+    with open(output, 'r+b') as file:
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            end += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            done.add((record['file'], record['algorithm']))
+        file.truncate(end)
+    return done
+
+def run_batch(tasks: Iterable[Tuple[str, str]], output: TextIO, workers: int = None, timeout: float = None, memory: int = None, options: Dict = None) -> Dict[str, int]: #Records are written as they finish, returns the count per status
+    workers = workers or os.cpu_count() or 1
+    options = options or {}
+    tasks = iter(tasks)
+    retry = [] #Tasks that were running when a worker died
+    attempts = {}
+    counts = {}
+    running = {} #{future: task}, at most two per worker so the file walk stays lazy
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(memory,))
+
+    def write(record: Dict):
+        output.write(json.dumps(record) + '\n')
+        output.flush()
+        counts[record['status']] = counts.get(record['status'], 0) + 1
+
+    def collect(future, task: Tuple[str, str]) -> bool: #Writes the record, False if the task was lost with its worker
+        try:
+            write(future.result())
+            return True
+        except BrokenProcessPool: #Run again unless it already took a pool down before
+            attempts[task] = attempts.get(task, 0) + 1
+            if attempts[task] < ATTEMPTS:
+                retry.append(task)
+            else:
+                write({'file': task[0], 'algorithm': task[1], 'status': 'crashed'})
+            return False
+
+    try:
+        while True:
+            while len(running) < 2*workers:
+                task = retry.pop() if retry else next(tasks, None)
+                if task is None:
+                    break
+                running[pool.submit(run_task, *task, timeout, options)] = task
+            if not running:
+                break
+            done, pending = wait(running, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                broken |= not collect(future, running.pop(future))
+            if broken: #A worker died and took the pool with it, the rest of its tasks fail too
+                for future in list(running):
+                    collect(future, running.pop(future))
+                pool.shutdown(wait=True)
+                pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(memory,))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return counts
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run algorithms over graph files without the window, one JSON line per file and algorithm')
+    parser.add_argument('paths', nargs='+', help='graph files, or directories searched for .ngraph, DIMACS and edge-list files')
+    parser.add_argument('-a', '--algorithms', default=','.join(ALGORITHMS), help='comma-separated, from ' + ', '.join(ALGORITHMS))
+    parser.add_argument('-o', '--output', help='JSON Lines file, standard output by default')
+    parser.add_argument('--resume', action='store_true', help='append to the output, skipping files and algorithms it already has')
+    parser.add_argument('-j', '--workers', type=int, help='worker processes, one per CPU by default')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds per file and algorithm, 0 for none')
+    parser.add_argument('--memory', type=int, help='address space limit per worker in MiB')
+    parser.add_argument('--directed', action='store_true', help='read edge lists as directed')
+    parser.add_argument('--source', type=int, help='source node id where the file designates none, the first node by default')
+    parser.add_argument('--sink', type=int, help='sink node id where the file designates none, the last node by default')
+    parser.add_argument('--demand', type=int, help='min cost flow demand where the file designates none, the maximum flow by default')
+    args = parser.parse_args(argv)
+    names = [name.strip() for name in args.algorithms.split(',') if name.strip()]
+    for name in names:
+        if name not in ALGORITHMS:
+            parser.error(f'unknown algorithm {name!r}')
+    if args.resume and args.output is None:
+        parser.error('--resume needs --output')
+    done = finished(args.output) if args.resume else set()
+    tasks = ((path, name) for path in graph_files(args.paths) for name in names if (path, name) not in done)
+    options = {'directed': args.directed, 'source': args.source, 'sink': args.sink, 'demand': args.demand}
+    memory = None if args.memory is None else args.memory*1024*1024
+    output = sys.stdout if args.output is None else open(args.output, 'a' if args.resume else 'w')
+    try:
+        counts = run_batch(tasks, output, args.workers, args.timeout or None, memory, options)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(', '.join(f'{count} {status}' for status, count in sorted(counts.items())) or 'nothing to run', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
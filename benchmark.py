@@ -0,0 +1,857 @@
+from __future__ import annotations
+from queue import PriorityQueue
+from typing import Callable, Dict, List, Tuple
+from graph_core import CoreGraph, DCoreGraph, UCoreGraph
+from spatial import GridIndex
+import algorithms
+import argparse
+import graph_io
+import json
+import math
+import os
+import pickle
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+def random_bipartite(graph: CoreGraph, n: int, m: int, seed: int = 0) -> CoreGraph: #First n//2 nodes on one side, edges leave that side when directed
+    rng = random.Random(seed)
+    nodes = [graph.add_node((rng.random(), rng.random())) for i in range(n)]
+    pairs = set()
+    while graph.edge_count() < m:
+        u, v = rng.randrange(n//2), rng.randrange(n//2, n)
+        if (u, v) not in pairs:
+            pairs.add((u, v))
+            graph.add_edge(nodes[u], nodes[v], rng.randint(1, 9), rng.randint(1, 9))
+    return graph
+
+def random_graph(graph: CoreGraph, n: int, m: int, seed: int = 0) -> CoreGraph:
+    rng = random.Random(seed)
+    nodes = [graph.add_node((rng.random(), rng.random())) for i in range(n)]
+    while graph.edge_count() < m:
+        u, v = rng.sample(nodes, 2)
+        if graph.find_edge(u, v) is None:
+            graph.add_edge(u, v, rng.randint(1, 9), rng.randint(1, 9))
+    return graph
+
+def ring_graph(graph: CoreGraph, n: int, chords: int, seed: int = 0) -> CoreGraph: #Cycle through every node plus random chords, so a Hamiltonian cycle exists
+    rng = random.Random(seed)
+    nodes = [graph.add_node((rng.random(), rng.random())) for i in range(n)]
+    for i in range(n):
+        graph.add_edge(nodes[i-1], nodes[i], rng.randint(1, 9), rng.randint(1, 9))
+    while graph.edge_count() < n + chords:
+        u, v = rng.sample(nodes, 2)
+        if graph.find_edge(u, v) is None:
+            graph.add_edge(u, v, rng.randint(1, 9), rng.randint(1, 9))
+    return graph
+
+def layered_network(graph: CoreGraph, layers: int, width: int, seed: int = 0) -> CoreGraph: #Source node 0, sink node 1
+    rng = random.Random(seed)
+    source, sink = graph.add_node(), graph.add_node()
+    previous = [source]
+    for layer in range(layers):
+        current = [graph.add_node() for i in range(width)]
+        for v in current:
+            for u in rng.sample(previous, min(3, len(previous))):
+                graph.add_edge(u, v, rng.randint(1, 9))
+        previous = current
+    for u in previous:
+        graph.add_edge(u, sink, rng.randint(1, 9))
+    return graph
+
+class ScanningUCoreGraph(UCoreGraph): #Edge lookup by scanning every edge, as get_edge did before the pair index
+
+    def find_edge(self, u, v):
+        for edge in self.edges():
+            if {self.tails[edge], self.heads[edge]} == {u, v}:
+                return edge
+        return None
+
+def timed(function: Callable, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+def report(title: str, header: List[str], rows: List[List]):
+    print(title)
+    print(''.join(str(cell).rjust(14) for cell in header))
+    for row in rows:
+        print(''.join((f'{cell:.4f}' if type(cell) == float else str(cell)).rjust(14) for cell in row))
+    print()
+
+def bench_edge_lookup():
+    rows = []
+    for n in (100, 200, 400):
+        lookups = [(u, v) for u in range(0, n, 7) for v in range(1, n, 11)]
+        times = []
+        for graph_type in (ScanningUCoreGraph, UCoreGraph):
+            graph = random_graph(graph_type(), n, 4*n)
+            times.append(timed(lambda: [graph.find_edge(u, v) for u, v in lookups]))
+        rows.append([n, 4*n, len(lookups)] + times + [times[0]/times[1]])
+    report('find_edge', ['nodes', 'edges', 'lookups', 'scan (s)', 'index (s)', 'speedup'], rows)
+    rows = []
+    for n in (100, 200, 400):
+        times = []
+        for graph_type in (ScanningUCoreGraph, UCoreGraph):
+            graph = random_graph(graph_type(), n, 4*n)
+            times.append(timed(algorithms.max_matching, graph, 'blossom'))
+        rows.append([n, 4*n] + times + [times[0]/times[1]])
+    report('max_matching (find_edge per matched pair)', ['nodes', 'edges', 'scan (s)', 'index (s)', 'speedup'], rows)
+    rows = []
+    for n in (250, 500, 1000):
+        times = []
+        for graph_type in (ScanningUCoreGraph, UCoreGraph):
+            graph = ring_graph(graph_type(), n, n//50) #Few chords keep the search short, the lookups are what differ
+            times.append(timed(algorithms.hamiltonian_cycle, graph))
+        rows.append([n, graph.edge_count()] + times + [times[0]/times[1]])
+    report('hamiltonian_cycle (find_edge per cycle edge)', ['nodes', 'edges', 'scan (s)', 'index (s)', 'speedup'], rows)
+
+def allocated(function: Callable, *args) -> int: #Bytes allocated by Python objects during the call
+    tracemalloc.start()
+    function(*args)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def bench_views():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import node_graph
+
+    class CopyingUGraph(node_graph.UGraph): #Properties return copies, as they did before the views
+
+        @property
+        def nodesG(self):
+            return self._nodesG.copy()
+
+        @nodesG.setter
+        def nodesG(self, nodes):
+            self._nodesG = nodes
+
+        @property
+        def edgesG(self):
+            return list(self._edgesG)
+
+        @edgesG.setter
+        def edgesG(self, edges):
+            self._edgesG = edges
+
+    def frame(graph, positions): #Draws everything straight to the window, the retained scene would hide the property cost
+        for edge in graph.edgesG:
+            edge.drawE(node_graph.WIN)
+        for node in graph.nodesG:
+            graph.draw_node(node, node_graph.WIN)
+        for pos in positions:
+            for node in graph.nodesG:
+                if node_graph.in_range(pos, node.posN, node_graph.SIZE):
+                    break
+            else:
+                for edge in graph.edgesG:
+                    if edge.text_rectE.collidepoint(pos):
+                        break
+            for node in graph.nodesG:
+                len(node.edgesN) + len(node.connectedN)
+
+    node_graph.init_display()
+    rng = random.Random(0)
+    positions = [(rng.randrange(node_graph.WIDTH), rng.randrange(node_graph.WIDTH)) for i in range(20)]
+    rows = []
+    for n in (50, 100, 200, 400):
+        result = [n]
+        for graph_type in (CopyingUGraph, node_graph.UGraph):
+            graph = graph_type()
+            nodes = [node_graph.Node((rng.randrange(node_graph.WIDTH), rng.randrange(node_graph.WIDTH))) for i in range(n)]
+            for node in nodes:
+                graph.add_node(node)
+            for i in range(2*n):
+                u, v = rng.sample(nodes, 2)
+                if v not in u.connectedN:
+                    graph.add_edge(node_graph.UEdge(u, v))
+            result += [allocated(frame, graph, positions), timed(frame, graph, positions)]
+        rows.append(result + [result[1]/max(result[3], 1)])
+    report('frame allocations', ['nodes', 'copy (B)', 'copy (s)', 'view (B)', 'view (s)', 'reduction'], rows)
+
+def recursive_component(graph: CoreGraph, node: int, seen: set) -> set: #Component search as connected_graph did it before Connectivity
+    for neighbor in graph.neighbors(node):
+        if neighbor not in seen:
+            seen.add(neighbor)
+            seen = recursive_component(graph, neighbor, seen)
+    return seen
+
+def bench_connectivity():
+    rows = []
+    for n in (500, 5000, 50000):
+        graph = UCoreGraph()
+        for i in range(n):
+            graph.add_node()
+        for i in range(n - 1): #A path, the deepest case for the recursive search
+            graph.add_edge(i, i + 1)
+        try:
+            legacy = timed(lambda: recursive_component(graph, 0, {0}))
+        except RecursionError:
+            legacy = 'recursion'
+        connectivity = graph.connectivity()
+        rebuild = timed(connectivity.rebuild)
+        query = timed(lambda: [connectivity.is_connected() for i in range(1000)])/1000
+        rng = random.Random(n)
+        pairs = [rng.sample(range(n), 2) for i in range(200)]
+
+        def churn(): #Chords are added and removed again, the component never splits
+            for u, v in pairs:
+                graph.remove_edge(graph.add_edge(u, v))
+                connectivity.is_connected()
+
+        rows.append([n, legacy, rebuild, query*1e6, timed(churn)/len(pairs)*1e6, connectivity.component_count()])
+    report('connectivity (path graphs)', ['nodes', 'recursive (s)', 'rebuild (s)', 'query (us)', 'churn (us)', 'components'], rows)
+
+def bench_mst():
+    rows = []
+    for n, m in ((1000, 5000), (1000, 400000), (10000, 50000), (100000, 1000000)):
+        graph = random_graph(UCoreGraph(), n, m)
+        rng = random.Random(n)
+        for edge in graph.edges():
+            graph.weights[edge] = rng.randint(1, 10**6)
+        graph.csr()
+        times = [timed(algorithms.minimum_spanning_forest, graph, method) for method in ('kruskal', 'prim', 'auto')]
+        rows.append([n, m] + times)
+    report('minimum_spanning_forest', ['nodes', 'edges', 'kruskal (s)', 'prim (s)', 'auto (s)'], rows)
+
+def bench_dynamic_mst():
+    rows = []
+    for n, radius in ((1000, 700), (5000, 300)):
+        graph = random_geometric(UCoreGraph(), n, radius)
+        for edge in graph.edges():
+            graph.weights[edge] = graph.costs[edge]
+        rng = random.Random(n)
+        drags = []
+        for i in range(200): #A node moved a little, every incident edge gets its new length
+            node = rng.randrange(n)
+            x, y = graph.positions[node]
+            pos = (x + rng.randint(-50, 50), y + rng.randint(-50, 50))
+            drags.append((node, pos))
+
+        def drag():
+            for node, pos in drags:
+                graph.set_position(node, pos)
+                for edge, neighbor in list(graph.out_edges(node)):
+                    (x1, y1), (x2, y2) = pos, graph.positions[neighbor]
+                    graph.set_weight(edge, int(math.hypot(x1-x2, y1-y2)))
+
+        edits = [rng.sample(range(n), 2) for i in range(200)]
+
+        def edit():
+            for u, v in edits:
+                edge = graph.add_edge(u, v, rng.randint(1, radius))
+                graph.remove_edge(edge)
+
+        static = timed(lambda: [algorithms.kruskal(graph) for i in range(5)])/5
+        live = algorithms.DynamicMST(graph)
+        row = [n, graph.edge_count(), static*1000, timed(drag)/len(drags)*1000, timed(edit)/len(edits)*1000]
+        live.close()
+        rows.append(row + [live.weight() == sum(graph.weights[edge] for edge in algorithms.kruskal(graph))])
+    report('DynamicMST (ms per update)', ['nodes', 'edges', 'kruskal', 'drag', 'add+remove', 'exact'], rows)
+
+def generalized_petersen(n: int, k: int) -> UCoreGraph: #Cubic, non-Hamiltonian for k = 2 and n = 5 mod 6
+    graph = UCoreGraph()
+    for i in range(2*n):
+        graph.add_node()
+    for i in range(n):
+        graph.add_edge(i, (i+1) % n)
+        graph.add_edge(i, n+i)
+        graph.add_edge(n+i, n+(i+k) % n)
+    return graph
+
+def bench_hamiltonian():
+    rows = []
+    for n, k in ((5, 2), (11, 2), (12, 5), (17, 2), (23, 2)):
+        graph = generalized_petersen(n, k)
+        times = []
+        for method in ('held_karp', 'backtrack', 'auto'):
+            if method == 'held_karp' and graph.node_count() > algorithms.HELD_KARP_LIMIT:
+                times.append('-')
+            else:
+                times.append(timed(algorithms.hamiltonian_cycle, graph, algorithms.Budget(60), method))
+        found = algorithms.hamiltonian_cycle(graph) is not None
+        rows.append([f'GP({n},{k})', graph.node_count(), found] + times)
+    report('hamiltonian_cycle', ['graph', 'nodes', 'cycle', 'held_karp (s)', 'backtrack (s)', 'auto (s)'], rows)
+
+def bench_matching():
+    rows = []
+    for n in (5000, 20000, 50000):
+        for name, graph in (('bipartite', random_bipartite(UCoreGraph(), n, 3*n)), ('general', random_graph(UCoreGraph(), n, 3*n))):
+            graph.csr()
+            times = []
+            for method in ('hopcroft_karp', 'blossom'):
+                if method == 'hopcroft_karp' and name == 'general':
+                    times.append('-')
+                else:
+                    times.append(timed(algorithms.max_matching, graph, method))
+            rows.append([name, n, 3*n, len(algorithms.max_matching(graph)[0])] + times)
+    report('max_matching', ['graph', 'nodes', 'edges', 'matching', 'hk (s)', 'blossom (s)'], rows)
+
+def bench_vertex_cover():
+    rows = []
+    for name, graph in (('bipartite', random_bipartite(UCoreGraph(), 50000, 150000)), ('general', random_graph(UCoreGraph(), 300, 600)),
+                        ('general', random_graph(UCoreGraph(), 1000, 1500)), ('general', random_graph(UCoreGraph(), 50000, 150000))):
+        graph.csr()
+        result = [name, graph.node_count(), graph.edge_count()]
+        for method in ('approx', 'auto'):
+            start = time.perf_counter()
+            cover = algorithms.min_vertex_cover(graph, method, algorithms.Budget(10))
+            result += [len(cover), time.perf_counter() - start]
+        rows.append(result)
+    report('min_vertex_cover (auto budget 10 s)', ['graph', 'nodes', 'edges', 'approx', 'approx (s)', 'auto', 'auto (s)'], rows)
+
+def random_geometric(graph: CoreGraph, n: int, radius: float, seed: int = 0, size: int = 10000) -> CoreGraph: #Nodes within radius joined, cost is the truncated length
+    rng = random.Random(seed)
+    cells = {}
+    for i in range(n):
+        pos = (rng.randrange(size), rng.randrange(size))
+        node = graph.add_node(pos)
+        cells.setdefault((int(pos[0]//radius), int(pos[1]//radius)), []).append(node)
+    for (cx, cy), members in cells.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for v in cells.get((cx+dx, cy+dy), ()):
+                    for u in members:
+                        (x1, y1), (x2, y2) = graph.positions[u], graph.positions[v]
+                        length = math.hypot(x1-x2, y1-y2)
+                        if u < v and length <= radius:
+                            graph.add_edge(u, v, 1, int(length))
+                            if graph.directed:
+                                graph.add_edge(v, u, 1, int(length))
+    return graph
+
+def priority_queue_path(graph: CoreGraph, start: int, end: int) -> List[int]: #Shortest path as it was before heapq, one locked queue of edges
+    costs = graph.costs
+    priority = 0
+    edges = PriorityQueue()
+    for edge, node in graph.out_edges(start):
+        edges.put((costs[edge], priority, edge))
+        priority = priority + 1
+    dist = {start: 0}
+    labeling = {}
+    entering = None
+    while not edges.empty() and entering != end:
+        cost, dummy, arc = edges.get()
+        leaving, entering = graph.endpoints(arc)
+        if entering in dist:
+            continue
+        for edge, node in graph.out_edges(entering):
+            if node not in dist:
+                edges.put((cost + costs[edge], priority, edge))
+                priority = priority + 1
+        dist[entering] = cost
+        labeling[entering] = arc
+    path = []
+    if end in dist:
+        while end != start:
+            path.append(labeling[end])
+            end = graph.other(labeling[end], end)
+    return path[::-1]
+
+def bench_shortest_path():
+    rows = []
+    for n, radius in ((2000, 400), (20000, 130), (100000, 60)):
+        graph = random_geometric(DCoreGraph(), n, radius)
+        graph.csr()
+        graph.reverse_csr()
+        rng = random.Random(n)
+        queries = [(rng.randrange(n), rng.randrange(n)) for i in range(20)]
+        result = [n, graph.edge_count(), timed(lambda: [priority_queue_path(graph, s, t) for s, t in queries])]
+        for method in ('dijkstra', 'bidirectional', 'astar'):
+            stats = {}
+            result += [timed(lambda: [algorithms.shortest_path(graph, s, t, method=method, stats=stats) for s, t in queries]), stats['settled']//len(queries)]
+        rows.append(result)
+    report('shortest_path (20 queries, settled nodes per query)', ['nodes', 'arcs', 'queue (s)', 'dijkstra (s)', 'settled', 'bidir (s)', 'settled', 'astar (s)', 'settled'], rows)
+
+def bench_max_flow():
+    rows = []
+    for name, graph in (('layered', layered_network(DCoreGraph(), 50, 400)), ('layered', layered_network(DCoreGraph(), 10, 4000)),
+                        ('random', random_graph(DCoreGraph(), 5000, 100000)), ('random', random_graph(DCoreGraph(), 20000, 100000))):
+        graph.csr()
+        graph.reverse_csr()
+        result = [name, graph.node_count(), graph.edge_count()]
+        for method in ('dinic', 'push_relabel'):
+            stats = {}
+            start = time.perf_counter()
+            flow, cut = algorithms.max_flow(graph, 0, 1, method, stats=stats)
+            result += [time.perf_counter() - start, stats.get('augmentations', stats.get('pushes'))]
+        rows.append(result + [sum(flow[edge] for edge, tail in graph.in_edges(1))])
+    report('max_flow', ['graph', 'nodes', 'arcs', 'dinic (s)', 'augments', 'push-rel (s)', 'pushes', 'value'], rows)
+
+def bench_min_cost_flow():
+    rows = []
+    for n, m, demand in ((500, 3000, 200), (2000, 20000, 1000), (5000, 50000, 2000)):
+        rng = random.Random(n)
+        graph = random_graph(DCoreGraph(), n, m, n)
+        for edge in graph.edges():
+            graph.weights[edge] = rng.randint(1, 50)
+            graph.costs[edge] = rng.randint(1, 100)
+        graph.csr()
+        graph.reverse_csr()
+        result = [n, m, demand]
+        for method in ('ssp', 'network_simplex'):
+            stats = {}
+            start = time.perf_counter()
+            flow = algorithms.min_cost_flow(graph, 0, 1, demand, method, stats=stats)
+            result += [time.perf_counter() - start, stats.get('augmentations', stats.get('pivots'))]
+        rows.append(result + [sum(value*graph.costs[edge] for edge, value in flow.items())])
+    report('min_cost_flow', ['nodes', 'edges', 'demand', 'ssp (s)', 'augments', 'simplex (s)', 'pivots', 'cost'], rows)
+
+def bench_all_pairs():
+    workers = os.cpu_count() or 1
+    rows = []
+    for n in (200, 500, 1000):
+        for degree in (2, 8, 32):
+            graph = random_graph(DCoreGraph(), n, degree*n)
+            graph.csr()
+            result = [n, degree*n]
+            result.append(timed(algorithms.all_pairs_shortest_paths, graph, None, 'floyd_warshall'))
+            for count in (1, workers):
+                result.append(timed(algorithms.all_pairs_shortest_paths, graph, None, 'dijkstra', False, count))
+            result.append(timed(algorithms.all_pairs_shortest_paths, graph))
+            rows.append(result)
+    report(f'all_pairs_shortest_paths ({workers} workers)', ['nodes', 'arcs', 'floyd (s)', 'dijkstra (s)', 'parallel (s)', 'auto (s)'], rows)
+
+def bench_hit_testing():
+    rows = []
+    size = 20 #Node radius in the UI
+    for n in (100, 1000, 10000):
+        rng = random.Random(n)
+        side = int(math.sqrt(n))*size*3 #Same node density whatever the count
+        points = [(rng.uniform(0, side), rng.uniform(0, side)) for i in range(n)]
+        labels = [(x + size, y - 8, 16, 16) for x, y in points]
+        queries = [(rng.uniform(0, side), rng.uniform(0, side)) for i in range(2000)]
+        grid = GridIndex(size*2)
+        build = timed(lambda: [(grid.add_point(i, p), grid.add_rect(-1-i, r)) for i, (p, r) in enumerate(zip(points, labels))])
+
+        def scan(): #Hover lookup as main() did it, sqrt per node and then every label rect
+            hits = []
+            for x, y in queries:
+                for i, (px, py) in enumerate(points):
+                    if math.sqrt((x - px)**2 + (y - py)**2) < size:
+                        hits.append(i)
+                        break
+                else:
+                    for i, (left, top, width, height) in enumerate(labels):
+                        if left <= x < left + width and top <= y < top + height:
+                            hits.append(-1-i)
+                            break
+                    else:
+                        hits.append(None)
+            return hits
+
+        def indexed():
+            hits = []
+            for pos in queries:
+                hit = grid.point_at(pos, size)
+                hits.append(hit if hit is not None else grid.rect_at(pos))
+            return hits
+
+        assert scan() == indexed()
+        moves = timed(lambda: [grid.move_point(i, (p[1], p[0])) for i, p in enumerate(points)])
+        rows.append([n, build, timed(scan)/len(queries)*1e6, timed(indexed)/len(queries)*1e6, moves/n*1e6])
+    report('hit_testing (2000 hover queries)', ['nodes', 'build (s)', 'scan (us)', 'grid (us)', 'move (us)'], rows)
+
+def bench_placement():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import node_graph
+    rows = []
+    for attempts in (20, 200, 5000): #Random insertions kept when valid, the last one packs the canvas
+        rng = random.Random(attempts)
+        grid = GridIndex(node_graph.SIZE*2)
+        nodes = []
+        for i in range(attempts):
+            pos = (rng.uniform(40, 560), rng.uniform(40, 560))
+            if node_graph.valid_pos(grid, pos, set()):
+                node = node_graph.Node(pos)
+                grid.add_point(node, pos)
+                nodes.append(node)
+        moving = nodes[0]
+        path = [moving.posN]
+        for i in range(199): #A drag as a random walk of mouse positions
+            x, y = path[-1]
+            path.append((min(max(x + rng.uniform(-8, 8), 0), 600), min(max(y + rng.uniform(-8, 8), 0), 600)))
+
+        def drag(cached: bool):
+            start = moving.posN
+            cache = node_graph.PlacementCache()
+            for pos in path:
+                pos = node_graph.closest_valid_pos(grid, pos, moving, cache if cached else None)
+                if pos is not None:
+                    moving.posN = pos
+                    grid.move_point(moving, pos)
+            moving.posN = start
+            grid.move_point(moving, start)
+
+        rows.append([len(nodes), timed(drag, False)/len(path)*1e3, timed(drag, True)/len(path)*1e3])
+    report('placement (200 drag steps)', ['nodes', 'cold (ms)', 'drag (ms)'], rows)
+
+def bench_rendering():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import node_graph
+    import pygame
+    rows = []
+    for width in (600, 1200, 2400):
+        node_graph.WIDTH = width
+        node_graph.init_display()
+        graph = node_graph.UGraph()
+        side = width//60 - 1
+        nodes = [[node_graph.Node((60 + 60*i, 60 + 60*j)) for j in range(side - 1)] for i in range(side - 1)]
+        for column in nodes:
+            for node in column:
+                graph.add_node(node)
+        for i, column in enumerate(nodes): #Lattice edges to the right and down
+            for j, node in enumerate(column):
+                if i + 1 < len(nodes):
+                    graph.add_edge(node_graph.UEdge(node, nodes[i+1][j]))
+                if j + 1 < len(column):
+                    graph.add_edge(node_graph.UEdge(node, column[j+1]))
+        graph.drawG()
+        moving = nodes[len(nodes)//2][len(nodes)//2]
+        home = moving.posN
+
+        def full(): #Every frame as drawG did it before the scene, all items and the whole display
+            for frame in range(20):
+                node_graph.WIN.fill(node_graph.WHITE, pygame.Rect(0, 0, width, width))
+                for edge in graph.edgesG:
+                    edge.drawE(node_graph.WIN)
+                for node in graph.nodesG:
+                    graph.draw_node(node, node_graph.WIN)
+                pygame.display.update()
+
+        def drag(): #One node nudged per frame
+            for frame in range(20):
+                moving.moveN((home[0] + frame % 2, home[1]))
+                for edge in moving.edgesN:
+                    edge.moveE()
+                graph.drawG()
+
+        def idle():
+            for frame in range(20):
+                graph.drawG()
+
+        rows.append([graph.core.node_count(), graph.core.edge_count(), timed(full)/20*1e3, timed(drag)/20*1e3, timed(idle)/20*1e3])
+    pygame.quit()
+    node_graph.WIDTH = 600
+    report('rendering (per frame)', ['nodes', 'edges', 'full (ms)', 'drag (ms)', 'idle (ms)'], rows)
+
+def bench_text_cache():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import node_graph
+    node_graph.init_display()
+    rows = []
+    for n in (100, 1000, 3000):
+        rng = random.Random(n)
+        labels = [str(i + 1) for i in range(n)] + [str(rng.randint(1, 999)) for i in range(2*n)] #Node numbers and edge lengths
+
+        def uncached():
+            for text in labels:
+                node_graph.font.render(text, True, node_graph.BLACK)
+
+        def cached():
+            for text in labels:
+                node_graph.render_text(text)
+
+        node_graph.rendered_text.cache_clear()
+        first = timed(cached)
+        again = timed(cached)
+        info = node_graph.rendered_text.cache_info()
+        rows.append([len(labels), timed(uncached)*1e3, first*1e3, again*1e3, info.hits, info.misses])
+    report('text_cache (one frame of labels)', ['labels', 'render (ms)', 'cold (ms)', 'warm (ms)', 'hits', 'misses'], rows)
+
+def bench_event_loop():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import node_graph
+    import pygame
+    rows = []
+    for motions in (0, 1000, 10000):
+        setup = node_graph.init_display
+
+        def init(): #Queues a burst of mouse motion, then quits after a second of idling
+            setup()
+            for i in range(motions):
+                pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=(i % 600, 300), rel=(1, 0), buttons=(0, 0, 0)))
+            pygame.time.set_timer(pygame.QUIT, 1000, 1)
+
+        node_graph.init_display = init
+        frames = [0]
+        draw = node_graph.UGraph.drawG
+
+        def counted(graph):
+            frames[0] += 1
+            draw(graph)
+
+        node_graph.UGraph.drawG = counted
+        start, cpu = time.perf_counter(), time.process_time()
+        try:
+            node_graph.main()
+        finally:
+            node_graph.init_display = setup
+            node_graph.UGraph.drawG = draw
+        rows.append([motions, frames[0], time.process_time() - cpu, time.perf_counter() - start])
+    report('event_loop (1 s after the burst)', ['motions', 'frames', 'cpu (s)', 'wall (s)'], rows)
+
+def bench_graph_io():
+    rows = []
+    directory = tempfile.mkdtemp()
+    path, pickled = os.path.join(directory, 'graph.ngraph'), os.path.join(directory, 'graph.pickle')
+    for n in (1000, 10000, 100000):
+        rng = random.Random(0)
+        graph = DCoreGraph()
+        for i in range(n):
+            graph.add_node((rng.random(), rng.random()))
+        for i in range(10*n):
+            graph.add_edge(rng.randrange(n), rng.randrange(n), rng.randint(1, 9), rng.randint(1, 9))
+        flows = {edge: rng.randint(0, 9) for edge in graph.edges()}
+        columns = (graph.positions, graph.tails, graph.heads, graph.weights, graph.costs, flows)
+        save = timed(graph_io.save, path, graph, graph.weights, flows)
+        dump = timed(lambda: pickle.dump(columns, open(pickled, 'wb')))
+        with graph_io.GraphFile(path) as file:
+            scan = timed(lambda: sum(file.column('weight')))
+            peak = allocated(lambda: sum(file.column('flow')))
+        opened = timed(lambda: graph_io.GraphFile(path).close())
+        unpickled = timed(lambda: pickle.load(open(pickled, 'rb')))
+        build = timed(graph_io.load, path)
+        rows.append([n, 10*n, os.path.getsize(path)//1024, os.path.getsize(pickled)//1024, save, dump, opened, unpickled, scan, peak//1024, build])
+        os.remove(path)
+        os.remove(pickled)
+    os.rmdir(directory)
+    report('graph_io (mapped columns vs pickled lists)', ['nodes', 'edges', 'file (KiB)', 'pickle (KiB)', 'save (s)', 'dump (s)', 'open (s)', 'unpickle (s)', 'scan (s)', 'peak (KiB)', 'build (s)'], rows)
+
+def per_arc_dimacs(path: str) -> DCoreGraph: #Whole file read, then one add_edge per arc
+    graph = DCoreGraph()
+    with open(path) as file:
+        lines = file.readlines()
+    for line in lines:
+        fields = line.split()
+        if fields[0] == 'p':
+            for i in range(int(fields[2])):
+                graph.add_node()
+        elif fields[0] == 'a':
+            graph.add_edge(int(fields[1]) - 1, int(fields[2]) - 1, int(fields[3]))
+    return graph
+
+def editor_dimacs(path: str): #One Node and Edge per element, as the editor builds a graph
+    import node_graph
+    graph = node_graph.DGraph()
+    rng = random.Random(0)
+    for record in graph_io.dimacs_records(open(path)):
+        if record[0] == 'p':
+            width = node_graph.WIDTH
+            nodes = [node_graph.DNode((cell % width, cell//width)) for cell in rng.sample(range(width*width), record[2])] #Distinct positions
+            for node in nodes:
+                graph.add_node(node)
+        elif record[0] == 'a' and record[1] != record[2] and graph.get_edge((nodes[record[1]], nodes[record[2]])) is None:
+            edge = node_graph.DEdge(nodes[record[1]], nodes[record[2]])
+            edge.weightE = str(record[3])
+            graph.add_edge(edge)
+    return graph
+
+def bench_importers():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import node_graph
+    node_graph.init_display()
+    rows = []
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'network.max')
+    for n, m in ((1000, 10000), (10000, 100000), (100000, 1000000)):
+        rng = random.Random(0)
+        with open(path, 'w') as file:
+            file.write(f'p max {n} {m}\nn 1 s\nn {n} t\n')
+            for i in range(m):
+                u = rng.randint(1, n)
+                v = rng.randint(1, n - 1) #Shifted past u, the readers reject self-loops
+                file.write(f'a {u} {v + (v >= u)} {rng.randint(1, 9)}\n')
+        parse_peak = allocated(lambda: sum(1 for record in graph_io.dimacs_records(open(path))))
+        read_peak = allocated(lambda: open(path).readlines())
+        editor = timed(editor_dimacs, path) if m <= 100000 else '-'
+        per_arc = timed(per_arc_dimacs, path)
+        bulk = timed(graph_io.read_dimacs, path)
+        rows.append([n, m, parse_peak//1024, read_peak//1024, editor, per_arc, bulk])
+    os.remove(path)
+    os.rmdir(directory)
+    report('importers (DIMACS max flow file)', ['nodes', 'arcs', 'stream (KiB)', 'lines (KiB)', 'editor (s)', 'add_edge (s)', 'bulk (s)'], rows)
+
+BENCHMARKS: Dict[str, Callable] = {
+    'edge_lookup': bench_edge_lookup,
+    'views': bench_views,
+    'connectivity': bench_connectivity,
+    'mst': bench_mst,
+    'dynamic_mst': bench_dynamic_mst,
+    'hamiltonian': bench_hamiltonian,
+    'matching': bench_matching,
+    'vertex_cover': bench_vertex_cover,
+    'shortest_path': bench_shortest_path,
+    'max_flow': bench_max_flow,
+    'min_cost_flow': bench_min_cost_flow,
+    'all_pairs': bench_all_pairs,
+    'hit_testing': bench_hit_testing,
+    'placement': bench_placement,
+    'rendering': bench_rendering,
+    'text_cache': bench_text_cache,
+    'event_loop': bench_event_loop,
+    'graph_io': bench_graph_io,
+    'importers': bench_importers,
+}
+
+SUITE_SIZES = [10**k for k in range(1, 7)] #Nodes, each case stops at its own limit and at --max-size
+SUITE_BUDGET = 10 #Seconds before an exponential search in the suite gives up
+SUITE_QUERIES = 10 #Shortest path queries per graph
+NOISE = 0.005 #Seconds of slowdown below which a case is never flagged
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json') #Stored suite results compared with by default, rewrite with --json after an intended change
+
+def erdos_renyi(graph: CoreGraph, n: int, seed: int = 0) -> CoreGraph: #Average degree 4
+    return random_graph(graph, n, 2*n, seed)
+
+def geometric(graph: CoreGraph, n: int, seed: int = 0) -> CoreGraph: #Average degree about 8, weight and cost are the truncated length like the editor's defaults
+    graph = random_geometric(graph, n, 10000*math.sqrt(8/(math.pi*n)), seed)
+    for edge in graph.edges():
+        graph.set_weight(edge, graph.costs[edge])
+    return graph
+
+def grid(graph: CoreGraph, n: int, seed: int = 0, spacing: int = 100) -> CoreGraph: #isqrt(n)**2 nodes jittered around a square lattice, neighbours joined by their truncated length
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(n))
+    nodes = graph.add_nodes((i*spacing + rng.randrange(spacing//2), j*spacing + rng.randrange(spacing//2)) for i in range(side) for j in range(side))
+
+    def edges():
+        for i in range(side):
+            for j in range(side):
+                u = nodes[i*side + j]
+                for v in ([nodes[(i + 1)*side + j]] if i + 1 < side else []) + ([u + 1] if j + 1 < side else []):
+                    (x1, y1), (x2, y2) = graph.positions[u], graph.positions[v]
+                    length = int(math.hypot(x1 - x2, y1 - y2))
+                    yield (u, v, length, length)
+                    if graph.directed:
+                        yield (v, u, length, length)
+
+    graph.add_edges(edges())
+    return graph
+
+def bipartite(graph: CoreGraph, n: int, seed: int = 0) -> CoreGraph:
+    return random_bipartite(graph, n, 2*n, seed)
+
+def layered(graph: CoreGraph, n: int, seed: int = 0) -> CoreGraph: #Source node 0, sink node 1
+    width = max(1, math.isqrt(n))
+    return layered_network(graph, max(1, (n - 2)//width), width, seed)
+
+FAMILIES: Dict[str, Callable] = {
+    'geometric': geometric,
+    'erdos_renyi': erdos_renyi,
+    'grid': grid,
+    'bipartite': bipartite,
+    'layered': layered
+}
+
+def terminals(graph: CoreGraph, family: str) -> Tuple[int, int]: #Source and sink of a flow case
+    if family == 'layered':
+        return 0, 1
+    nodes = list(graph.nodes())
+    return nodes[0], nodes[-1]
+
+def run_shortest_path(graph: CoreGraph, family: str, stats: Dict[str, int]):
+    rng = random.Random(0)
+    nodes = list(graph.nodes())
+    for i in range(SUITE_QUERIES):
+        algorithms.shortest_path(graph, rng.choice(nodes), rng.choice(nodes), stats=stats)
+
+def run_min_cost_flow(graph: CoreGraph, family: str, stats: Dict[str, int]):
+    source, sink = terminals(graph, family)
+    demand = sum(graph.weights[edge] for edge, node in graph.out_edges(source))//2
+    algorithms.min_cost_flow(graph, source, sink, demand, budget=algorithms.Budget(SUITE_BUDGET), stats=stats)
+
+SUITE: List[Tuple[str, str, bool, int, Callable]] = [ #(algorithm, family, directed, largest size, run(graph, family, stats))
+    ('mst', family, False, 10**6, lambda graph, family, stats: algorithms.minimum_spanning_forest(graph, stats=stats)) for family in ('geometric', 'erdos_renyi', 'grid')
+] + [
+    ('hamiltonian', family, False, 10, lambda graph, family, stats: algorithms.hamiltonian_cycle(graph, algorithms.Budget(SUITE_BUDGET), stats=stats)) for family in ('geometric', 'erdos_renyi', 'grid')
+] + [
+    ('matching', family, False, limit, lambda graph, family, stats: algorithms.max_matching(graph, budget=algorithms.Budget(SUITE_BUDGET), stats=stats)) for family, limit in (('bipartite', 10**5), ('grid', 10**5), ('erdos_renyi', 10**4))
+] + [
+    ('vertex_cover', family, False, limit, lambda graph, family, stats: algorithms.min_vertex_cover(graph, budget=algorithms.Budget(SUITE_BUDGET), stats=stats)) for family, limit in (('bipartite', 10**5), ('grid', 10**5), ('geometric', 100))
+] + [
+    ('shortest_path', family, True, 10**6, run_shortest_path) for family in ('geometric', 'erdos_renyi', 'grid')
+] + [
+    ('max_flow', family, True, limit, lambda graph, family, stats: algorithms.max_flow(graph, *terminals(graph, family), budget=algorithms.Budget(SUITE_BUDGET), stats=stats)) for family, limit in (('layered', 10**6), ('geometric', 10**5))
+] + [
+    ('min_cost_flow', family, True, 10**4, run_min_cost_flow) for family in ('layered', 'geometric')
+]
+
+def measure(run: Callable, graph: CoreGraph, family: str) -> Dict: #Best of a few timed runs, then one traced run for the peak
+    seconds = []
+    try:
+        while not seconds or (len(seconds) < 5 and sum(seconds) < 0.2):
+            stats = {}
+            start = time.perf_counter()
+            run(graph, family, stats)
+            seconds.append(time.perf_counter() - start)
+    except algorithms.SearchCancelled:
+        return {'seconds': float(SUITE_BUDGET), 'peak_bytes': None, 'ops': stats, 'status': 'budget'}
+    try:
+        peak = allocated(run, graph, family, {})
+    except algorithms.SearchCancelled: #Tracing slowed it past the budget
+        tracemalloc.stop()
+        peak = None
+    return {'seconds': min(seconds), 'peak_bytes': peak, 'ops': stats, 'status': 'ok'}
+
+def run_suite(algorithms_run: List[str], max_size: int) -> List[Dict]:
+    results = []
+    for algorithm, family, directed, limit, run in SUITE:
+        if algorithms_run and algorithm not in algorithms_run:
+            continue
+        for n in SUITE_SIZES:
+            if n > min(limit, max_size):
+                break
+            graph = FAMILIES[family](DCoreGraph() if directed else UCoreGraph(), n)
+            result = {'algorithm': algorithm, 'family': family, 'nodes': graph.node_count(), 'edges': graph.edge_count()}
+            result.update(measure(run, graph, family))
+            results.append(result)
+    return results
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[Dict]: #Results slower or larger than the baseline by more than tolerance
+    before = {(result['algorithm'], result['family'], result['nodes']): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = before.get((result['algorithm'], result['family'], result['nodes']))
+        result['baseline_seconds'] = None if base is None else base['seconds']
+        if base is None or base['status'] != 'ok':
+            continue
+        slower = result['seconds'] > base['seconds']*(1 + tolerance) and result['seconds'] - base['seconds'] > NOISE
+        larger = result['peak_bytes'] is not None and base['peak_bytes'] is not None and result['peak_bytes'] > base['peak_bytes']*(1 + tolerance) and result['peak_bytes'] - base['peak_bytes'] > 65536
+        if slower or larger or result['status'] != 'ok':
+            regressions.append(result)
+    return regressions
+
+def suite(names: List[str], max_size: int, output: str = None, baseline: str = None, tolerance: float = 0.25) -> bool: #False if a case regressed against the baseline
+    results = run_suite(names, max_size)
+    regressions = []
+    if baseline is not None:
+        with open(baseline) as file:
+            regressions = compare(results, json.load(file)['results'], tolerance)
+    rows = []
+    for result in results:
+        ratio = '-' if result.get('baseline_seconds') is None else f"{result['seconds']/max(result['baseline_seconds'], 1e-9):.2f}x"
+        peak = '-' if result['peak_bytes'] is None else result['peak_bytes']//1024
+        rows.append([result['algorithm'], result['family'], result['nodes'], result['edges'], result['seconds'], peak, sum(result['ops'].values()), ratio, 'REGRESSED' if result in regressions else result['status']])
+    report('suite', ['algorithm', 'family', 'nodes', 'edges', 'time (s)', 'peak (KiB)', 'ops', 'vs baseline', 'status'], rows)
+    if output is not None:
+        with open(output, 'w') as file:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(), 'max_size': max_size, 'results': results}, file, indent=1)
+    return not regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks comparing the engines with what they replaced, or the algorithm suite with --suite')
+    parser.add_argument('names', nargs='*', help='benchmarks to run, or suite algorithms with --suite, all by default')
+    parser.add_argument('--suite', action='store_true', help='time the algorithms on generated graph families')
+    parser.add_argument('--max-size', type=int, default=10**5, help='largest suite graph in nodes, up to 10**6')
+    parser.add_argument('--json', help='write the suite results to this file')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='suite results to compare with, exits with status 1 on a regression, the stored baseline by default, empty for none')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='slowdown or growth over the baseline that counts as a regression')
+    args = parser.parse_args()
+    if args.suite:
+        sys.exit(0 if suite(args.names, args.max_size, args.json, args.baseline or None, args.tolerance) else 1)
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,515 @@
+from __future__ import annotations
+from collections.abc import Sequence, Set
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import math
+
+class SequenceView(Sequence): #Read-only live view of a list
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: list):
+        self._data = data
+
+    def __getitem__(self, index):
+        return self._data[index]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __contains__(self, value) -> bool:
+        return value in self._data
+
+    def __repr__(self) -> str:
+        return f'SequenceView({self._data!r})'
+
+class SetView(Set): #Read-only live view of a set
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: set):
+        self._data = data
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return set(iterable)
+
+    def __contains__(self, value) -> bool:
+        return value in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __repr__(self) -> str:
+        return f'SetView({self._data!r})'
+
+class DisjointSet: #Union-find with path compression and union by rank
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.rank = [0]*size
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        self.rank.append(0)
+        return len(self.parent) - 1
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]] #Path halving
+            x = parent[x]
+        return x
+
+    def union(self, x: int, y: int) -> bool: #False if already in the same set
+        x, y = self.find(x), self.find(y)
+        if x == y:
+            return False
+        if self.rank[x] < self.rank[y]:
+            x, y = y, x
+        self.parent[y] = x
+        if self.rank[x] == self.rank[y]:
+            self.rank[x] += 1
+        return True
+
+class CoreListener: #Told about changes to a CoreGraph it is attached to, after they happen
+
+    def node_added(self, node: int):
+        pass
+
+    def node_removed(self, node: int):
+        pass
+
+    def edge_added(self, edge: int):
+        pass
+
+    def edge_removed(self, edge: int, u: int, v: int):
+        pass
+
+    def weight_changed(self, edge: int, old: int):
+        pass
+
+class Connectivity(CoreListener): #Connected components (weak for directed graphs), union-find while edges are only added
+
+    def __init__(self, graph: CoreGraph):
+        self.graph = graph
+        self.stale = True #A deletion may have split a component, rebuild before the next query
+        self.sets = None
+        self.count = 0
+        graph.attach(self)
+
+    def close(self):
+        self.graph.detach(self)
+
+    def rebuild(self): #Iterative BFS labeling, every node points straight at its component root
+        graph = self.graph
+        sets = DisjointSet(graph.node_bound())
+        parent = sets.parent
+        seen = [False]*graph.node_bound()
+        count = 0
+        for root in graph.nodes():
+            if seen[root]:
+                continue
+            count += 1
+            seen[root] = True
+            queue = [root]
+            for node in queue:
+                parent[node] = root
+                for neighbor in graph.neighbors(node):
+                    if not seen[neighbor]:
+                        seen[neighbor] = True
+                        queue.append(neighbor)
+                if graph.directed:
+                    for edge, neighbor in graph.in_edges(node):
+                        if not seen[neighbor]:
+                            seen[neighbor] = True
+                            queue.append(neighbor)
+        self.sets = sets
+        self.count = count
+        self.stale = False
+
+    def component(self, node: int) -> int: #Representative node id, stable until the next change
+        if self.stale:
+            self.rebuild()
+        return self.sets.find(node)
+
+    def same_component(self, u: int, v: int) -> bool:
+        return self.component(u) == self.component(v)
+
+    def component_count(self) -> int:
+        if self.stale:
+            self.rebuild()
+        return self.count
+
+    def is_connected(self) -> bool:
+        return self.component_count() <= 1
+
+    def node_added(self, node: int):
+        if not self.stale:
+            if node == len(self.sets.parent):
+                self.sets.add()
+            else:
+                self.sets.parent[node] = node
+                self.sets.rank[node] = 0
+            self.count += 1
+
+    def node_removed(self, node: int):
+        if not self.stale:
+            self.count -= 1 #Its edges went first, so it was a component of its own
+
+    def edge_added(self, edge: int):
+        if not self.stale and self.sets.union(*self.graph.endpoints(edge)):
+            self.count -= 1
+
+    def edge_removed(self, edge: int, u: int, v: int):
+        if not self.stale and not self.reconnects(u, v):
+            self.stale = True
+
+    def reconnects(self, u: int, v: int) -> bool: #Search from both ends in turn, a side that runs out first means a split
+        if u == v:
+            return True
+        graph = self.graph
+        queues = ([u], [v])
+        seen = ({u}, {v})
+        heads = [0, 0]
+        side = 0
+        while heads[side] < len(queues[side]):
+            node = queues[side][heads[side]]
+            heads[side] += 1
+            neighbors = list(graph.neighbors(node))
+            if graph.directed:
+                neighbors.extend(tail for edge, tail in graph.in_edges(node))
+            for neighbor in neighbors:
+                if neighbor in seen[1-side]:
+                    return True
+                if neighbor not in seen[side]:
+                    seen[side].add(neighbor)
+                    queues[side].append(neighbor)
+            side = 1 - side
+        return False
+
+class CSR(NamedTuple): #Compressed sparse row snapshot of the out-adjacency
+    offsets: List[int] #Arcs of node u are offsets[u]:offsets[u+1]
+    targets: List[int]
+    edges: List[int]
+
+def build_csr(adjacency: List[Optional[dict]]) -> CSR:
+    offsets = [0]
+    targets = []
+    edges = []
+    for adjacent in adjacency:
+        if adjacent is not None:
+            edges.extend(adjacent.keys())
+            targets.extend(adjacent.values())
+        offsets.append(len(targets))
+    return CSR(offsets, targets, edges)
+
+class CoreGraph: #Pygame-free graph storage, nodes and edges are stable integer ids
+
+    directed = False
+
+    def __init__(self):
+        self.positions = [] #[node: (x, y)]
+        self.tails = [] #[edge: node], -1 for a free slot
+        self.heads = [] #[edge: node], -1 for a free slot
+        self.weights = [] #[edge: weight]
+        self.costs = [] #[edge: cost]
+        self._out = [] #[node: {edge: neighbor}], None for a free slot
+        self._in = self._out
+        self._pairs = {} #{pair_key(u, v): edge}, O(1) edge lookup by endpoints
+        self._free_nodes = []
+        self._free_edges = []
+        self._node_count = 0
+        self._edge_count = 0
+        self.version = 0 #Bumped on every structural change
+        self.value_version = 0 #Bumped when a weight, cost or position changes
+        self._csr = None
+        self._reverse_csr = None
+        self._cost_scale = None
+        self.listeners = [] #[CoreListener]
+        self._connectivity = None
+
+    def __len__(self) -> int:
+        return self._node_count
+
+    def __getstate__(self) -> dict: #Pickled without listeners, a snapshot for another process
+        state = dict(self.__dict__)
+        state['listeners'] = []
+        state['_connectivity'] = None
+        return state
+
+    def connectivity(self) -> Connectivity: #Created and attached on first use
+        if self._connectivity is None:
+            self._connectivity = Connectivity(self)
+        return self._connectivity
+
+    def attach(self, listener: CoreListener):
+        self.listeners.append(listener)
+
+    def detach(self, listener: CoreListener):
+        self.listeners.remove(listener)
+
+    def node_count(self) -> int:
+        return self._node_count
+
+    def edge_count(self) -> int:
+        return self._edge_count
+
+    def node_bound(self) -> int: #Upper bound on node ids, for id-indexed arrays
+        return len(self._out)
+
+    def edge_bound(self) -> int:
+        return len(self.tails)
+
+    def nodes(self) -> Iterator[int]:
+        return (node for node, adjacent in enumerate(self._out) if adjacent is not None)
+
+    def edges(self) -> Iterator[int]:
+        return (edge for edge, tail in enumerate(self.tails) if tail >= 0)
+
+    def has_node(self, node: int) -> bool:
+        return 0 <= node < len(self._out) and self._out[node] is not None
+
+    def has_edge(self, edge: int) -> bool:
+        return 0 <= edge < len(self.tails) and self.tails[edge] >= 0
+
+    def add_node(self, pos: Tuple = None) -> int:
+        if self._free_nodes:
+            node = self._free_nodes.pop()
+            self._out[node] = {}
+            if self._in is not self._out:
+                self._in[node] = {}
+            self.positions[node] = pos
+        else:
+            node = len(self._out)
+            self._out.append({})
+            if self._in is not self._out:
+                self._in.append({})
+            self.positions.append(pos)
+        self._node_count += 1
+        self.version += 1
+        for listener in self.listeners:
+            listener.node_added(node)
+        return node
+
+    def add_nodes(self, positions: Iterable[Tuple]) -> range: #Bulk add_node after the last slot, free slots are left free
+        start = len(self._out)
+        self.positions.extend(positions)
+        count = len(self.positions) - start
+        self._out.extend({} for i in range(count))
+        if self._in is not self._out:
+            self._in.extend({} for i in range(count))
+        self._node_count += count
+        self.version += 1
+        for node in range(start, start + count):
+            for listener in self.listeners:
+                listener.node_added(node)
+        return range(start, start + count)
+
+    def add_edges(self, edges: Iterable[Tuple[int, int, int, int]]) -> range: #Bulk add_edge of (u, v, weight, cost) after the last slot, edges may add the nodes they use as they are consumed
+        start = len(self.tails)
+        out, into, pairs, directed = self._out, self._in, self._pairs, self.directed
+        tails, heads, weights, costs = self.tails.append, self.heads.append, self.weights.append, self.costs.append
+        edge = start
+        for u, v, weight, cost in edges:
+            tails(u)
+            heads(v)
+            weights(weight)
+            costs(cost)
+            out[u][edge] = v
+            into[v][edge] = u
+            pairs.setdefault((u, v) if directed or u < v else (v, u), edge) #pair_key inlined
+            edge += 1
+        end = edge
+        self._edge_count += end - start
+        self.version += 1
+        for edge in range(start, end):
+            for listener in self.listeners:
+                listener.edge_added(edge)
+        return range(start, end)
+
+    def remove_node(self, node: int):
+        for edge in list(self.incident(node)):
+            self.remove_edge(edge)
+        self._out[node] = None
+        if self._in is not self._out:
+            self._in[node] = None
+        self.positions[node] = None
+        self._free_nodes.append(node)
+        self._node_count -= 1
+        self.version += 1
+        for listener in self.listeners:
+            listener.node_removed(node)
+
+    def add_edge(self, u: int, v: int, weight: int = 1, cost: int = 1) -> int:
+        if self._free_edges:
+            edge = self._free_edges.pop()
+            self.tails[edge] = u
+            self.heads[edge] = v
+            self.weights[edge] = weight
+            self.costs[edge] = cost
+        else:
+            edge = len(self.tails)
+            self.tails.append(u)
+            self.heads.append(v)
+            self.weights.append(weight)
+            self.costs.append(cost)
+        self._out[u][edge] = v
+        self._in[v][edge] = u
+        self._pairs.setdefault(self.pair_key(u, v), edge)
+        self._edge_count += 1
+        self.version += 1
+        for listener in self.listeners:
+            listener.edge_added(edge)
+        return edge
+
+    def remove_edge(self, edge: int):
+        u, v = self.tails[edge], self.heads[edge]
+        del self._out[u][edge]
+        if self._in is not self._out or u != v: #An undirected self-loop has a single adjacency entry
+            del self._in[v][edge]
+        key = self.pair_key(u, v)
+        if self._pairs[key] == edge:
+            del self._pairs[key]
+            for other, node in self._out[u].items(): #Multigraphs fall back to a remaining parallel edge
+                if node == v:
+                    self._pairs[key] = other
+                    break
+        self.tails[edge] = self.heads[edge] = -1
+        self._free_edges.append(edge)
+        self._edge_count -= 1
+        self.version += 1
+        for listener in self.listeners:
+            listener.edge_removed(edge, u, v)
+
+    def endpoints(self, edge: int) -> Tuple[int, int]:
+        return self.tails[edge], self.heads[edge]
+
+    def set_position(self, node: int, pos: Tuple):
+        self.positions[node] = pos
+        self.value_version += 1
+
+    def set_weight(self, edge: int, weight: int):
+        old = self.weights[edge]
+        self.weights[edge] = weight
+        self.value_version += 1
+        if weight != old:
+            for listener in self.listeners:
+                listener.weight_changed(edge, old)
+
+    def set_cost(self, edge: int, cost: int):
+        self.costs[edge] = cost
+        self.value_version += 1
+
+    def out_edges(self, node: int):
+        return self._out[node].items() #(edge, head) pairs
+
+    def in_edges(self, node: int):
+        return self._in[node].items() #(edge, tail) pairs
+
+    def neighbors(self, node: int):
+        return self._out[node].values()
+
+    def incident(self, node: int):
+        return self._out[node].keys()
+
+    def degree(self, node: int) -> int:
+        return len(self._out[node])
+
+    def other(self, edge: int, node: int) -> int:
+        u = self.tails[edge]
+        return self.heads[edge] if u == node else u
+
+    def pair_key(self, u: int, v: int) -> Tuple[int, int]:
+        return (u, v) if u < v else (v, u)
+
+    def find_edge(self, u: int, v: int) -> Optional[int]:
+        return self._pairs.get(self.pair_key(u, v))
+
+    def csr(self) -> CSR: #Cached until the next structural change
+        if self._csr is None or self._csr[0] != self.version:
+            self._csr = (self.version, build_csr(self._out))
+        return self._csr[1]
+
+    def reverse_csr(self) -> CSR: #In-adjacency, the same snapshot as csr() when undirected
+        if self._in is self._out:
+            return self.csr()
+        if self._reverse_csr is None or self._reverse_csr[0] != self.version:
+            self._reverse_csr = (self.version, build_csr(self._in))
+        return self._reverse_csr[1]
+
+    def cost_scale(self) -> Optional[float]: #Largest s with s*length <= cost on every edge, None if an endpoint has no position
+        key = (self.version, self.value_version)
+        if self._cost_scale is None or self._cost_scale[0] != key:
+            scale = 0.0
+            ratio = None
+            for edge in self.edges():
+                a, b = self.positions[self.tails[edge]], self.positions[self.heads[edge]]
+                if a is None or b is None:
+                    scale = None
+                    break
+                length = math.hypot(a[0] - b[0], a[1] - b[1])
+                if length > 0 and (ratio is None or self.costs[edge] < ratio*length):
+                    ratio = self.costs[edge]/length
+            if scale is not None and ratio is not None:
+                scale = max(ratio, 0.0)
+            self._cost_scale = (key, scale)
+        return self._cost_scale[1]
+
+    def incidence(self, nodes: List[int] = None, edges: List[int] = None) -> Iterator[Tuple[int, int, int]]:
+        nodes = list(self.nodes()) if nodes is None else nodes
+        edges = list(self.edges()) if edges is None else edges
+        column = {edge: col for col, edge in enumerate(edges)}
+        for row, node in enumerate(nodes):
+            for edge in self._out[node]:
+                if edge in column:
+                    yield row, column[edge], 1
+            if self._in is not self._out:
+                for edge in self._in[node]:
+                    if edge in column:
+                        yield row, column[edge], -1
+
+    def matrix(self, nodes: List[int] = None, edges: List[int] = None) -> List[List[int]]: #Dense incidence matrix, built on demand
+        nodes = list(self.nodes()) if nodes is None else nodes
+        edges = list(self.edges()) if edges is None else edges
+        matrix = [[0]*len(edges) for node in nodes]
+        for row, col, value in self.incidence(nodes, edges):
+            matrix[row][col] = value
+        return matrix
+
+    def sparse_matrix(self, nodes: List[int] = None, edges: List[int] = None): #Requires scipy
+        from scipy.sparse import csr_matrix
+        nodes = list(self.nodes()) if nodes is None else nodes
+        edges = list(self.edges()) if edges is None else edges
+        rows, cols, data = [], [], []
+        for row, col, value in self.incidence(nodes, edges):
+            rows.append(row)
+            cols.append(col)
+            data.append(value)
+        return csr_matrix((data, (rows, cols)), shape=(len(nodes), len(edges)))
+
+class UCoreGraph(CoreGraph):
+
+    directed = False
+
+class DCoreGraph(CoreGraph):
+
+    directed = True
+
+    def __init__(self):
+        super(DCoreGraph, self).__init__()
+        self._in = [] #[node: {edge: tail}], None for a free slot
+
+    def pair_key(self, u: int, v: int) -> Tuple[int, int]:
+        return (u, v)
+
+    def incident(self, node: int):
+        return self._out[node].keys() | self._in[node].keys()
+
+    def degree(self, node: int) -> int:
+        return len(self._out[node]) + len(self._in[node])
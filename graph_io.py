@@ -0,0 +1,251 @@
+from __future__ import annotations
+from array import array
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from graph_core import CoreGraph, DCoreGraph, UCoreGraph
+import math
+import mmap
+import struct
+import sys
+
+MAGIC = b'NGRAPH\x00\x01'
+VERSION = 1
+DIRECTED = 1 #Header flag
+HEADER = struct.Struct('<8sHHIQQ') #Magic, version, flags, column count, node count, edge count
+COLUMN = struct.Struct('<8sc7xQQ') #Name, array typecode, byte offset, item count
+NATIVE = sys.byteorder == 'little' #Columns are little-endian, other hosts copy and swap instead of mapping
+
+def numeric_column(values: List) -> array: #Narrowest of int32, int64 and float64 holding every value
+    for typecode in 'iq':
+        try:
+            return array(typecode, values)
+        except (OverflowError, TypeError): #Too large or not an int
+            pass
+    return array('d', values)
+
+def save(path: str, graph: CoreGraph, capacities: List[int] = None, flows: Dict[int, int] = None, nodes: List[int] = None, edges: List[int] = None, weights: Dict[int, int] = None, costs: Dict[int, int] = None): #Nodes and edges are renumbered densely in the given order, id order by default
+    index = [0]*graph.node_bound() #[node id: position in the file]
+    xs = array('d')
+    ys = array('d')
+    for node in graph.nodes() if nodes is None else nodes:
+        index[node] = len(xs)
+        pos = graph.positions[node]
+        xs.append(math.nan if pos is None else pos[0])
+        ys.append(math.nan if pos is None else pos[1])
+    edges = list(graph.edges()) if edges is None else edges
+    columns = [
+        (b'x', xs),
+        (b'y', ys),
+        (b'tail', array('I', map(index.__getitem__, map(graph.tails.__getitem__, edges)))),
+        (b'head', array('I', map(index.__getitem__, map(graph.heads.__getitem__, edges)))),
+        (b'weight', numeric_column(list(map((graph.weights if weights is None else weights).__getitem__, edges)))),
+        (b'cost', numeric_column(list(map((graph.costs if costs is None else costs).__getitem__, edges))))
+    ]
+    if capacities is not None:
+        columns.append((b'capacity', numeric_column(list(map(capacities.__getitem__, edges)))))
+    if flows is not None:
+        columns.append((b'flow', numeric_column([flows.get(edge, 0) for edge in edges])))
+    offset = HEADER.size + COLUMN.size*len(columns)
+    table = []
+    for name, values in columns:
+        offset += -offset % 8 #Aligned so the mapped bytes can be cast in place
+        table.append((name, values, offset))
+        offset += len(values)*values.itemsize
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, DIRECTED if graph.directed else 0, len(columns), len(xs), len(edges)))
+        for name, values, start in table:
+            file.write(COLUMN.pack(name, values.typecode.encode(), start, len(values)))
+        for name, values, start in table:
+            file.write(bytes(start - file.tell()))
+            if not NATIVE:
+                values = array(values.typecode, values)
+                values.byteswap()
+            values.tofile(file)
+
+class GraphFile: #Saved graph opened without reading it, columns are views into the mapped file
+
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: #Empty file
+            self.file.close()
+            raise ValueError(f'{path} is not a saved graph')
+        self.views = [memoryview(self.map)] #Released on close, the map cannot close while they are exported
+        magic, version, flags, count, self.node_count, self.edge_count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version > VERSION:
+            self.close()
+            raise ValueError(f'{path} is not a saved graph')
+        self.directed = bool(flags & DIRECTED)
+        self.columns = {}
+        for i in range(count):
+            name, typecode, start, length = COLUMN.unpack_from(self.map, HEADER.size + i*COLUMN.size)
+            self.columns[name.rstrip(b'\x00').decode()] = (typecode.decode(), start, length)
+
+    def __enter__(self) -> GraphFile:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        self.map.close()
+        self.file.close()
+
+    def column(self, name: str) -> Optional[memoryview]: #None if the file has no such column
+        if name not in self.columns:
+            return None
+        typecode, start, length = self.columns[name]
+        size = array(typecode).itemsize
+        if not NATIVE:
+            values = array(typecode, self.map[start:start + length*size])
+            values.byteswap()
+            return memoryview(values)
+        view = self.views[0][start:start + length*size]
+        self.views.append(view)
+        view = view.cast(typecode)
+        self.views.append(view)
+        return view
+
+    def positions(self) -> Iterator[Optional[Tuple[float, float]]]:
+        for x, y in zip(self.column('x'), self.column('y')):
+            yield None if math.isnan(x) else (x, y)
+
+    def build(self) -> CoreGraph: #Node and edge ids follow the file order
+        graph = DCoreGraph() if self.directed else UCoreGraph()
+        graph.add_nodes(self.positions())
+        graph.add_edges(zip(self.column('tail'), self.column('head'), self.column('weight'), self.column('cost')))
+        return graph
+
+    def capacities(self) -> Optional[List[int]]: #[edge: capacity] of the built graph
+        column = self.column('capacity')
+        return None if column is None else column.tolist()
+
+    def flows(self) -> Optional[Dict[int, int]]: #{edge: flow} of the built graph
+        column = self.column('flow')
+        return None if column is None else dict(enumerate(column.tolist()))
+
+def load(path: str) -> CoreGraph:
+    with GraphFile(path) as file:
+        return file.build()
+
+def number(text: str) -> Union[int, float]:
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def dimacs_records(lines: Iterable[str]) -> Iterator[Tuple]: #('p', kind, nodes, arcs), ('n', node, value) and ('a', u, v, weight, cost) with node ids from 0, one line at a time, self-loops are rejected
+    kind, nodes = None, 0
+    for line_number, line in enumerate(lines, 1):
+        fields = line.split()
+        try:
+            tag = fields[0] if fields else 'c'
+            if tag == 'a' or tag == 'e': #Arc lines first, they are nearly all of a file
+                u, v = int(fields[1]) - 1, int(fields[2]) - 1
+                if not (0 <= u < nodes and 0 <= v < nodes):
+                    raise ValueError('no problem line before it' if kind is None else f'arc {u + 1} {v + 1} out of range')
+                if u == v:
+                    raise ValueError(f'self-loop at node {u + 1}')
+                values = fields[3:]
+                if len(values) == 3 and kind == 'min': #Lower bound, capacity, cost
+                    if number(values[0]) != 0:
+                        raise ValueError('lower bounds are not supported')
+                    del values[0]
+                elif len(values) == 1 and kind == 'sp': #Length, used as both weight and cost
+                    values *= 2
+                yield ('a', u, v, number(values[0]) if values else 1, number(values[1]) if len(values) > 1 else 1)
+            elif tag == 'c':
+                continue
+            elif tag == 'p':
+                kind, nodes = fields[1], int(fields[2])
+                yield ('p', kind, nodes, int(fields[3]))
+            elif kind is None:
+                raise ValueError('no problem line before it')
+            elif tag == 'n':
+                node = int(fields[1]) - 1
+                if not 0 <= node < nodes:
+                    raise ValueError(f'node {node + 1} out of range')
+                yield ('n', node, fields[2] if kind == 'max' else number(fields[2]))
+            else:
+                raise ValueError(f'unknown line type {tag!r}')
+        except IndexError:
+            raise ValueError(f'line {line_number}: missing fields') from None
+        except ValueError as error:
+            raise ValueError(f'line {line_number}: {error}') from None
+
+class Problem(NamedTuple): #Graph of a DIMACS file with its designated nodes
+    graph: CoreGraph
+    kind: str #'max', 'min', 'sp', 'edge'... from the problem line
+    source: Optional[int]
+    sink: Optional[int]
+    supplies: Dict[int, Union[int, float]] #{node: supply}, negative for demand, min cost flow files only
+
+def read_dimacs(path: str) -> Problem: #Arcs go straight from the file into the graph, 'edge' files are undirected
+    supplies = {}
+    source = sink = None
+    with open(path) as file:
+        records = dimacs_records(file)
+        first = next(records, None)
+        if first is None:
+            raise ValueError(f'{path} has no problem line')
+        kind, nodes = first[1], first[2]
+        graph = UCoreGraph() if kind == 'edge' else DCoreGraph()
+        graph.add_nodes(repeat(None, nodes))
+
+        def arcs() -> Iterator[Tuple]:
+            nonlocal source, sink
+            for record in records:
+                if record[0] == 'a':
+                    yield record[1:]
+                elif record[0] == 'n' and record[2] == 's':
+                    source = record[1]
+                elif record[0] == 'n' and record[2] == 't':
+                    sink = record[1]
+                elif record[0] == 'n':
+                    supplies[record[1]] = record[2]
+                else:
+                    raise ValueError(f'{path} has a second problem line')
+
+        graph.add_edges(arcs())
+    if kind == 'min': #Single source and sink when exactly one node supplies and one demands
+        supplying = [node for node, supply in supplies.items() if supply > 0]
+        demanding = [node for node, supply in supplies.items() if supply < 0]
+        if len(supplying) == 1 and len(demanding) == 1:
+            source, sink = supplying[0], demanding[0]
+    return Problem(graph, kind, source, sink, supplies)
+
+def edge_list_records(lines: Iterable[str]) -> Iterator[Tuple[str, str, Union[int, float], Union[int, float]]]: #(u, v, weight, cost) per 'u v [weight [cost]]' line, weight and cost default to 1, self-loops are rejected
+    for line_number, line in enumerate(lines, 1):
+        fields = line.split()
+        if not fields or fields[0][0] in '#%':
+            continue
+        try:
+            if fields[0] == fields[1]:
+                raise ValueError(f'self-loop at node {fields[0]}')
+            values = [number(field) for field in fields[2:4]]
+            yield (fields[0], fields[1], values[0] if values else 1, values[1] if len(values) > 1 else 1)
+        except IndexError:
+            raise ValueError(f'line {line_number}: expected u v [weight [cost]]') from None
+        except ValueError as error:
+            raise ValueError(f'line {line_number}: {error}') from None
+
+def read_edge_list(path: str, directed: bool = False) -> Tuple[CoreGraph, List[str]]: #Graph and the label of each node id, nodes numbered as they first appear
+    graph = DCoreGraph() if directed else UCoreGraph()
+    index = {}
+    labels = []
+
+    def edges() -> Iterator[Tuple]:
+        for u, v, weight, cost in edge_list_records(file):
+            for label in (u, v):
+                if label not in index:
+                    index[label] = graph.add_node()
+                    labels.append(label)
+            yield (index[u], index[v], weight, cost)
+
+    with open(path) as file:
+        graph.add_edges(edges())
+    return graph, labels
@@ -0,0 +1,98 @@
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+from graph_core import CoreGraph
+import algorithms
+import inspect
+import multiprocessing
+import pickle
+import threading
+import time
+
+class WorkerDied(Exception): #The process running a job exited without sending a result
+    pass
+
+def _run(sender, function: Callable, snapshot: bytes, args: Tuple, kwargs: Dict, seconds: Optional[float]): #Sends (result, operation counts, seconds) or the exception, engines get a budget and stats where they take them
+    try:
+        start = time.perf_counter()
+        parameters = inspect.signature(function).parameters
+        stats = {}
+        if 'budget' in parameters:
+            kwargs['budget'] = algorithms.Budget(seconds)
+        if 'stats' in parameters:
+            kwargs['stats'] = stats
+        result = function(pickle.loads(snapshot), *args, **kwargs)
+        sender.send((True, (result, stats, time.perf_counter() - start)))
+    except Exception as error:
+        sender.send((False, error))
+    finally:
+        sender.close()
+
+class Job: #Handle on one algorithm run in its own process
+
+    def __init__(self, runner: JobRunner, name: str, process: multiprocessing.Process, receiver, seconds: Optional[float]):
+        self.runner = runner
+        self.name = name
+        self.process = process
+        self.receiver = receiver #Read end of the pipe the result comes through
+        self.future = Future()
+        self.seconds = seconds #Time budget, None if only cancelling stops it
+        self.start = time.perf_counter()
+        self.cancelled = False
+
+    def wait(self): #On its own thread, settles the future once the process sends or exits
+        try:
+            ok, value = self.receiver.recv()
+        except (EOFError, OSError): #Terminated or crashed
+            self.process.join()
+            ok, value = False, WorkerDied(f'{self.name} worker exited with code {self.process.exitcode}')
+        self.receiver.close()
+        self.process.join()
+        self.runner.running.discard(self)
+        if ok:
+            self.future.set_result(value)
+        else:
+            self.future.set_exception(value)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def cancel(self): #Stops the process wherever it is, engines need not poll anything
+        self.cancelled = True
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def progress(self) -> Optional[float]: #Fraction of the time budget used, None without one
+        if self.seconds is None:
+            return None
+        return min(self.elapsed()/self.seconds, 1.0)
+
+    def result(self) -> Tuple[Any, Dict[str, int], float]: #Waits, raises what the algorithm raised or WorkerDied
+        return self.future.result()
+
+    def add_done_callback(self, callback: Callable[[Job], None]): #Called from another thread
+        self.future.add_done_callback(lambda future: callback(self))
+
+class JobRunner: #Runs each algorithm in a fresh process on a frozen snapshot of a core graph, so cancelling can terminate it
+
+    def __init__(self):
+        self.context = multiprocessing.get_context()
+        self.running = set() #Jobs whose process has not been joined yet
+
+    def submit(self, name: str, function: Callable, graph: CoreGraph, *args, seconds: float = None, **kwargs) -> Job: #Runs function(graph, *args, **kwargs) on the graph as it is now
+        snapshot = pickle.dumps(graph, pickle.HIGHEST_PROTOCOL) #Before returning, later edits do not reach the job
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=_run, args=(sender, function, snapshot, args, kwargs, seconds), daemon=True)
+        process.start()
+        sender.close() #The child holds the only write end, so its exit ends the wait
+        job = Job(self, name, process, receiver, seconds)
+        self.running.add(job)
+        threading.Thread(target=job.wait, daemon=True).start()
+        return job
+
+    def shutdown(self): #Terminates every running job
+        for job in list(self.running):
+            job.cancel()
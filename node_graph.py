@@ -1,17 +1,22 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from queue import PriorityQueue
-from typing import Dict, List, Set, Tuple
+from typing import Any, Callable, Dict, FrozenSet, KeysView, List, Optional, Set, Tuple
+from graph_core import DCoreGraph, SequenceView, SetView, UCoreGraph
+from spatial import GridIndex
+from profiling import FoldedStacks, PROFILER
+from jobs import Job, JobRunner
+import algorithms
+import graph_io
 import pygame
+import functools
+import heapq
 import math
-import sys
+import os
 
-pygame.init()
 WIDTH = 600
 SIDE_BAR = 100
-WIN = pygame.display.set_mode((WIDTH+SIDE_BAR, WIDTH))
-pygame.display.set_caption('Node Graph')
-font = pygame.font.SysFont('Corbel', 15)
+WIN = None
+font = None
 
 BLACK = (0, 0, 0)
 DARKERGREY = (96, 96, 96)
@@ -26,14 +31,53 @@ SHOW_WEIGHTS = True
 CUSTOM_WEIGHTS = False
 SHOW_VALUE = True
 
+HAMILTON_BUDGET = 5 #Seconds before a Hamiltonian cycle search gives up
+COVER_BUDGET = 5 #Seconds before an exact vertex cover search settles for its best cover
+PLACEMENT_LIMIT = 5000 #Candidate positions a drag step expands before settling for the closest valid one found, a count so the result never depends on the machine
+TEXT_CACHE = 4096 #Rendered label surfaces kept, a few per node and edge of a large graph
+FPS = 60 #Frame cap of the main loop, it sleeps in between when there are no events
+SAVE_PATH = 'graph.ngraph' #Written by Ctrl+S and read by Ctrl+O
+PROFILE_PATH = 'profile.folded' #Phase times written when F3 turns profiling off, or on quitting while it is on
+PROFILE_REFRESH = 250 #Milliseconds between overlay updates while nothing happens
+JOB_REFRESH = 100 #Milliseconds between progress indicator updates while an algorithm runs
+JOB_DONE = pygame.USEREVENT #Posted when an algorithm in the worker finishes
+
+JOBS = JobRunner() #Worker process for the algorithm buttons, started by the first one clicked
+
+def init_display():
+    global WIN, font
+    pygame.init()
+    WIN = pygame.display.set_mode((WIDTH+SIDE_BAR, WIDTH))
+    pygame.display.set_caption('Node Graph')
+    font = pygame.font.SysFont('Corbel', 15)
+
+@functools.lru_cache(maxsize=TEXT_CACHE)
+def rendered_text(text: str, color: Tuple, typeface: Font) -> Surface: #Hits and misses in rendered_text.cache_info()
+    return typeface.render(text, True, color)
+
+def render_text(text: str, color: Tuple = BLACK) -> Surface: #Shared between callers, blit it but never draw on it
+    return rendered_text(text, color, font)
+
+def post_done(job: Job): #Called from the worker's result thread, wakes the main loop
+    if pygame.get_init() and not job.cancelled:
+        try:
+            pygame.event.post(pygame.event.Event(JOB_DONE, job=job))
+        except pygame.error: #Quit in between
+            pass
+
 class Node:
 
     def __init__(self, pos: Tuple):
+        self.sceneN = None #Scene of the graph holding this node
         self.colorN = GREY
         self.posN = pos
         self.edgesN = set()
         self.connectedN = set()
         self.active = False
+        self.coreN = None #Core graph holding this node
+        self.idN = None #Node id in coreN
+        self.indexN = None #Position in the graph's node list
+        self.gridN = None #Grid index of the graph holding this node
 
     @property
     def colorN(self) -> Tuple:
@@ -41,7 +85,10 @@ class Node:
 
     @colorN.setter
     def colorN(self, color: Tuple) -> None:
+        changed = self.sceneN is not None and color != self._colorN
         self._colorN = color
+        if changed:
+            self.refreshN()
 
     @property
     def posN(self) -> Tuple:
@@ -50,30 +97,48 @@ class Node:
     @posN.setter
     def posN(self, pos: Tuple) -> None:
         self._posN = pos
+        self.refreshN()
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    @active.setter
+    def active(self, active: bool) -> None:
+        changed = self.sceneN is not None and active != self._active
+        self._active = active
+        if changed:
+            self.refreshN()
 
     @property
-    def edgesN(self) -> Set[Edge]:
-        return self._edgesN.copy()
+    def edgesN(self) -> SetView:
+        return self._edgesN_view
 
     @edgesN.setter
     def edgesN(self, edges: Set[Edge]) -> None:
         self._edgesN = edges
+        self._edgesN_view = SetView(edges)
 
     @property
-    def connectedN(self) -> Set[Node]:
-        return self._connectedN.copy()
+    def connectedN(self) -> SetView:
+        return self._connectedN_view
 
     @connectedN.setter
     def connectedN(self, nodes: Set[Node]) -> None:
         self._connectedN = nodes
+        self._connectedN_view = SetView(nodes)
 
     def attach_edge(self, edge: Edge):
         self._edgesN.add(edge)
-        self._connectedN.add(edge.connectingE.difference({self}).pop())
+        for node in edge.connectingE:
+            if node != self:
+                self._connectedN.add(node)
 
     def detach_edge(self, edge: Edge):
         self._edgesN.remove(edge)
-        self._connectedN.remove(edge.connectingE.difference({self}).pop())
+        for node in edge.connectingE:
+            if node != self:
+                self._connectedN.remove(node)
 
     def update_edge(self, edges: Set[Edge]):
         edge = set(self.edgesN).intersection(edges)
@@ -97,16 +162,29 @@ class Node:
     def moveN(self, pos):
         self.eraseN()
         self.posN = pos
+        if self.coreN is not None:
+            self.coreN.set_position(self.idN, pos)
+        if self.gridN is not None:
+            self.gridN.move_point(self, pos)
 
-    def drawN(self):
+    def drawN(self, surface: Surface):
         if self.active:
-            pygame.draw.circle(WIN, RED, self.posN, SIZE)
-            pygame.draw.circle(WIN, self.colorN, self.posN, SIZE - 2)
+            pygame.draw.circle(surface, RED, self.posN, SIZE)
+            pygame.draw.circle(surface, self.colorN, self.posN, SIZE - 2)
         else:
-            pygame.draw.circle(WIN, self.colorN, self.posN, SIZE)
+            pygame.draw.circle(surface, self.colorN, self.posN, SIZE)
 
     def eraseN(self):
-        pygame.draw.circle(WIN, WHITE, self.posN, SIZE)
+        if self.sceneN is not None:
+            self.sceneN.invalidate(self.boundsN())
+
+    def boundsN(self) -> Rect:
+        x, y = self.posN
+        return pygame.Rect(int(x)-SIZE-2, int(y)-SIZE-2, SIZE*2+5, SIZE*2+5)
+
+    def refreshN(self): #Repaints the node where it is now, and where it was if it moved
+        if self.sceneN is not None:
+            self.sceneN.place(self, self.boundsN())
 
 class DNode(Node):
 
@@ -128,7 +206,10 @@ class Edge(ABC):
 
     @colorE.setter
     def colorE(self, color) -> None:
+        changed = self.sceneE is not None and color != self._colorE
         self._colorE = color
+        if changed:
+            self.refreshE()
 
     def active(self):
         self.colorE = RED
@@ -179,40 +260,8 @@ class Edge(ABC):
     def costE(self, input_cost: str) -> None:
         self._costE = input_cost
 
-    def input_valueE(self, graph: Graph) -> None:
-        run = True
-        if SHOW_WEIGHTS:
-            value = self.weightE
-        else:
-            value = self.costE
-        while run:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    run = False
-                    return True
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        run = False
-                    elif event.key == pygame.K_BACKSPACE:
-                        value = value[:-1]
-                        if not bool(value):
-                            value = '0'
-                    else:
-                        if event.unicode.isnumeric():
-                            if int(value):
-                                value += event.unicode
-                            else:
-                                value = event.unicode
-            if SHOW_WEIGHTS:
-                self.weightE = value
-            else:
-                self.costE = value
-            self.moveE()
-            graph.drawG()
-            # self.drawE()
-            # for node in self.connectingE:
-            #     node.drawN() #Missing numbering
-            # pygame.display.update()
+    def input_valueE(self) -> Mode: #Typing replaces the shown weight or cost until Return
+        return ValueMode(self)
 
     def distance(self) -> int:
         x1, y1 = self.edge[0]
@@ -235,6 +284,11 @@ class Edge(ABC):
         else:
             self.default_valueE = cost
 
+    def syncE(self):
+        if self.coreE is not None:
+            self.coreE.set_weight(self.idE, self.get_weightE())
+            self.coreE.set_cost(self.idE, self.get_costE())
+
     @property
     def textE(self) -> Surface:
         return self._textE
@@ -250,16 +304,19 @@ class Edge(ABC):
     @text_rectE.setter
     def text_rectE(self, text_rect: Rect) -> None:
         self._text_rectE = text_rect
+        if self.gridE is not None:
+            self.gridE.move_rect(self, text_rect)
+        self.refreshE()
 
     def update_textE(self):
         if CUSTOM_WEIGHTS:
             if SHOW_WEIGHTS:
-                self.textE = font.render(self.weightE, True, BLACK)
+                self.textE = render_text(self.weightE)
             else:
-                self.textE = font.render(self.costE, True, BLACK)
+                self.textE = render_text(self.costE)
         else:
             self.default_valueE = str(self.distance())
-            self.textE = font.render(self.default_valueE, True, BLACK)
+            self.textE = render_text(self.default_valueE)
         x1, y1 = self.edge[0]
         x2, y2 = self.edge[1]
         self.text_rectE = self.textE.get_rect(center=(x1+self.text_pos*(x2-x1), y1+self.text_pos*(y2-y1)))
@@ -269,12 +326,20 @@ class Edge(ABC):
         pass
 
     @abstractmethod
-    def drawE(self):
+    def drawE(self, surface: Surface):
         pass
 
-    @abstractmethod
     def eraseE(self):
-        pass
+        if self.sceneE is not None:
+            self.sceneE.invalidate(self.boundsE())
+
+    def boundsE(self) -> Rect:
+        (x1, y1), (x2, y2) = self.edge
+        return pygame.Rect(int(min(x1, x2))-2, int(min(y1, y2))-2, int(abs(x1-x2))+6, int(abs(y1-y2))+6).union(self.text_rectE)
+
+    def refreshE(self): #Repaints the edge where it is now, and where it was if it moved
+        if self.sceneE is not None:
+            self.sceneE.place(self, self.boundsE())
 
     @abstractmethod
     def deleteE(self):
@@ -283,6 +348,8 @@ class Edge(ABC):
 class UEdge(Edge):
 
     def __init__(self, node1: Node, node2: Node):
+        self.gridE = None #Grid index of the graph holding this edge
+        self.sceneE = None #Scene of the graph holding this edge
         self.colorE = BLACK
         self.edge = (node1.posN, node2.posN)
         self.connectingE = {node1, node2}
@@ -290,29 +357,28 @@ class UEdge(Edge):
         self.weightE = '1'
         self.costE = '1'
         self.text_pos = 1/2
+        self.coreE = None #Core graph holding this edge
+        self.idE = None #Edge id in coreE
         self.update_textE()
 
     @property
-    def connectingE(self) -> Set[Node]:
-        return set(self._connectingE)
+    def connectingE(self) -> FrozenSet[Node]:
+        return self._connectingE
 
     @connectingE.setter
     def connectingE(self, nodes: Set[Node]) -> None:
-        self._connectingE = nodes
+        self._connectingE = frozenset(nodes)
 
     def moveE(self):
         self.eraseE()
         self.edge = tuple(node.posN for node in self.connectingE)
         self.update_textE()
+        self.syncE()
 
-    def drawE(self):
-        pygame.draw.line(WIN, self.colorE, self.edge[0], self.edge[1])
+    def drawE(self, surface: Surface):
+        pygame.draw.line(surface, self.colorE, self.edge[0], self.edge[1])
         if SHOW_VALUE:
-            WIN.blit(self.textE, self.text_rectE)
-
-    def eraseE(self):
-        pygame.draw.line(WIN, WHITE, self.edge[0], self.edge[1])
-        pygame.draw.rect(WIN, WHITE, self.text_rectE)
+            surface.blit(self.textE, self.text_rectE)
 
     def deleteE(self):
         self.eraseE()
@@ -322,6 +388,8 @@ class UEdge(Edge):
 class DEdge(Edge):
 
     def __init__(self, leaving_node: Node, entering_node: Node):
+        self.gridE = None #Grid index of the graph holding this edge
+        self.sceneE = None #Scene of the graph holding this edge
         self.colorE = BLACK
         self.edge = (leaving_node.posN, entering_node.posN)
         self.connectingE = (leaving_node, entering_node)
@@ -330,6 +398,8 @@ class DEdge(Edge):
         self.costE = '1'
         self.custom_textE = None
         self.text_pos = 1/2
+        self.coreE = None #Core graph holding this edge
+        self.idE = None #Edge id in coreE
         self.parallel = None #Parallel edge (if one exists)
         self.update_textE()
 
@@ -362,7 +432,7 @@ class DEdge(Edge):
         self._custom_textE = text
 
     def set_custom(self, text):
-        self.textE = self.custom_textE = font.render(text, True, BLACK)
+        self.textE = self.custom_textE = render_text(text)
         x1, y1 = self.edge[0]
         x2, y2 = self.edge[1]
         self.text_rectE = self.custom_textE.get_rect(center=(x1+self.text_pos*(x2-x1), y1+self.text_pos*(y2-y1)))
@@ -403,7 +473,7 @@ class DEdge(Edge):
             self.textE = self.custom_textE
             if CUSTOM_WEIGHTS:
                 if not SHOW_WEIGHTS:
-                    self.textE = font.render(self.costE, True, BLACK)
+                    self.textE = render_text(self.costE)
             x1, y1 = self.edge[0]
             x2, y2 = self.edge[1]
             self.text_rectE = self.textE.get_rect(center=(x1+self.text_pos*(x2-x1), y1+self.text_pos*(y2-y1)))
@@ -417,16 +487,16 @@ class DEdge(Edge):
         else:
             self.edge = self.edge_pos()
         self.update_textE()
+        self.syncE()
 
-    def drawE(self):
-        pygame.draw.line(WIN, self.colorE, self.edge[0], self.edge[1])
-        pygame.draw.circle(WIN, self.colorE, self.head_pos(), 5)
-        WIN.blit(self.textE, self.text_rectE)
+    def drawE(self, surface: Surface):
+        pygame.draw.line(surface, self.colorE, self.edge[0], self.edge[1])
+        pygame.draw.circle(surface, self.colorE, self.head_pos(), 5)
+        surface.blit(self.textE, self.text_rectE)
 
-    def eraseE(self):
-        pygame.draw.line(WIN, WHITE, self.edge[0], self.edge[1])
-        pygame.draw.circle(WIN, WHITE, self.head_pos(), 5)
-        pygame.draw.rect(WIN, WHITE, self.text_rectE)
+    def boundsE(self) -> Rect:
+        x, y = self.head_pos()
+        return super(DEdge, self).boundsE().union(pygame.Rect(int(x)-6, int(y)-6, 13, 13))
 
     def deleteE(self):
         self.eraseE()
@@ -436,36 +506,276 @@ class DEdge(Edge):
             self.parallel.parallel = None
             self.parallel.moveE()
 
+class Scene: #Retained drawing of a graph, repaints and updates only the regions that changed
+
+    def __init__(self):
+        self.layer = None #Canvas sized surface the regions are painted on, clipped lines would not match unclipped ones pixel for pixel
+        self.items = GridIndex(SIZE*4) #Drawing bounds of nodes and edges
+        self.overlays = {} #{name: (surface, rect)} drawn under the graph
+        self.dirty = [pygame.Rect(0, 0, WIDTH, WIDTH)] #Rects to repaint, a new scene paints the whole canvas
+
+    def invalidate(self, rect: Rect):
+        self.dirty.append(pygame.Rect(rect))
+
+    def place(self, item, rect: Rect): #Adds or moves the bounds of a node or edge, repainting old and new bounds
+        old = self.items.rects.get(item)
+        if old is None:
+            self.items.add_rect(item, rect)
+        elif old != tuple(rect):
+            self.invalidate(old)
+            self.items.move_rect(item, rect)
+        self.invalidate(rect)
+
+    def remove(self, item):
+        old = self.items.rects.get(item)
+        if old is not None:
+            self.invalidate(old)
+            self.items.remove(item)
+
+    def set_overlay(self, name: str, surface: Surface, rect: Rect):
+        self.clear_overlay(name)
+        self.overlays[name] = (surface, rect)
+        self.invalidate(rect)
+
+    def clear_overlay(self, name: str):
+        if name in self.overlays:
+            self.invalidate(self.overlays.pop(name)[1])
+
+    def regions(self) -> List[Rect]: #Dirty rects clipped to the canvas, overlapping ones merged
+        canvas = pygame.Rect(0, 0, WIDTH, WIDTH)
+        if len(self.dirty) > 256:
+            self.dirty = [self.dirty[0].unionall(self.dirty)]
+        merged = []
+        for rect in self.dirty:
+            rect = rect.clip(canvas)
+            if rect.width and rect.height:
+                index = rect.collidelist(merged)
+                while index >= 0:
+                    rect.union_ip(merged.pop(index))
+                    index = rect.collidelist(merged)
+                merged.append(rect)
+        return merged
+
+    def render(self, graph: Graph):
+        regions = self.regions()
+        self.dirty = []
+        if self.layer is None:
+            self.layer = pygame.Surface((WIDTH, WIDTH))
+        layer = self.layer
+        for region in regions: #Items are drawn whole and only the region is copied, pixels outside it are left stale on the layer
+            layer.fill(WHITE, region)
+            for surface, rect in self.overlays.values():
+                if region.colliderect(rect):
+                    layer.blit(surface, rect)
+            items = self.items.rects_overlapping(region)
+            for item in items:
+                if isinstance(item, Edge):
+                    item.drawE(layer)
+            for item in items:
+                if isinstance(item, Node):
+                    graph.draw_node(item, layer)
+            WIN.blit(layer, region, region)
+        if bool(regions):
+            with PROFILER.phase('update'):
+                pygame.display.update(regions)
+
+class Mode(ABC): #Interaction that takes the main loop's events until it is done
+
+    refresh = 0 #Milliseconds between draws while no events come, 0 to wait for one
+
+    @abstractmethod
+    def handle(self, event: Event) -> Optional[Mode]: #Mode for the next event, None when done
+        pass
+
+    def draw(self): #Each frame, over the graph
+        pass
+
+class SelectMode(Mode): #Labels nodes in the order they are clicked, a click on the side bar cancels
+
+    def __init__(self, graph: DGraph, label: List[str], then: Callable[[], Optional[Mode]]):
+        self.graph = graph
+        self.label = label
+        self.then = then #Runs once every label is placed, may return the next mode
+        self.current_node = None
+        self.labeled = 0
+
+    def handle(self, event: Event) -> Optional[Mode]:
+        pos = pygame.mouse.get_pos()
+        if bool(self.current_node):
+            if not in_range(pos, self.current_node.posN, SIZE):
+                self.current_node.unhover()
+                self.current_node = None
+        if not bool(self.current_node):
+            self.current_node = self.graph.node_at(pos)
+            if bool(self.current_node):
+                self.current_node.hover()
+        if event.type == pygame.MOUSEBUTTONUP:
+            if bool(self.current_node):
+                if self.current_node in self.graph.labeling:
+                    self.graph.labeling.pop(self.current_node)
+                    self.labeled = self.labeled - 1
+                else:
+                    self.graph.labeling[self.current_node] = self.label[self.labeled]
+                    self.labeled = self.labeled + 1
+                self.current_node.refreshN()
+            if pos[0] > WIDTH:
+                self.graph.reset()
+                return None
+        if self.labeled < len(self.label):
+            return self
+        self.current_node.unhover()
+        return self.then()
+
+class NumberMode(Mode): #Reads a whole number typed on the keyboard, Return finishes
+
+    def __init__(self, value: str):
+        self.value = value
+        self.show()
+
+    def handle(self, event: Event) -> Optional[Mode]:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_RETURN:
+                return self.finish()
+            elif event.key == pygame.K_BACKSPACE:
+                self.value = self.value[:-1]
+                if not bool(self.value):
+                    self.value = '0'
+            else:
+                if event.unicode.isnumeric():
+                    if int(self.value):
+                        self.value += event.unicode
+                    else:
+                        self.value = event.unicode
+            self.show()
+        return self
+
+    def show(self):
+        pass
+
+    def finish(self) -> Optional[Mode]:
+        return None
+
+class ValueMode(NumberMode): #Weight or cost of an edge, whichever is shown
+
+    def __init__(self, edge: Edge):
+        self.edge = edge
+        super(ValueMode, self).__init__(edge.weightE if SHOW_WEIGHTS else edge.costE)
+
+    def show(self):
+        if SHOW_WEIGHTS:
+            self.edge.weightE = self.value
+        else:
+            self.edge.costE = self.value
+        self.edge.moveE()
+
+class DemandMode(NumberMode): #Flow demand of a minimum cost flow between the labeled source and sink
+
+    def __init__(self, graph: DGraph):
+        self.graph = graph
+        super(DemandMode, self).__init__('0')
+
+    def show(self):
+        text = render_text(self.value)
+        self.graph.scene.set_overlay('demand', text, text.get_rect(center=(WIDTH-60, WIDTH-20)))
+
+    def finish(self) -> Optional[Mode]:
+        self.graph.scene.clear_overlay('demand')
+        return self.graph.SSPA(self.graph.labeled('s'), self.graph.labeled('t'), int(self.value))
+
+class JobMode(Mode): #Waits for an algorithm running in the worker with a progress indicator, a click or Escape cancels it
+
+    refresh = JOB_REFRESH
+
+    def __init__(self, graph: Graph, job: Job, then: Callable[[Any], Optional[Mode]]):
+        self.graph = graph
+        self.job = job
+        self.then = then #Shows the result, may return the next mode
+        self.rect = pygame.Rect(WIDTH//2-90, 4, 180, 44) #Top of the canvas
+        job.add_done_callback(post_done)
+
+    def handle(self, event: Event) -> Optional[Mode]:
+        if event.type == JOB_DONE and event.job is self.job:
+            return self.finish()
+        if event.type == pygame.MOUSEBUTTONUP or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE): #Terminates the worker, whatever the engine
+            self.job.cancel()
+            self.clear()
+            return None
+        return self
+
+    def finish(self) -> Optional[Mode]: #Shows the result, or what went wrong instead of one
+        self.clear()
+        try:
+            result, stats, seconds = self.job.result()
+        except algorithms.BudgetExceeded: #Not an answer, a longer search might still find one
+            self.graph.show_message(f'{self.job.name} ran out of time')
+            return None
+        except Exception as error: #Raised by the engine, or the worker died
+            self.graph.show_message(f'{self.job.name} failed: {type(error).__name__}')
+            return None
+        PROFILER.record(self.job.name, seconds, stats)
+        return self.then(result)
+
+    def draw(self):
+        job = self.job
+        WIN.fill(LIGHTGREY, self.rect)
+        pygame.draw.rect(WIN, DARKERGREY, self.rect, 1)
+        WIN.blit(font.render(f'{job.name} {job.elapsed():.1f} s', True, BLACK), (self.rect.x + 6, self.rect.y + 3)) #Not render_text, like the profile overlay
+        WIN.blit(render_text('Click or Esc to cancel'), (self.rect.x + 6, self.rect.y + 18))
+        bar = pygame.Rect(self.rect.x + 6, self.rect.bottom - 9, self.rect.width - 12, 5)
+        pygame.draw.rect(WIN, WHITE, bar)
+        progress = job.progress()
+        if progress is None: #No time budget, a block sweeps back and forth
+            sweep = job.elapsed() % 2
+            offset = (sweep if sweep < 1 else 2 - sweep)*(bar.width - bar.width//4)
+            pygame.draw.rect(WIN, GREY, (bar.x + int(offset), bar.y, bar.width//4, bar.height))
+        else:
+            pygame.draw.rect(WIN, GREY, (bar.x, bar.y, int(bar.width*progress), bar.height))
+        pygame.display.update(self.rect)
+
+    def clear(self): #Repaints the graph under the indicator
+        self.graph.scene.invalidate(self.rect)
+
 class Graph(ABC):
 
+    core_type = None
+
     def __init__(self):
-        self.matrix = [] #Incidence matrix
-        self.nodesG = []
-        self.edgesG = []
+        self.nodesG = [] #Node.indexN is the position in this list
+        self.edgesG = {} #Ordered set of edges
+        self.core = self.core_type()
+        self.node_ids = {} #{core node id: Node}
+        self.edge_ids = {} #{core edge id: Edge}
+        self.grid = GridIndex(SIZE*2) #Node centres and edge label rects for hit-testing
+        self.placement = PlacementCache() #Reused across the steps of a drag
+        self.scene = Scene()
+        self.status = None #Component count shown by draw_status
+        self._matrix = (None, None) #(core version, incidence matrix)
 
     @property
-    def matrix(self) -> List[List[int]]:
-        return self._matrix.copy()
-
-    @matrix.setter
-    def matrix(self, matrix: List[List[int]]) -> None:
-        self._matrix = matrix
+    def matrix(self) -> Tuple[Tuple[int, ...], ...]: #Incidence matrix, materialized from the core once per structural change
+        version, matrix = self._matrix
+        if version != self.core.version:
+            matrix = tuple(map(tuple, self.core.matrix([node.idN for node in self._nodesG], [edge.idE for edge in self._edgesG])))
+            self._matrix = (self.core.version, matrix)
+        return matrix
 
     @property
-    def nodesG(self) -> List[Node]:
-        return self._nodesG.copy()
+    def nodesG(self) -> SequenceView:
+        return self._nodesG_view
 
     @nodesG.setter
     def nodesG(self, nodes: List[Node]) -> None:
         self._nodesG = nodes
+        self._nodesG_view = SequenceView(nodes)
 
     @property
-    def edgesG(self) -> List[Edge]:
-        return self._edgesG.copy()
+    def edgesG(self) -> KeysView:
+        return self._edgesG_view
 
     @edgesG.setter
-    def edgesG(self, edges: List[Edge]) -> None:
+    def edgesG(self, edges: Dict[Edge, None]) -> None:
         self._edgesG = edges
+        self._edgesG_view = edges.keys()
 
     def toggle_value(self):
         global SHOW_WEIGHTS
@@ -487,439 +797,323 @@ class Graph(ABC):
             edge.moveE()
 
     def add_node(self, node: Node):
+        node.indexN = len(self._nodesG)
         self._nodesG.append(node)
-        row = list(0 for element in self.edgesG)
-        self._matrix.append(row)
+        node.coreN = self.core
+        node.idN = self.core.add_node(node.posN)
+        self.node_ids[node.idN] = node
+        node.gridN = self.grid
+        self.grid.add_point(node, node.posN)
+        node.sceneN = self.scene
+        node.refreshN()
 
     def remove_node(self, node: Node):
-        offset = 0
-        row = self._matrix.pop(self._nodesG.index(node))
-        for col in range(len(row)):
-            if self._edgesG[col-offset] in node.edgesN:
-                self.remove_edge(self._edgesG[col-offset])
-                offset += 1
-        self._nodesG.remove(node)
-        node.eraseN()
+        for edge in list(node.edgesN):
+            self.remove_edge(edge)
+        del self._nodesG[node.indexN]
+        for index in range(node.indexN, len(self._nodesG)):
+            self._nodesG[index].indexN = index
+            self._nodesG[index].refreshN() #Renumbered
+        node.indexN = None
+        self.core.remove_node(node.idN)
+        del self.node_ids[node.idN]
+        node.coreN = None
+        self.grid.remove(node)
+        node.gridN = None
+        self.scene.remove(node)
+        node.sceneN = None
 
     @abstractmethod
     def add_edge(self, edge: Edge):
         pass
 
+    def register_edge(self, edge: Edge):
+        tail, head = (node.idN for node in edge.connectingE)
+        edge.coreE = self.core
+        edge.idE = self.core.add_edge(tail, head, edge.get_weightE(), edge.get_costE())
+        self.edge_ids[edge.idE] = edge
+        edge.gridE = self.grid
+        self.grid.add_rect(edge, edge.text_rectE)
+        edge.sceneE = self.scene
+        edge.refreshE()
+
     def remove_edge(self, edge: Edge):
-        col_index = self._edgesG.index(edge)
-        for row in self._matrix:
-            row.pop(col_index)
-        self._edgesG.remove(edge)
+        del self._edgesG[edge]
+        self.core.remove_edge(edge.idE)
+        del self.edge_ids[edge.idE]
+        edge.coreE = None
+        self.grid.remove(edge)
+        edge.gridE = None
+        self.scene.remove(edge)
+        edge.sceneE = None
         edge.deleteE()
 
+    def save(self, path: str, **columns): #Nodes and edges keep their on-screen order, custom weights and costs are saved whichever are in use
+        weights = {edge.idE: int(edge.weightE) for edge in self.edgesG}
+        costs = {edge.idE: int(edge.costE) for edge in self.edgesG}
+        graph_io.save(path, self.core, nodes=[node.idN for node in self.nodesG], edges=list(weights), weights=weights, costs=costs, **columns)
+
+    def run(self, name: str, function: Callable, *args, then: Callable[[Any], Optional[Mode]], seconds: float = None, **kwargs) -> JobMode: #Runs function on a snapshot of the core graph in the worker, then shows the result
+        self.show_message(None)
+        return JobMode(self, JOBS.submit(name, function, self.core, *args, seconds=seconds, **kwargs), then)
+
+    def show_message(self, message: Optional[str]): #Under the component count until the next algorithm or reset, None clears it
+        if message is None:
+            self.scene.clear_overlay('message')
+        else:
+            text = render_text(message)
+            self.scene.set_overlay('message', text, text.get_rect(topright=(WIDTH-6, 40)))
+
+    def node_at(self, pos) -> Node: #Node under pos, None if there is none
+        with PROFILER.phase('hit_test'):
+            return self.grid.point_at(pos, SIZE)
+
+    def edge_at(self, pos) -> Edge: #First edge whose label is under pos, None if there is none
+        with PROFILER.phase('hit_test'):
+            return self.grid.rect_at(pos)
+
     def deselect_edges(self):
         for edge in self.edgesG:
             edge.inactive()
+        for node in self.nodesG:
+            node.active = False
 
     def reset(self):
+        self.show_message(None)
         for edge in self.edgesG:
             edge.default()
-
-    def drawG(self):
-        for edge in self.edgesG:
-            edge.drawE()
         for node in self.nodesG:
-            node.drawN()
-            text = font.render(str(self.nodesG.index(node)+1), True, BLACK)
-            text_rect = text.get_rect(center=node.posN)
-            WIN.blit(text, text_rect)
-        pygame.display.update()
+            node.active = False
+
+    def draw_status(self): #Component count under the graph type label
+        count = self.core.connectivity().component_count()
+        if count != self.status:
+            self.status = count
+            text = render_text(str(count) + (' component' if count == 1 else ' components'))
+            self.scene.set_overlay('status', text, text.get_rect(center=(WIDTH-60, 30)))
+
+    def node_label(self, node: Node) -> str:
+        return str(node.indexN+1)
+
+    def draw_node(self, node: Node, surface: Surface):
+        node.drawN(surface)
+        text = render_text(self.node_label(node))
+        surface.blit(text, text.get_rect(center=node.posN))
+
+    def drawG(self): #Repaints what changed since the last call
+        self.draw_status()
+        self.scene.render(self)
 
 class UGraph(Graph):
 
+    core_type = UCoreGraph
+
+    def __init__(self):
+        super(UGraph, self).__init__()
+        self.live_mst = None #DynamicMST while the MST stays highlighted
+
     def add_edge(self, edge: Edge):
-        self._edgesG.append(edge)
+        self._edgesG[edge] = None
         for node in edge.connectingE:
             node.attach_edge(edge)
-        for index in range(len(self.nodesG)):
-            self._matrix[index].append(int(self._nodesG[index] in edge.connectingE))
+        self.register_edge(edge)
 
     def get_edge(self, node_pair: Set[Node]):
-        for edge in self.edgesG:
-            if edge.connectingE == node_pair:
-                return edge
-        return None
+        u, v = (node.idN for node in node_pair)
+        return self.edge_ids.get(self.core.find_edge(u, v))
 
     def is_connected_graph(self) -> bool:
-        connecting = connected_graph(self.nodesG[0], {self.nodesG[0]})
-        return connecting == set(self.nodesG)
+        return self.core.connectivity().is_connected()
 
-    def MST(self): #Minimum Spanning Tree
+    def MST(self): #Minimum Spanning Tree (a forest if the graph is disconnected), kept up to date through later edits
         self.deselect_edges()
-        if bool(self.nodesG) and self.is_connected_graph():
-            mst = set()
-            trees = []
-            nodes = set(self.nodesG)
-            edges = self.edgesG
-            edges.sort(key=lambda x: x.get_weightE())
-            while len(mst) < len(self.nodesG)-1:
-                min = edges.pop(0)
-                linked = min.connectingE
-                index = -1
-                if linked.issubset(nodes):
-                    mst.add(min)
-                    nodes = nodes.difference(linked)
-                    trees.append(linked)
-                else:
-                    for tree in trees:
-                        if linked.issubset(tree):
-                            break
-                        elif bool(linked.intersection(tree)):
-                            if index+1:
-                                trees[trees.index(tree)] = tree.union(trees.pop(index))
-                                break
-                            mst.add(min)
-                            index = trees.index(tree)
-                            trees[index] = tree.union(linked)
+        self.live_mst = algorithms.DynamicMST(self.core)
+        for edge in self.live_mst.tree:
+            self.edge_ids[edge].active()
+
+    def stop_mst(self):
+        if self.live_mst is not None:
+            self.live_mst.close()
+            self.live_mst = None
+
+    def deselect_edges(self):
+        self.stop_mst()
+        super(UGraph, self).deselect_edges()
+
+    def reset(self):
+        self.stop_mst()
+        super(UGraph, self).reset()
+
+    def drawG(self):
+        if self.live_mst is not None:
+            for edge_id in self.live_mst.pop_changes():
+                edge = self.edge_ids.get(edge_id)
+                if edge is not None:
+                    if edge_id in self.live_mst.tree:
+                        edge.active()
                     else:
-                        nodes = nodes.difference(linked)
-            for edge in mst:
-                edge.active()
+                        edge.inactive()
+        super(UGraph, self).drawG()
 
-    def hamiltonian_cycle(self):
+    def hamiltonian_cycle(self) -> Mode:
         self.deselect_edges()
-        if bool(self.nodesG):
-            start = self.nodesG[0]
-            cycle = self.h_cycle(start, start, set(self.nodesG), {start}, set())
-            if bool(cycle):
-                for edge in cycle:
-                    edge.active()
-
-    def h_cycle(self, start: Node, current: Node, nodes: Set[Node], visited: Set[Node], cycle: Set[Edge]):
-        if len(cycle) == len(nodes)-1 and start in current.connectedN and len(cycle) > 1:
-            return cycle.union({self.get_edge({current, start})})
-        else:
-            for node in current.connectedN:
-                if not node in visited:
-                    temp = self.h_cycle(start, node, nodes, visited.union({node}), cycle.union({self.get_edge({current, node})}))
-                    if bool(temp):
-                        return temp
-        return None
+        return self.run('hamiltonian', algorithms.hamiltonian_cycle, then=self.show_cycle, seconds=HAMILTON_BUDGET)
 
-    def min_cover(self):
-        exposed = self.max_matching(True)
-        for node in exposed:
-            for edge in node.edgesN:
-                edge.active()
-                break
+    def show_cycle(self, cycle: Optional[List[int]]):
+        if not bool(cycle):
+            self.show_message('No Hamiltonian cycle')
+            return
+        for edge in cycle:
+            self.edge_ids[edge].active()
 
-    def max_matching(self, cover):
+    def min_cover(self) -> Mode: #Minimum vertex cover, marks the covering nodes
         self.deselect_edges()
-        matching = set()
-        exposed = set(self.nodesG)
-        path = None
-        while len(exposed) > 1:
-            for node in exposed:
-                path = self.augmenting_path(node, matching, exposed, set(), set(), {node: True})
-                if bool(path):
-                    break
-            else:
-                break
-            alternating_path = path.difference(matching)
-            matching = matching.difference(path).union(alternating_path)
-            exposed = set(self.nodesG)
-            for edge in matching:
-                exposed = exposed.difference(edge.connectingE)
+        return self.run('min_cover', algorithms.min_vertex_cover, then=self.show_cover, seconds=COVER_BUDGET)
+
+    def show_cover(self, cover: Set[int]):
+        for node in cover:
+            self.node_ids[node].active = True
+
+    def max_matching(self) -> Mode:
+        self.deselect_edges()
+        return self.run('max_matching', algorithms.max_matching, then=self.show_matching)
+
+    def show_matching(self, result: Tuple[Set[int], Set[int]]):
+        matching, exposed = result
         for edge in matching:
-            edge.active()
-        if cover:
-            return exposed
-
-    def augmenting_path(self, current: Node, matching: Set[Edge], exposed: Set[Node], considered: Set[Edge], path: Set[Edge], label: Dict[Node, bool]):
-        for node in current.connectedN:
-            edge = self.get_edge({current, node})
-            if edge not in considered and node not in label:
-                if node in exposed:
-                    if label[current]:
-                        path.add(edge)
-                        return path
-                    else:
-                        return None
-                elif label[current] or edge in matching:
-                    label[node] = not label[current]
-                    result = self.augmenting_path(node, matching, exposed, considered.union({edge}), path.union({edge}), label)
-                    if bool(result):
-                        return result
-        return None
+            self.edge_ids[edge].active()
 
 class DGraph(Graph):
 
+    core_type = DCoreGraph
+
     def __init__(self):
         super(DGraph, self).__init__()
         self.labeling = {}
+        self.flows = None #{core edge id: flow} on show, saved with the graph
 
     def add_edge(self, edge: Edge):
-        for e in self._edgesG:
-            if set(e.connectingE) == set(edge.connectingE):
-                e.parallel = edge
-                edge.parallel = e
-                e.moveE()
-                edge.moveE()
-                break
-        self._edgesG.append(edge)
+        leaving, entering = edge.connectingE
+        e = self.get_edge((entering, leaving))
+        if bool(e):
+            e.parallel = edge
+            edge.parallel = e
+            e.moveE()
+            edge.moveE()
+        self._edgesG[edge] = None
         for node in edge.connectingE:
             node.attach_edge(edge)
-        for index in range(len(self.nodesG)):
-            value = int(self._nodesG[index] in edge.connectingE)
-            if value:
-                if edge.connectingE.index(self._nodesG[index]):
-                    self._matrix[index].append(-value)
-                else:
-                    self._matrix[index].append(value)
-            else:
-                self._matrix[index].append(0)
+        self.register_edge(edge)
 
     def get_edge(self, node_pair: Tuple(Node, Node)):
-        for edge in self.edgesG:
-            if edge.connectingE == node_pair:
-                return edge
-        return None
+        leaving, entering = node_pair
+        return self.edge_ids.get(self.core.find_edge(leaving.idN, entering.idN))
 
-    def select(self, label):
+    def select(self, label: List[str], then: Callable[[], Optional[Mode]]) -> Optional[Mode]: #Mode labeling len(label) nodes, None if there are too few
         if len(self.nodesG) < len(label):
-            return 1
+            return None
         self.reset()
-        current_node = None
-        labeled = 0
-        while labeled < len(label):
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return 2
-                pos = pygame.mouse.get_pos()
-                if bool(current_node):
-                    if not in_range(pos, current_node.posN, SIZE):
-                        current_node.unhover()
-                        current_node = None
-                if not bool(current_node):
-                    for node in self.nodesG:
-                        if in_range(pos, node.posN, SIZE):
-                            node.hover()
-                            current_node = node
-                            break
-                if event.type == pygame.MOUSEBUTTONUP:
-                    if bool(current_node):
-                        if current_node in self.labeling:
-                            self.labeling.pop(current_node)
-                            labeled = labeled - 1
-                        else:
-                            self.labeling[current_node] = label[labeled]
-                            labeled = labeled + 1
-                    if pos[0] > WIDTH:
-                        self.labeling.clear()
-                        self.reset()
-                        return 1
-                self.drawG()
-        current_node.unhover()
-        self.drawG()
+        return SelectMode(self, label, then)
 
-    def shortest_path(self, nodes: Tuple(Node, Node)):
-        if bool(nodes):
-            start, end = nodes
-        else:
-            label = ['start', 'end']
-            exit = self.select(label)
-            if exit:
-                return exit-1
-            start = list(self.labeling.keys())[list(self.labeling.values()).index(label[0])]
-            end = list(self.labeling.keys())[list(self.labeling.values()).index(label[1])]
-        priority = 0
-        edges = PriorityQueue()
-        for node in start.connectedN:
-            edge = self.get_edge((start, node))
-            edges.put((edge.get_costE(), priority, edge))
-            priority = priority + 1
-        dist = {start: 0}
-        labeling = {}
-        entering = None
-        while not edges.empty() and entering != end:
-            cost, dummy, arc = edges.get()
-            leaving, entering = arc.connectingE
-            if entering in dist:
-                continue
-            for node in entering.connectedN:
-                if node not in dist:
-                    edge = self.get_edge((entering, node))
-                    edges.put((cost + edge.get_costE(), priority, edge))
-                    priority = priority + 1
-            dist[entering] = cost
-            labeling[entering] = leaving
-        path = []
-        if end in dist:
-            while end != start:
-                path.append(self.get_edge((labeling[end], end)))
-                end = labeling[end]
-        if bool(nodes):
-            return path
+    def labeled(self, label: str) -> Node:
+        return list(self.labeling.keys())[list(self.labeling.values()).index(label)]
+
+    def shortest_path(self, nodes: Tuple(Node, Node)) -> Optional[Mode]:
+        if not bool(nodes):
+            return self.select(['start', 'end'], self.labeled_path)
+        start, end = nodes
+        method = 'bidirectional' if CUSTOM_WEIGHTS else 'astar' #Default costs are edge lengths, so positions guide A*
+        return self.run('shortest_path', algorithms.shortest_path, start.idN, end.idN, method=method, then=self.show_path)
+
+    def labeled_path(self) -> Mode:
+        return self.shortest_path((self.labeled('start'), self.labeled('end')))
+
+    def show_path(self, path: List[int]):
         for edge in path:
-            edge.active()
+            self.edge_ids[edge].active()
+
+    def all_pairs(self, dense: bool = True, method: str = 'auto'): #Rows and columns follow nodesG, sparse rows map node index to distance
+        nodes = [node.idN for node in self.nodesG]
+        distances = algorithms.all_pairs_shortest_paths(self.core, nodes, method, dense)
+        if dense:
+            return distances
+        index = {node.idN: node.indexN for node in self.nodesG}
+        return {index[source]: {index[target]: distance for target, distance in row.items()} for source, row in distances.items()}
 
     def max_flow(self):
-        label = ['s', 't']
-        exit = self.select(label)
-        if exit:
-            return exit-1
-        source = list(self.labeling.keys())[list(self.labeling.values()).index(label[0])]
-        sink = list(self.labeling.keys())[list(self.labeling.values()).index(label[1])]
-        while len(source.connectedN) != len(source.edgesN) or bool(sink.connectedN):
-            exit = self.select(label)
-            if exit:
-                return exit-1
-            source = list(self.labeling.keys())[list(self.labeling.values()).index(label[0])]
-            sink = list(self.labeling.keys())[list(self.labeling.values()).index(label[1])]
-        flow = {} #{(leaving node, entering node): (forward flow, backward flow, capacity of arc)}
-        for edge in self.edgesG:
-            arc = edge.connectingE
-            flow[arc] = (0, 0, edge.get_weightE())
-            arc = (arc[1], arc[0])
-            if not arc in flow:
-                flow[arc] = (0, 0, 0)
-        path = self.augmenting_path(source, sink, flow, {source}, [], {source})
-        while type(path) == list:
-            path_flow = float('inf')
-            for arc in path:
-                spare_capacity = flow[arc][2] + flow[arc][1] - flow[arc][0]
-                path_flow = min(path_flow, spare_capacity)
-            for arc in path:
-                f_flow, b_flow, capacity = flow[arc]
-                f_flow, b_flow = max(f_flow + path_flow - b_flow, 0), max(b_flow - path_flow, 0)
-                flow[arc] = (f_flow, b_flow, capacity)
-                arc = (arc[1], arc[0])
-                flow[arc] = (b_flow, f_flow, flow[arc][2])
-            path = self.augmenting_path(source, sink, flow, {source}, [], {source})
-        for node in path:
-            node.active = True
-        for arc in flow:
-            edge = self.get_edge(arc)
-            if bool(edge):
-                edge.eraseE()
-                edge.set_custom(str(flow[arc][0])+'/'+str(flow[arc][2]))
-
-    def augmenting_path(self, current: Node, sink: Node, flow: Dict, visited: Set, aug_path: List, cut: Set):
-        if sink in visited:
-            return aug_path
-        for edge in current.edgesN:
-            arc = edge.connectingE
-            if arc[1] in visited:
-                if bool(edge.parallel) or arc[0] in visited:
-                    continue
-                arc = (arc[1], arc[0])
-            f_flow, b_flow, capacity = flow[arc]
-            if b_flow + capacity - f_flow > 0:
-                cut.add(arc[1])
-                path = self.augmenting_path(arc[1], sink, flow, visited.union({arc[1]}), aug_path + [arc], cut)
-                if type(path) == list:
-                    return path
-        return cut
+        return self.select(['s', 't'], self.labeled_flow)
+
+    def labeled_flow(self):
+        source, sink = self.labeled('s'), self.labeled('t')
+        if len(source.connectedN) != len(source.edgesN) or bool(sink.connectedN): #Edges into the source or out of the sink, select again
+            return self.max_flow()
+        return self.run('max_flow', algorithms.max_flow, source.idN, sink.idN, then=self.show_cut)
+
+    def show_cut(self, result: Tuple[Dict[int, int], Set[int]]):
+        flow, cut = result
+        for node in cut:
+            self.node_ids[node].active = True
+        self.show_flow(flow)
 
     def min_cost_flow(self):
-        label = ['s', 't']
-        exit = self.select(label)
-        if exit:
-            return exit-1
-        source = list(self.labeling.keys())[list(self.labeling.values()).index(label[0])]
-        sink = list(self.labeling.keys())[list(self.labeling.values()).index(label[1])]
-        value = '0'
-        text = font.render(value, True, BLACK)
-        text_rect = text.get_rect(center=(WIDTH-60, WIDTH-20))
-        run = True
-        while run:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return True
-                pos = pygame.mouse.get_pos()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        run = False
-                    elif event.key == pygame.K_BACKSPACE:
-                        value = value[:-1]
-                        if not bool(value):
-                            value = '0'
-                    else:
-                        if event.unicode.isnumeric():
-                            if int(value):
-                                value += event.unicode
-                            else:
-                                value = event.unicode
-            pygame.draw.rect(WIN, WHITE, text_rect)
-            text = font.render(value, True, BLACK)
-            text_rect = text.get_rect(center=(WIDTH-60, WIDTH-20))
-            WIN.blit(text, text_rect)
-            self.drawG()
-        pygame.draw.rect(WIN, WHITE, text_rect)
-        self.SSPA(source, sink, int(value))
-
-    def SSPA(self, source, sink, demand): #Successive Shortest Path Algorithm
-        original_costs = {}
-        flow = {} #{(leaving node, entering node): (forward flow, backward flow, capacity of arc)}
-        for edge in self.edgesG:
-            original_costs[edge] = str(edge.get_costE())
-            arc = edge.connectingE
-            flow[arc] = (0, 0, edge.get_weightE())
-            arc = (arc[1], arc[0])
-            if not arc in flow:
-                flow[arc] = (0, 0, 0)
-        supplied = 0
-        while supplied < demand:
-            path = self.shortest_path((source, sink))
-            path_flow = float('inf')
-            for edge in path:
-                arc = edge.connectingE
-                spare_capacity = flow[arc][2] + flow[arc][1] - flow[arc][0]
-                path_flow = min(path_flow, spare_capacity)
-            path_flow = min(demand - supplied, path_flow)
-            for edge in path:
-                arc = edge.connectingE
-                spare_capacity = flow[arc][2] + flow[arc][1] - flow[arc][0]
-                if spare_capacity == path_flow:
-                    edge.set_costE(str(sys.maxsize))
-            for edge in path:
-                arc = edge.connectingE
-                f_flow, b_flow, capacity = flow[arc]
-                f_flow, b_flow = max(f_flow + path_flow - b_flow, 0), max(b_flow - path_flow, 0)
-                flow[arc] = (f_flow, b_flow, capacity)
-                arc = (arc[1], arc[0])
-                flow[arc] = (b_flow, f_flow, flow[arc][2])
-            supplied = supplied + path_flow
-            if not path_flow:
-                break
-        for edge in self.edgesG:
-            edge.set_costE(original_costs[edge])
-        for arc in flow:
-            edge = self.get_edge(arc)
-            if bool(edge):
-                edge.eraseE()
-                edge.set_custom(str(flow[arc][0])+'/'+str(flow[arc][2]))
+        return self.select(['s', 't'], lambda: DemandMode(self))
+
+    def SSPA(self, source, sink, demand) -> Mode: #Successive Shortest Path Algorithm
+        return self.run('min_cost_flow', algorithms.min_cost_flow, source.idN, sink.idN, demand, then=self.show_flow)
+
+    def show_flow(self, flow: Dict[int, int]):
+        self.flows = flow
+        for edge_id, value in flow.items():
+            edge = self.edge_ids[edge_id]
+            edge.eraseE()
+            edge.set_custom(str(value)+'/'+str(edge.get_weightE()))
 
     def reset_labels(self):
+        for node in self.labeling:
+            node.refreshN()
         self.labeling.clear()
         self.drawG()
 
     def reset(self):
         super(DGraph, self).reset()
         self.reset_labels()
-        for node in self.nodesG:
-            node.active = False
+        self.flows = None
         for edge in self.edgesG:
             edge.custom_textE = None
             edge.moveE()
 
-    def drawG(self):
-        for edge in self.edgesG:
-            edge.drawE()
-        for node in self.nodesG:
-            node.drawN()
-            if node in self.labeling:
-                text = font.render(self.labeling[node], True, BLACK)
-            else:
-                text = font.render(str(self.nodesG.index(node)+1) , True , BLACK)
-            text_rect = text.get_rect(center=node.posN)
-            WIN.blit(text, text_rect)
-        pygame.display.update()
+    def node_label(self, node: Node) -> str:
+        if node in self.labeling:
+            return self.labeling[node]
+        return super(DGraph, self).node_label(node)
+
+    def save(self, path: str):
+        super(DGraph, self).save(path, flows=self.flows)
+
+def open_graph(path: str) -> Graph: #Nodes and edges of a saved graph, only created when it is shown in the window, ValueError if a weight or cost is not a whole number
+    with graph_io.GraphFile(path) as file:
+        if file.directed:
+            graph, node_type, edge_type = DGraph(), DNode, DEdge
+        else:
+            graph, node_type, edge_type = UGraph(), Node, UEdge
+        for pos in file.positions():
+            if pos is None: #Saved without a position, placed as near the middle as there is room for
+                pos = closest_valid_pos(graph.grid, (WIDTH//2, WIDTH//2), None) or (WIDTH//2, WIDTH//2)
+            graph.add_node(node_type(pos))
+        edges = []
+        for index, (tail, head, weight, cost) in enumerate(zip(file.column('tail'), file.column('head'), file.column('weight'), file.column('cost'))):
+            if weight != int(weight) or cost != int(cost): #Edges only hold integers, truncating would change the graph
+                raise ValueError(f'edge {index} has weight {weight} and cost {cost}, only whole numbers can be edited')
+            edge = edge_type(graph.nodesG[tail], graph.nodesG[head])
+            edge.weightE = str(int(weight))
+            edge.costE = str(int(cost))
+            edge.update_textE() #The label was rendered with the default weight and cost
+            graph.add_edge(edge)
+            edges.append(edge)
+        flows = file.flows()
+    if bool(flows) and file.directed:
+        graph.show_flow({edges[index].idE: value for index, value in flows.items()})
+    return graph
 
 class Button: #Option button
 
@@ -927,8 +1121,9 @@ class Button: #Option button
         self.colorB = WHITE
         self.border_rectB = pygame.Rect(x_pos, y_pos, width+1, height+1)
         self.rectB = pygame.Rect(x_pos+1, y_pos+1, width-1, height-1)
-        self.textB = font.render(text, True, BLACK)
+        self.textB = render_text(text)
         self.text_rectB = self.textB.get_rect(center=(x_pos + width//2, y_pos + height//2))
+        self.drawnB = None #(color, text) on screen
 
     @property
     def colorB(self) -> Tuple:
@@ -979,16 +1174,19 @@ class Button: #Option button
     def click(self):
         pass
 
-    def draw(self):
-        pygame.draw.rect(WIN, BLACK, self.border_rectB)
-        pygame.draw.rect(WIN, self.colorB, self.rectB)
-        WIN.blit(self.textB, self.text_rectB)
+    def draw(self, force: bool = False): #Only touches the display when the button looks different
+        if force or self.drawnB != (self.colorB, self.textB):
+            self.drawnB = (self.colorB, self.textB)
+            pygame.draw.rect(WIN, BLACK, self.border_rectB)
+            pygame.draw.rect(WIN, self.colorB, self.rectB)
+            WIN.blit(self.textB, self.text_rectB)
+            pygame.display.update(self.border_rectB)
 
 class ButtonT(Button): #Toggle button
 
     def __init__(self, x_pos, y_pos, width, height, text, alt_text):
         super(ButtonT, self).__init__(x_pos, y_pos, width, height, text)
-        self.alt_textB = font.render(alt_text, True, BLACK)
+        self.alt_textB = render_text(alt_text)
         self.alt_text_rectB = self.alt_textB.get_rect(center=(x_pos + width//2, y_pos + height//2))
         self.toggle = False
 
@@ -1082,13 +1280,6 @@ class Button4(Button3):
         super(Button4, self).click()
         return self.execute()
 
-def connected_graph(current, connecting):
-    for node in current.connectedN:
-        if not node in connecting:
-            connecting.add(node)
-            connecting = connected_graph(node, connecting)
-    return connecting
-
 def has_cycle(matrix, nodes, edges, current_nodes, current_edges):
     if len(nodes) < 3:
         return False
@@ -1108,28 +1299,35 @@ def has_cycle(matrix, nodes, edges, current_nodes, current_edges):
 def in_range(pos1, pos2, range):
     x1, y1 = pos1
     x2, y2 = pos2
-    return math.sqrt((x1 - x2)**2 + (y1 - y2)**2) < range
+    return (x1 - x2)**2 + (y1 - y2)**2 < range*range
 
-def valid_pos(nodes: List[Node], pos, exclude: Set[Node]):
+def valid_pos(grid: GridIndex, pos, exclude: Set[Node]):
     if not (SIZE*2 <= pos[0] <= WIDTH-SIZE*2 and SIZE*2 <= pos[1] <= WIDTH-SIZE*2):
         return False
-    for node in nodes:
-        if in_range(pos, node.posN, SIZE*3):
-            if not node in exclude:
-                return False
-    return True
+    return not grid.point_within(pos, SIZE*3, exclude)
+
+class PlacementCache: #Neighbours and validity of candidate positions, kept while only the dragged node moves
 
-def closest_valid_pos(nodes: List[Node], pos, node_to_move: Node): #helper function of get_positions()
+    def __init__(self):
+        self.grid = None
+        self.node = None
+        self.version = None
+        self.neighbors = {} #{position: nodes within SIZE*3+0.1 other than node}
+        self.validity = {} #{candidate: valid}
+
+    def prepare(self, grid: GridIndex, node: Node):
+        if grid is not self.grid or node is not self.node or not (grid.version == self.version or (grid.mover is node and grid.version - self.version <= grid.moves)):
+            self.grid = grid
+            self.node = node
+            self.neighbors.clear()
+            self.validity.clear()
+        self.version = grid.version
+
+def closest_valid_pos(grid: GridIndex, pos, node_to_move: Node, cache: PlacementCache = None): #Closest position at least SIZE*3 from every other node, None if there is none
     x, y = pos
-    valid = set()
-    invalid = set()
-    intersecting = set()
     in_display = SIZE*2 <= x <= WIDTH-SIZE*2 and SIZE*2 <= y <= WIDTH-SIZE*2
-    for node in nodes:
-        if in_range(pos, node.posN, SIZE*3):
-            if node != node_to_move:
-                intersecting.add(node)
-    if in_display and not bool(intersecting): 
+    intersecting = [node for node in grid.points_within(pos, SIZE*3) if node != node_to_move]
+    if in_display and not bool(intersecting):
         return pos
     elif not in_display and not bool(intersecting):
         a, b = x, y
@@ -1142,28 +1340,51 @@ def closest_valid_pos(nodes: List[Node], pos, node_to_move: Node): #helper funct
         elif y > WIDTH-SIZE*2:
             b = WIDTH-SIZE*2
         pos = (a, b)
-        if valid_pos(nodes, pos, {node_to_move}):
+        if valid_pos(grid, pos, {node_to_move}):
             return pos
     elif in_display and len(intersecting) == 1:
-        node = intersecting.pop()
+        node = intersecting[0]
         if pos == node.posN:
             return None
         x1, y1 = node.posN
         scale = 3*SIZE/math.sqrt((x - x1)**2 + (y - y1)**2)
         pos = (x1+(x-x1)*scale, y1+(y-y1)*scale)
-        if valid_pos(nodes, pos, {node, node_to_move}):
+        if valid_pos(grid, pos, {node, node_to_move}):
             return pos
-    valid, invalid = get_positions(nodes, pos, node_to_move, set(), set())
-    closest = (WIDTH, None)
-    for p in valid:
-        dist = math.sqrt((p[0] - x)**2 + (p[1] - y)**2)
-        if closest[0] > dist:
-            closest = (dist, p)
+    if cache is None:
+        cache = PlacementCache()
+    cache.prepare(grid, node_to_move)
+    return search_positions(grid, pos, (x, y), node_to_move, cache)
+
+def search_positions(grid: GridIndex, start, target, node_to_move: Node, cache: PlacementCache): #Closest valid candidate reachable from start, nearest candidates are expanded first
+    x, y = target
+    validity = cache.validity
+    frontier = [(0, 0, start)] #(squared distance to target, order found, invalid position)
+    seen = set()
+    generated = set() #Node pairs and border touches already turned into candidates
+    closest = (WIDTH*WIDTH, None)
+    order = expanded = 0
+    while bool(frontier) and expanded < PLACEMENT_LIMIT:
+        expanded += 1
+        position = heapq.heappop(frontier)[2]
+        for candidate, exclude in candidate_positions(grid, position, node_to_move, generated, cache):
+            if candidate in seen:
+                continue
+            seen.add(candidate)
+            dist = (candidate[0] - x)**2 + (candidate[1] - y)**2
+            valid = validity.get(candidate)
+            if valid is None:
+                valid = validity[candidate] = valid_pos(grid, candidate, exclude)
+            if valid:
+                if closest[0] > dist:
+                    closest = (dist, candidate)
+            else:
+                order += 1
+                heapq.heappush(frontier, (dist, order, candidate))
     return closest[1]
 
-def get_positions(nodes: List[Node], pos, node_to_move: Node, valid: Set[Tuple], invalid: Set[Tuple]): #recursive function
+def candidate_positions(grid: GridIndex, pos, node_to_move: Node, generated: Set[Tuple], cache: PlacementCache) -> List[Tuple[Tuple, Set[Node]]]: #Positions touching the nodes around pos not in generated yet, with the nodes they touch
     x, y = pos
-    intersecting = set()
     direction = None
     if not (SIZE*2 < x < WIDTH-SIZE*2 and SIZE*2 < y < WIDTH-SIZE*2):
         a = b = 0
@@ -1176,58 +1397,36 @@ def get_positions(nodes: List[Node], pos, node_to_move: Node, valid: Set[Tuple],
         elif y >= WIDTH-SIZE*2: #Down
             b = 1
         direction = (a, b) #(horizontal, vertical)
-    for node in nodes:
-        if in_range(pos, node.posN, SIZE*3+0.1): #+0.1 for positions calculated from nodes
-            if node != node_to_move:
-                intersecting.add(node)
-    if not bool(direction):
-        while bool(intersecting):
-            node1 = intersecting.pop()
-            for node2 in intersecting:
-                pos1, pos2 = get_intersections(node1, node2)
-                valid, invalid = add_pos(nodes, pos1, node_to_move, {node_to_move, node1, node2}, valid, invalid)
-                valid, invalid = add_pos(nodes, pos2, node_to_move, {node_to_move, node1, node2}, valid, invalid)
-        return valid, invalid
-    else:
-        positions = set()
-        while bool(intersecting):
-            node1 = intersecting.pop()
+    intersecting = cache.neighbors.get(pos)
+    if intersecting is None:
+        intersecting = cache.neighbors[pos] = [node for node in grid.points_within(pos, SIZE*3+0.1) if node != node_to_move] #+0.1 for positions calculated from nodes
+    candidates = []
+    for i, node1 in enumerate(intersecting):
+        if bool(direction) and (node1, direction) not in generated:
+            generated.add((node1, direction))
             x1, y1 = node1.posN
             base1 = base2 = 0
             if direction[1] != 0:
                 y = WIDTH/2 + direction[1]*(WIDTH/2 - SIZE*2)
-                base1 = math.sqrt((SIZE*3)**2 - (y1 - y)**2)
+                base1 = math.sqrt(max((SIZE*3)**2 - (y1 - y)**2, 0))
             if direction[0] != 0:
                 x = WIDTH/2 + direction[0]*(WIDTH/2 - SIZE*2)
-                base2 = math.sqrt((SIZE*3)**2 - (x1 - x)**2)
+                base2 = math.sqrt(max((SIZE*3)**2 - (x1 - x)**2, 0))
             if direction[0] != 0 and direction[1] != 0: #Corner
-                positions.add((x, y1-direction[1]*base2))
-                positions.add((x1-direction[0]*base1, y))
+                positions = ((x, y1-direction[1]*base2), (x1-direction[0]*base1, y))
             elif direction[0] != 0: #Horizontal
-                positions.add((x, y1-base2))
-                positions.add((x, y1+base2))
-            elif direction[1] != 0: #Vertical
-                positions.add((x1-base1, y))
-                positions.add((x1+base1, y))
-            while bool(positions):
-                temp = positions.pop()
-                valid, invalid = add_pos(nodes, temp, node_to_move, {node1, node_to_move}, valid, invalid)
-            for node2 in intersecting:
-                pos1, pos2 = get_intersections(node1, node2)
-                valid, invalid = add_pos(nodes, pos1, node_to_move, {node_to_move, node1, node2}, valid, invalid)
-                valid, invalid = add_pos(nodes, pos2, node_to_move, {node_to_move, node1, node2}, valid, invalid)
-        return valid, invalid
-
-def add_pos(nodes: List[Node], pos, node_to_move: Node, exclude: Set[Node], valid: Set[Tuple], invalid: Set[Tuple]):
-    if pos in valid or pos in invalid:
-        pass
-    else:
-        if valid_pos(nodes, pos, exclude):
-            valid.add(pos)
-        else:
-            invalid.add(pos)
-            valid, invalid = get_positions(nodes, pos, node_to_move, valid, invalid)
-    return valid, invalid
+                positions = ((x, y1-base2), (x, y1+base2))
+            else: #Vertical
+                positions = ((x1-base1, y), (x1+base1, y))
+            for position in positions:
+                candidates.append((position, {node1, node_to_move}))
+        for node2 in intersecting[i+1:]:
+            if (node1, node2) not in generated:
+                generated.add((node1, node2))
+                exclude = {node_to_move, node1, node2}
+                for position in get_intersections(node1, node2):
+                    candidates.append((position, exclude))
+    return candidates
 
 def get_intersections(node1, node2):
     x0, y0 = node1.posN
@@ -1246,7 +1445,28 @@ def get_intersections(node1, node2):
     y4=y2+h*(x1-x0)/d
     return ((x3, y3), (x4, y4))
 
+def draw_profile(): #Frame rate, work per frame and the counters of the latest algorithm at the bottom of the side bar
+    lines = [f'{PROFILER.fps():.0f} fps', f'{PROFILER.frame_time()*1000:.1f} ms/frame']
+    for name, counters in list(PROFILER.counters.items())[-1:]:
+        lines.append(name)
+        lines += [f'{counter} {value}' for counter, value in counters.items()]
+    rect = pygame.Rect(WIDTH+1, WIDTH - 16*len(lines), SIDE_BAR, 16*len(lines))
+    WIN.fill(LIGHTGREY, rect)
+    for i, line in enumerate(lines):
+        WIN.blit(font.render(line, True, BLACK), (rect.x + 4, rect.y + 16*i)) #Not render_text, changing numbers would crowd out the label cache
+    pygame.display.update(rect)
+
+def coalesce(events: List[Event]) -> List[Event]: #Runs of mouse motion collapse to their last event, the handlers poll the mouse anyway
+    kept = []
+    for event in events:
+        if event.type == pygame.MOUSEMOTION and bool(kept) and kept[-1].type == pygame.MOUSEMOTION:
+            kept[-1] = event
+        else:
+            kept.append(event)
+    return kept
+
 def main():
+    init_display()
     WIN.fill(WHITE)
     buttons11 = [
         Button1(WIDTH+1, 0, SIDE_BAR, WIDTH//6, 'Add'),
@@ -1267,7 +1487,7 @@ def main():
     buttons21 = [
         Button2(WIDTH+1, 0, SIDE_BAR, WIDTH//6, 'MST', lambda: graph.MST()),
         Button2(WIDTH+1, WIDTH//6, SIDE_BAR, WIDTH//6, 'Hamilton Cycle', lambda: graph.hamiltonian_cycle()),
-        Button2(WIDTH+1, 2*WIDTH//6, SIDE_BAR, WIDTH//6, 'Max Matching', lambda: graph.max_matching(False)),
+        Button2(WIDTH+1, 2*WIDTH//6, SIDE_BAR, WIDTH//6, 'Max Matching', lambda: graph.max_matching()),
         Button2(WIDTH+1, 3*WIDTH//6, SIDE_BAR, WIDTH//6, 'Min Cover', lambda: graph.min_cover()),
         buttons11[4],
         buttons11[5]
@@ -1284,145 +1504,210 @@ def main():
     alt_buttons = buttons21
     graph = UGraph()
     directed = False
-    text = font.render('Undirected Graph', True, BLACK)
+    text = render_text('Undirected Graph')
     text_rect = text.get_rect(center=(WIDTH-60, 10))
-    WIN.blit(text, text_rect)
+    graph.scene.set_overlay('title', text, text_rect)
+    shown_buttons = None #Button list on screen
     prev_pos = (-1, -1)
     current_node = None
     current_edge = None
     node_to_move = None
     node_to_connect = None
     prev_button = buttons11[0]
+    mode = None #Interaction in progress, it gets the events instead of the editor
+    clock = pygame.time.Clock()
     running = True
+    folded = None #Hook exporting phase times while profiling
     while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            x, y = pos = pygame.mouse.get_pos()
-            if buttons11[5].is_selected():
-                if event.type == pygame.MOUSEBUTTONUP:
-                    for button in buttons:
-                        if button.rectB.collidepoint(event.pos):
-                            running = not button.click()
-                            if buttons.index(button) == len(buttons)-1:
-                                graph.reset()
-                                if type(graph) == UGraph:
-                                    buttons = buttons11
-                                else:
-                                    buttons = buttons12
-            else:
-                if event.type == pygame.MOUSEBUTTONUP:
-                    if WIDTH < x:
+        with PROFILER.phase('draw'):
+            graph.drawG()
+        pos = pygame.mouse.get_pos()
+        for button in buttons:
+            button.unhover()
+            if button.rectB.collidepoint(pos):
+                button.hover()
+            button.draw(buttons is not shown_buttons)
+        shown_buttons = buttons
+        if bool(mode):
+            mode.draw()
+        PROFILER.end_frame()
+        if PROFILER.enabled:
+            draw_profile()
+        clock.tick(FPS)
+        events = coalesce(pygame.event.get())
+        if not bool(events): #Sleeps until something happens, or until the profile overlay or the mode is due for a redraw
+            refresh = min([interval for interval in (PROFILE_REFRESH if PROFILER.enabled else 0, mode.refresh if bool(mode) else 0) if interval], default=0)
+            events = coalesce([event for event in [pygame.event.wait(refresh)] + pygame.event.get() if event.type != pygame.NOEVENT])
+        PROFILER.begin_frame()
+        with PROFILER.phase('events'):
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3: #Profiling on or off
+                    if PROFILER.enabled:
+                        PROFILER.disable()
+                        PROFILER.remove_hook(folded)
+                        folded.write()
+                        folded = None
+                        shown_buttons = None #Repaint the buttons under the overlay
+                    else:
+                        PROFILER.enable()
+                        folded = FoldedStacks(PROFILE_PATH)
+                        PROFILER.add_hook(folded)
+                    continue
+                if event.type == JOB_DONE and not isinstance(mode, JobMode): #Finished just as it was cancelled
+                    continue
+                if bool(mode):
+                    mode = mode.handle(event)
+                    continue
+                x, y = pos = pygame.mouse.get_pos()
+                if buttons11[5].is_selected():
+                    if event.type == pygame.MOUSEBUTTONUP:
                         for button in buttons:
                             if button.rectB.collidepoint(event.pos):
-                                button.click()
+                                result = button.click()
+                                if isinstance(result, Mode):
+                                    mode = result
+                                else:
+                                    running = not result
                                 if buttons.index(button) == len(buttons)-1:
-                                    buttons = alt_buttons
-                                if button != prev_button:
-                                    try:
-                                        prev_button.deselect()
-                                    except:
-                                        pass
-                                prev_button = button
-                                break
-                        if bool(node_to_connect):
-                            node_to_connect.deselect()
-                            node_to_connect = None
-                    elif bool(node_to_move):
-                        node_to_move = None
-                if pygame.mouse.get_pressed()[2]:
-                    del graph
-                    pygame.draw.rect(WIN, WHITE, pygame.Rect(0, 0, WIDTH, WIDTH))
-                    if directed:
-                        graph = UGraph()
-                        buttons = buttons11
-                        alt_buttons = buttons21
-                        text = font.render('Undirected Graph', True, BLACK)
-                    else:
-                        graph = DGraph()
-                        buttons = buttons12
-                        alt_buttons = buttons22
-                        text = font.render('Directed Graph', True, BLACK)
-                    WIN.blit(text, text_rect)
-                    directed = not directed
-                    SHOW_WEIGHTS = True
-                    SHOW_VALUE = True
-                if not bool(node_to_move):
-                    if bool(current_node):
-                        if not in_range(pos, current_node.posN, SIZE):
-                            current_node.unhover()
-                            current_node = None
-                    elif bool(current_edge):
-                        if not current_edge.text_rectE.collidepoint(pos):
-                            current_edge.default()
-                            current_edge = None
-                    if not (bool(current_node) or bool(current_edge)):
-                        for node in graph.nodesG:
-                            if in_range(pos, node.posN, SIZE):
-                                node.hover()
-                                current_node = node
-                                break
-                        else:
-                            for edge in graph.edgesG:
-                                if edge.text_rectE.collidepoint(pos):
-                                    edge.inactive()
-                                    current_edge = edge
+                                    graph.reset()
+                                    if type(graph) == UGraph:
+                                        buttons = buttons11
+                                    else:
+                                        buttons = buttons12
+                else:
+                    if event.type == pygame.MOUSEBUTTONUP:
+                        if WIDTH < x:
+                            for button in buttons:
+                                if button.rectB.collidepoint(event.pos):
+                                    button.click()
+                                    if buttons.index(button) == len(buttons)-1:
+                                        buttons = alt_buttons
+                                    if button != prev_button:
+                                        try:
+                                            prev_button.deselect()
+                                        except:
+                                            pass
+                                    prev_button = button
                                     break
-                if pygame.mouse.get_pressed()[0]:
-                    if x <= WIDTH:
-                        if bool(node_to_move):
-                            pos = closest_valid_pos(graph.nodesG, pos, node_to_move)
-                            if not bool(pos):
-                                pos = prev_pos
-                            node_to_move.moveN(pos)
-                            prev_pos = pos
-                            for edge in node_to_move.edgesN:
-                                edge.moveE()
-                        elif buttons[0].is_selected(): #Add node
-                            if bool(current_node):
-                                node_to_move = current_node
-                                continue
-                            if valid_pos(graph.nodesG, pos, set()):
+                            if bool(node_to_connect):
+                                node_to_connect.deselect()
+                                node_to_connect = None
+                        elif bool(node_to_move):
+                            node_to_move = None
+                    if event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL:
+                        if event.key == pygame.K_s:
+                            graph.save(SAVE_PATH)
+                        elif event.key == pygame.K_o and os.path.isfile(SAVE_PATH):
+                            try:
+                                opened = open_graph(SAVE_PATH)
+                            except ValueError as error:
+                                graph.show_message(str(error))
+                                opened = None
+                            if opened is not None:
+                                graph = opened
+                                directed = type(graph) == DGraph
                                 if directed:
-                                    graph.add_node(DNode(pos))
+                                    buttons = buttons12
+                                    alt_buttons = buttons22
+                                    text = render_text('Directed Graph')
                                 else:
-                                    graph.add_node(Node(pos))
-                        elif buttons[1].is_selected(): #Remove
-                            if bool(current_node):
-                                graph.remove_node(current_node)
+                                    buttons = buttons11
+                                    alt_buttons = buttons21
+                                    text = render_text('Undirected Graph')
+                                graph.scene.set_overlay('title', text, text_rect)
                                 current_node = None
-                            elif bool(current_edge):
-                                graph.remove_edge(current_edge)
                                 current_edge = None
-                        elif buttons[2].is_selected(): #Connect nodes
+                                node_to_move = None
+                                node_to_connect = None
+                    if pygame.mouse.get_pressed()[2]:
+                        del graph
+                        if directed:
+                            graph = UGraph()
+                            buttons = buttons11
+                            alt_buttons = buttons21
+                            text = render_text('Undirected Graph')
+                        else:
+                            graph = DGraph()
+                            buttons = buttons12
+                            alt_buttons = buttons22
+                            text = render_text('Directed Graph')
+                        graph.scene.set_overlay('title', text, text_rect)
+                        directed = not directed
+                        SHOW_WEIGHTS = True
+                        SHOW_VALUE = True
+                    if not bool(node_to_move):
+                        if bool(current_node):
+                            if not in_range(pos, current_node.posN, SIZE):
+                                current_node.unhover()
+                                current_node = None
+                        elif bool(current_edge):
+                            if not current_edge.text_rectE.collidepoint(pos):
+                                current_edge.default()
+                                current_edge = None
+                        if not (bool(current_node) or bool(current_edge)):
+                            current_node = graph.node_at(pos)
                             if bool(current_node):
-                                if bool(node_to_connect):
-                                    if current_node != node_to_connect:
-                                        if not current_node in node_to_connect.connectedN:
-                                            if directed:
-                                                edge = DEdge(node_to_connect, current_node)
-                                            else:
-                                                edge = UEdge(node_to_connect, current_node)
-                                            graph.add_edge(edge)
+                                current_node.hover()
+                            else:
+                                current_edge = graph.edge_at(pos)
+                                if bool(current_edge):
+                                    current_edge.inactive()
+                    if pygame.mouse.get_pressed()[0]:
+                        if x <= WIDTH:
+                            if bool(node_to_move):
+                                with PROFILER.phase('placement'):
+                                    pos = closest_valid_pos(graph.grid, pos, node_to_move, graph.placement)
+                                if not bool(pos):
+                                    pos = prev_pos
+                                node_to_move.moveN(pos)
+                                prev_pos = pos
+                                for edge in node_to_move.edgesN:
+                                    edge.moveE()
+                            elif buttons[0].is_selected(): #Add node
+                                if bool(current_node):
+                                    node_to_move = current_node
+                                    continue
+                                if valid_pos(graph.grid, pos, set()):
+                                    if directed:
+                                        graph.add_node(DNode(pos))
+                                    else:
+                                        graph.add_node(Node(pos))
+                            elif buttons[1].is_selected(): #Remove
+                                if bool(current_node):
+                                    graph.remove_node(current_node)
+                                    current_node = None
+                                elif bool(current_edge):
+                                    graph.remove_edge(current_edge)
+                                    current_edge = None
+                            elif buttons[2].is_selected(): #Connect nodes
+                                if bool(current_node):
+                                    if bool(node_to_connect):
+                                        if current_node != node_to_connect:
+                                            if not current_node in node_to_connect.connectedN:
+                                                if directed:
+                                                    edge = DEdge(node_to_connect, current_node)
+                                                else:
+                                                    edge = UEdge(node_to_connect, current_node)
+                                                graph.add_edge(edge)
+                                                node_to_connect.deselect()
+                                                node_to_connect = None
+                                        else:
                                             node_to_connect.deselect()
                                             node_to_connect = None
                                     else:
-                                        node_to_connect.deselect()
-                                        node_to_connect = None
-                                else:
-                                    node_to_connect = current_node
-                                    node_to_connect.select()
-                        elif bool(current_node):
-                            node_to_move = current_node
-                        elif buttons[4].is_selected():
-                            if bool(current_edge):
-                                running = not current_edge.input_valueE(graph)
-        graph.drawG()
-        for button in buttons:
-            button.unhover()
-            if button.rectB.collidepoint(pos):
-                button.hover()
-            button.draw()
+                                        node_to_connect = current_node
+                                        node_to_connect.select()
+                            elif bool(current_node):
+                                node_to_move = current_node
+                            elif buttons[4].is_selected():
+                                if bool(current_edge):
+                                    mode = current_edge.input_valueE()
+    if bool(folded):
+        folded.write()
+    JOBS.shutdown()
     pygame.quit()
 
-main()
+if __name__ == '__main__':
+    main()
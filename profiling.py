@@ -0,0 +1,131 @@
+from __future__ import annotations
+from collections import deque
+from typing import Callable, Dict, NamedTuple, Tuple
+import time
+
+class Sample(NamedTuple): #A finished phase as hooks see it
+    stack: Tuple[str, ...] #Enclosing phases outermost first, ending with this one
+    start: float #time.perf_counter() when it began
+    seconds: float
+    counters: Dict[str, int] #Operation counts an algorithm added during the phase
+
+class Phase: #Times one run of a named phase, entering it gives the counter dict to pass an algorithm as stats
+
+    __slots__ = ('profiler', 'name', 'start', 'counters')
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = None
+        self.counters = {}
+
+    def __enter__(self) -> Dict[str, int]:
+        self.profiler.stack.append(self.name)
+        self.start = time.perf_counter()
+        return self.counters
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        profiler = self.profiler
+        sample = Sample(tuple(profiler.stack), self.start, seconds, self.counters)
+        profiler.stack.pop()
+        profiler.add(sample)
+
+class NullPhase: #Stands in for Phase while profiling is off, entering it gives None so algorithms skip counting
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc):
+        pass
+
+NULL_PHASE = NullPhase()
+
+class Profiler: #Opt-in phase timers, algorithm counters and frame rate, costs one attribute check while off
+
+    def __init__(self, window: int = 60):
+        self.enabled = False
+        self.stack = [] #Names of the phases being timed
+        self.totals = {} #{phase: seconds} since enabled
+        self.counters = {} #{phase: counters} of the latest run that counted anything
+        self.hooks = [] #[Callable[[Sample], None]], told about every finished phase
+        self.frames = deque(maxlen=window) #(start, busy seconds) of the latest frames
+        self.frame_start = None
+
+    def enable(self):
+        self.enabled = True
+        self.totals = {}
+        self.counters = {}
+        self.frames.clear()
+        self.frame_start = None
+
+    def disable(self):
+        self.enabled = False
+
+    def add_hook(self, hook: Callable[[Sample], None]):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[Sample], None]):
+        self.hooks.remove(hook)
+
+    def phase(self, name: str): #Context manager timing the phase, nested phases form a stack
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name)
+
+    def record(self, name: str, seconds: float, counters: Dict[str, int] = None): #Phase timed elsewhere, such as in a worker process, as if it just ended here
+        if self.enabled:
+            self.add(Sample(tuple(self.stack) + (name,), time.perf_counter() - seconds, seconds, counters or {}))
+
+    def add(self, sample: Sample):
+        name = sample.stack[-1]
+        self.totals[name] = self.totals.get(name, 0) + sample.seconds
+        if sample.counters:
+            self.counters.pop(name, None) #Latest last
+            self.counters[name] = sample.counters
+        for hook in self.hooks:
+            hook(sample)
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self): #Frame time counts work only, not the sleep until the next event
+        if self.enabled and self.frame_start is not None:
+            self.frames.append((self.frame_start, time.perf_counter() - self.frame_start))
+        self.frame_start = None
+
+    def fps(self) -> float: #Frames per second over the window, 0 until there are two
+        if len(self.frames) < 2:
+            return 0.0
+        elapsed = self.frames[-1][0] - self.frames[0][0]
+        return (len(self.frames) - 1)/elapsed if elapsed > 0 else 0.0
+
+    def frame_time(self) -> float: #Average work per frame in seconds
+        if not self.frames:
+            return 0.0
+        return sum(busy for start, busy in self.frames)/len(self.frames)
+
+PROFILER = Profiler() #Shared by the editor and the engines it calls
+
+class FoldedStacks: #Hook summing self time per stack, written as 'outer;inner microseconds' lines for flame graph tools
+
+    def __init__(self, path: str):
+        self.path = path
+        self.times = {} #{stack: seconds including nested phases}
+
+    def __call__(self, sample: Sample):
+        self.times[sample.stack] = self.times.get(sample.stack, 0) + sample.seconds
+
+    def self_times(self) -> Dict[Tuple[str, ...], float]:
+        result = dict(self.times)
+        for stack, seconds in self.times.items():
+            if len(stack) > 1 and stack[:-1] in result:
+                result[stack[:-1]] -= seconds
+        return result
+
+    def write(self):
+        with open(self.path, 'w') as file:
+            for stack, seconds in sorted(self.self_times().items()):
+                file.write(f"{';'.join(stack)} {max(round(seconds*1e6), 0)}\n")
@@ -0,0 +1,141 @@
+from __future__ import annotations
+from typing import Hashable, Iterator, List, Optional, Set, Tuple
+
+class GridIndex: #Uniform grid over points (hit by distance) and rects (hit by containment)
+
+    def __init__(self, cell: float):
+        self.cell = cell
+        self.cells = {} #{(column, row): {key: None}}, points and rects share the cells
+        self.points = {} #{key: (x, y)}
+        self.rects = {} #{key: (left, top, width, height)}
+        self.order = {} #{key: insertion number}, ties go to the oldest key like a scan in insertion order would
+        self.counter = 0
+        self.version = 0 #Bumped by every point change
+        self.mover = None #Key moved by the latest run of consecutive point moves
+        self.moves = 0 #Length of that run, lets caches that ignore the mover survive a drag
+
+    def __len__(self) -> int:
+        return len(self.points) + len(self.rects)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.points or key in self.rects
+
+    def span(self, left: float, top: float, right: float, bottom: float) -> Iterator[Tuple[int, int]]:
+        cell = self.cell
+        for column in range(int(left//cell), int(right//cell) + 1):
+            for row in range(int(top//cell), int(bottom//cell) + 1):
+                yield (column, row)
+
+    def link(self, key: Hashable, cells: Iterator[Tuple[int, int]]):
+        for position in cells:
+            bucket = self.cells.get(position)
+            if bucket is None:
+                bucket = self.cells[position] = {}
+            bucket[key] = None
+
+    def unlink(self, key: Hashable, cells: Iterator[Tuple[int, int]]):
+        for position in cells:
+            bucket = self.cells[position]
+            del bucket[key]
+            if not bucket:
+                del self.cells[position]
+
+    def cell_of(self, pos: Tuple[float, float]) -> Tuple[int, int]:
+        return (int(pos[0]//self.cell), int(pos[1]//self.cell))
+
+    def point_cells(self, pos: Tuple[float, float]) -> Tuple[Tuple[int, int]]:
+        return (self.cell_of(pos),)
+
+    def rect_cells(self, rect: Tuple[float, float, float, float]) -> Iterator[Tuple[int, int]]:
+        left, top, width, height = rect
+        return self.span(left, top, left + max(width - 1, 0), top + max(height - 1, 0))
+
+    def touch(self, key: Hashable = None): #Records a point change, key is given for moves
+        self.version += 1
+        if key is not None and key == self.mover:
+            self.moves += 1
+        else:
+            self.mover = key
+            self.moves = 0 if key is None else 1
+
+    def add_point(self, key: Hashable, pos: Tuple[float, float]):
+        self.remove(key)
+        self.touch()
+        self.points[key] = pos
+        self.order[key] = self.counter
+        self.counter += 1
+        self.link(key, self.point_cells(pos))
+
+    def move_point(self, key: Hashable, pos: Tuple[float, float]):
+        old = self.points[key]
+        self.touch(key)
+        self.points[key] = pos
+        if self.cell_of(old) != self.cell_of(pos):
+            self.unlink(key, (self.cell_of(old),))
+            self.link(key, (self.cell_of(pos),))
+
+    def add_rect(self, key: Hashable, rect: Tuple[float, float, float, float]):
+        self.remove(key)
+        rect = tuple(rect)
+        self.rects[key] = rect
+        self.order[key] = self.counter
+        self.counter += 1
+        self.link(key, self.rect_cells(rect))
+
+    def move_rect(self, key: Hashable, rect: Tuple[float, float, float, float]):
+        old = self.rects[key]
+        rect = tuple(rect)
+        if old != rect:
+            self.unlink(key, self.rect_cells(old))
+            self.rects[key] = rect
+            self.link(key, self.rect_cells(rect))
+
+    def remove(self, key: Hashable):
+        if key in self.points:
+            self.touch()
+            self.unlink(key, self.point_cells(self.points.pop(key)))
+            del self.order[key]
+        elif key in self.rects:
+            self.unlink(key, self.rect_cells(self.rects.pop(key)))
+            del self.order[key]
+
+    def near(self, pos: Tuple[float, float], radius: float) -> Iterator[Tuple[Hashable, Tuple[float, float]]]: #Points closer than radius to pos with their positions
+        x, y = pos
+        limit = radius*radius
+        cell, cells, points = self.cell, self.cells, self.points
+        for column in range(int((x - radius)//cell), int((x + radius)//cell) + 1):
+            for row in range(int((y - radius)//cell), int((y + radius)//cell) + 1):
+                for key in cells.get((column, row), ()):
+                    point = points.get(key)
+                    if point is not None and (point[0] - x)**2 + (point[1] - y)**2 < limit:
+                        yield key, point
+
+    def point_at(self, pos: Tuple[float, float], radius: float) -> Optional[Hashable]: #Oldest point closer than radius to pos
+        return min((key for key, point in self.near(pos, radius)), key=self.order.__getitem__, default=None)
+
+    def point_within(self, pos: Tuple[float, float], radius: float, exclude: Set[Hashable] = frozenset()) -> bool: #Whether a point outside exclude is closer than radius to pos
+        return any(key not in exclude for key, point in self.near(pos, radius))
+
+    def points_within(self, pos: Tuple[float, float], radius: float) -> List[Hashable]: #Points closer than radius to pos, oldest first
+        return sorted((key for key, point in self.near(pos, radius)), key=self.order.__getitem__)
+
+    def rect_at(self, pos: Tuple[float, float]) -> Optional[Hashable]: #Oldest rect containing pos, same edges as Rect.collidepoint
+        x, y = pos
+        best = None
+        for key in self.cells.get(self.cell_of(pos), ()):
+            rect = self.rects.get(key)
+            if rect is not None and rect[0] <= x < rect[0] + rect[2] and rect[1] <= y < rect[1] + rect[3]:
+                if best is None or self.order[key] < self.order[best]:
+                    best = key
+        return best
+
+    def rects_overlapping(self, rect: Tuple[float, float, float, float]) -> List[Hashable]: #Rects sharing area with rect, oldest first
+        left, top, width, height = rect
+        right, bottom = left + width, top + height
+        found = set()
+        for position in self.rect_cells(rect):
+            for key in self.cells.get(position, ()):
+                other = self.rects.get(key)
+                if other is not None and other[0] < right and left < other[0] + other[2] and other[1] < bottom and top < other[1] + other[3]:
+                    found.add(key)
+        return sorted(found, key=self.order.__getitem__)